@@ -1,24 +1,27 @@
 import streamlit as st
+from services import retention
 from ui.realtime_eligibility import render_form
 from ui.batch_eligibility import render_batch_form
 from ui.render_batch_results import render_batch_results
 from ui.batch_realtime import render_batch_realtime
+from ui.diagnostics import render_diagnostics
 
 
 st.set_page_config(page_title="Eligibility Checker", layout="centered")
 
 st.title("Eligibility Checker")
 
-tabs = st.tabs(["Check Real-Time Eligibility", "Batch Eligibility Check", "View Batch Results", "Batch Realtime Check"])
+# Old jobs, manifests and raw responses are aged out at most once an hour
+retention.purge_expired()
 
-with tabs[0]:
-    render_form()
+# st.tabs runs every tab's body on each rerun; with navigation only the
+# selected view executes
+pages = [
+    st.Page(render_form, title="Check Real-Time Eligibility", url_path="realtime", default=True),
+    st.Page(render_batch_form, title="Batch Eligibility Check", url_path="batch"),
+    st.Page(render_batch_results, title="View Batch Results", url_path="batch-results"),
+    st.Page(render_batch_realtime, title="Batch Realtime Check", url_path="batch-realtime"),
+    st.Page(render_diagnostics, title="Diagnostics", url_path="diagnostics"),
+]
 
-with tabs[1]:
-    render_batch_form()
-
-with tabs[2]:
-    render_batch_results()
-
-with tabs[3]:
-    render_batch_realtime()
\ No newline at end of file
+st.navigation(pages, position="top").run()
\ No newline at end of file
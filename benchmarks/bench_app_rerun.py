@@ -0,0 +1,89 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+# Keep job and cache state out of the working tree
+os.environ.setdefault("STATE_DB_PATH", str(Path(tempfile.mkdtemp()) / "state.db"))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.util import calc_hash  # noqa: E402
+
+# The previous layout: every tab renders on each rerun, plus the per-rerun
+# reference data work the views used to do (template written to disk,
+# service codes re-read, payer names re-sorted)
+LEGACY_APP = """
+import json
+import pandas as pd
+import streamlit as st
+from services.request_builder import REQUIRED_COLUMNS
+from ui.realtime_eligibility import render_form
+from ui.batch_eligibility import render_batch_form
+from ui.render_batch_results import render_batch_results
+from ui.batch_realtime import render_batch_realtime
+from ui.diagnostics import render_diagnostics
+from utils.utils import load_payers
+
+pd.DataFrame(columns=REQUIRED_COLUMNS).to_excel(TEMPLATE_PATH, index=False)
+with open("data/service_type_codes.json", "r", encoding="utf-8") as f:
+    json.load(f)
+sorted([p["displayName"] for p in load_payers()])
+
+tabs = st.tabs(["Real-Time", "Batch", "Batch Results", "Batch Realtime", "Diagnostics"])
+with tabs[0]:
+    render_form()
+with tabs[1]:
+    render_batch_form()
+with tabs[2]:
+    render_batch_results()
+with tabs[3]:
+    render_batch_realtime()
+with tabs[4]:
+    render_diagnostics()
+"""
+
+PAGES = ["realtime", "batch", "batch-results", "batch-realtime", "diagnostics"]
+
+
+def rerun_ms(at, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    return statistics.median(times)
+
+
+def main(repeat=15):
+    template = Path(tempfile.mkdtemp()) / "batch_template.xlsx"
+    legacy = AppTest.from_string(LEGACY_APP.replace("TEMPLATE_PATH", repr(str(template))), default_timeout=60)
+    start = time.perf_counter()
+    legacy.run()
+    legacy_first = (time.perf_counter() - start) * 1000
+    legacy_ms = rerun_ms(legacy, repeat)
+
+    app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    start = time.perf_counter()
+    app.run()
+    first = (time.perf_counter() - start) * 1000
+
+    print(f"{'view':<28}{'median rerun':>14}")
+    print(f"{'legacy: all tabs':<28}{legacy_ms:>11.1f} ms   (first run {legacy_first:.0f} ms)")
+    for page in PAGES:
+        app._page_hash = calc_hash(page)
+        ms = rerun_ms(app, repeat)
+        print(f"{'navigation: ' + page:<28}{ms:>11.1f} ms   {legacy_ms / ms:4.1f}x faster")
+    print(f"first run with navigation: {first:.0f} ms (imports and payer load happen once per process)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+
+from services.batch_executor import run_concurrently  # noqa: E402
+
+
+def latency_stub(latency):
+    def call(item):
+        time.sleep(latency)
+        return {"item": item}
+    return call
+
+
+def main(rows=200, latency=0.05):
+    stub = latency_stub(latency)
+    baseline = None
+    for workers in (1, 2, 4, 8, 16, 32):
+        start = time.perf_counter()
+        order = [idx for idx, _ in run_concurrently(stub, range(rows), max_workers=workers)]
+        elapsed = time.perf_counter() - start
+        assert sorted(order) == list(range(rows))
+        rate = rows / elapsed
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {rate:8.1f} rows/s  speedup x{rate / baseline:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
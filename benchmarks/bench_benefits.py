@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+
+import numpy as np  # noqa: E402
+from sample_271 import sample_corpus  # noqa: E402
+from services.benefits import extract_many  # noqa: E402
+
+
+def load_corpus(directory):
+    # One recorded 271 per *.json file, or a JSON list of them
+    responses = []
+    for path in sorted(Path(directory).glob("*.json")):
+        data = json.loads(path.read_text())
+        responses.extend(data if isinstance(data, list) else [data])
+    return responses
+
+
+def legacy_parse(response):
+    deductible = copay = plan_name = status = np.nan
+    for item in response.get("benefitsInformation", []):
+        if item.get("name") == "Deductible":
+            deductible = item.get("benefitAmount", np.nan)
+        if item.get("name") == "Co-Payment":
+            copay = item.get("benefitAmount", np.nan)
+        if item.get("name") == "Active Coverage":
+            status = "Active"
+            plan_name = item.get("planCoverage", np.nan)
+    return deductible, copay, plan_name, status
+
+
+def main(size=5000):
+    corpus = load_corpus(sys.argv[1]) if len(sys.argv) > 1 else sample_corpus(size)
+    services = [r["planStatus"][0]["serviceTypeCodes"][0] if r.get("planStatus") else None for r in corpus]
+    benefits = sum(len(r.get("benefitsInformation", [])) for r in corpus)
+    print(f"{len(corpus)} responses, {benefits / len(corpus):.0f} benefits each on average")
+
+    start = time.perf_counter()
+    for response in corpus:
+        legacy_parse(response)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame = extract_many(corpus, services=services)
+    indexed_s = time.perf_counter() - start
+
+    print(f"legacy name loop (4 fields, last match wins): {legacy_s * 1000:8.1f} ms  "
+          f"{len(corpus) / legacy_s:9.0f} responses/s")
+    print(f"indexed extractor ({len(frame.columns)} fields):            {indexed_s * 1000:8.1f} ms  "
+          f"{len(corpus) / indexed_s:9.0f} responses/s")
+    print(frame["Eligibility Status"].value_counts(dropna=False).to_dict())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+os.chdir(ROOT)
+
+from mock_stedi import serve, urls  # noqa: E402
+
+# Day one's run loses a few rows to payer errors; day two's roster is day
+# one's with some new subscribers and some corrected demographics
+server = serve(latency="fixed:0.05", error_5xx=0.01)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ.update(urls(server.server_address[1]))
+state_dir = Path(tempfile.mkdtemp())
+os.environ.update({
+    "STEDI_API_KEY": "bench",
+    "ELIGIBILITY_CACHE_TTL": "0",
+    "HTTP_MAX_RETRIES": "0",
+    "PAYER_LIMITS_ENABLED": "false",
+    "STATE_DB_PATH": str(state_dir / "state.db"),
+    "RESPONSE_ARCHIVE_PATH": str(state_dir / "archive.db"),
+})
+
+import pandas as pd  # noqa: E402
+from services import delta_check, job_store  # noqa: E402
+from services.job_runner import get_job_runner  # noqa: E402
+from utils.ingestion import SpreadsheetReader  # noqa: E402
+
+NEW_ROWS = 0.03
+CHANGED_ROWS = 0.02
+# Rows asking something else of the payer: another service code, payer ID or NPI
+REQUEST_CHANGES = {"ServiceCode": "33", "PayerID": "87726", "ProviderNPI": "1234567893"}
+
+
+def roster(rows, start=0):
+    return pd.DataFrame({
+        "MemberID": [f"W{100000000 + i}" for i in range(start, start + rows)],
+        "FirstName": "JOHN",
+        "LastName": [f"DOE{i}" for i in range(start, start + rows)],
+        "DOB": "1980-01-02",
+        "ProviderName": "CLINIC",
+        "ProviderNPI": "1999999984",
+        "ServiceCode": "30",
+        "PayerName": "",
+        "PayerID": "60054",
+    })
+
+
+def eligibility_calls():
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/stats") as resp:
+        return json.load(resp)["eligibility"]
+
+
+def run_job(data, carry=None, workers=16):
+    job_id = job_store.create_job(job_store.REALTIME, "roster.csv", workers=workers, source=data)
+    if carry:
+        job_store.carry_rows(job_id, carry)
+    calls = eligibility_calls()
+    start = time.perf_counter()
+    runner = get_job_runner()
+    runner.start(job_id)
+    while runner.is_running(job_id):
+        time.sleep(0.05)
+    return job_id, time.perf_counter() - start, eligibility_calls() - calls
+
+
+def main(rows=2000, seed=0):
+    rng = random.Random(seed)
+    day_one = roster(rows)
+    first_job, _, _ = run_job(day_one.to_csv(index=False).encode())
+    errored = job_store.row_counts(first_job).get("error", 0)
+
+    day_two = pd.concat([day_one, roster(int(rows * NEW_ROWS), start=rows)], ignore_index=True)
+    changed = rng.sample(range(rows), int(rows * CHANGED_ROWS))
+    day_two.loc[changed, "DOB"] = "1980-01-03"
+    unchanged = sorted(set(range(rows)) - set(changed))
+    requested = rng.sample(unchanged, len(REQUEST_CHANGES))
+    for label, (column, value) in zip(requested, REQUEST_CHANGES.items()):
+        day_two.loc[label, column] = value
+    data = day_two.to_csv(index=False).encode()
+
+    _, full_seconds, full_calls = run_job(data)
+
+    start = time.perf_counter()
+    previous = delta_check.job_results_frame(first_job)
+    reader = SpreadsheetReader(io.BytesIO(data), "roster.csv")
+    carry, reasons = delta_check.plan_delta(reader, previous)
+    plan_ms = (time.perf_counter() - start) * 1000
+    # The same plan run tomorrow and three days on: a day-old baseline still stands
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    _, next_day = delta_check.plan_delta(reader, previous, today=tomorrow)
+    _, later = delta_check.plan_delta(reader, previous, today=tomorrow + datetime.timedelta(days=2))
+    reader.close()
+    assert not reasons.loc[requested].eq(delta_check.CARRIED).any(), "changed request fields were carried"
+    assert next_day.eq(delta_check.STALE).sum() == 0, "a day-old baseline was treated as stale"
+    delta_job, delta_seconds, delta_calls = run_job(data, carry=carry)
+    counts = reasons.value_counts().to_dict()
+
+    print(f"day one: {rows} rows, {errored} errored; day two: {len(day_two)} rows "
+          f"({int(rows * NEW_ROWS)} new, {len(changed)} with a corrected DOB)")
+    print(f"delta plan: {counts} in {plan_ms:.0f} ms")
+    print(f"rows with a changed {', '.join(REQUEST_CHANGES)}: {reasons.loc[requested].tolist()}")
+    print(f"planned tomorrow: {next_day.value_counts().to_dict()}")
+    print(f"planned in three days: {later.value_counts().to_dict()}")
+    print(f"{'run':<8}{'calls':>8}{'seconds':>10}")
+    print(f"{'full':<8}{full_calls:>8}{full_seconds:>10.1f}")
+    print(f"{'delta':<8}{delta_calls:>8}{delta_seconds:>10.1f}")
+    marked = pd.DataFrame(job_store.iter_job_results(delta_job, marked=True))
+    print(f"delta job results: {len(marked)} rows, {marked['Refreshed'].value_counts().to_dict()}")
+
+
+if __name__ == "__main__":
+    main()
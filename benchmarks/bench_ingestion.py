@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+
+import openpyxl  # noqa: E402
+import pandas as pd  # noqa: E402
+from services.request_builder import REQUIRED_COLUMNS  # noqa: E402
+from utils.ingestion import SpreadsheetReader  # noqa: E402
+
+
+def write_roster(path, rows):
+    # A regular workbook records its <dimension> like Excel does; write-only ones don't
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(REQUIRED_COLUMNS)
+    for i in range(rows):
+        ws.append([100000 + i, "Ann", "Smith", "1980-01-02", "Clinic", 1234567893, 30,
+                   "Community Health Plan of Washington", "CHPWA"])
+    wb.save(path)
+
+
+def measure(fn, trace=True):
+    if not trace:
+        start = time.perf_counter()
+        return fn(), time.perf_counter() - start, 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(rows=50000):
+    path = Path(tempfile.mkdtemp()) / "roster.xlsx"
+    write_roster(path, rows)
+    csv_path = path.with_suffix(".csv")
+    pd.read_excel(path).to_csv(csv_path, index=False)
+
+    _, full_s, _ = measure(lambda: pd.read_excel(path), trace=False)
+    _, _, full_peak = measure(lambda: pd.read_excel(path))
+    print(f"pd.read_excel (whole sheet)        {full_s:7.2f} s   peak {full_peak / 2**20:7.1f} MiB")
+
+    for target in (path, csv_path):
+        # Time to first chunk includes opening the file, as in the UI
+        _, first_s, _ = measure(lambda: next(SpreadsheetReader(str(target)).chunks()), trace=False)
+        reader = SpreadsheetReader(str(target))
+
+        def stream():
+            count = 0
+            for chunk in reader.chunks():
+                count += len(chunk)
+            return count
+
+        count, stream_s, _ = measure(stream, trace=False)
+        _, _, stream_peak = measure(stream)
+        assert count == rows
+        label = f"streaming {reader.format} first chunk"
+        print(f"{label:<34} {first_s:7.2f} s")
+        print(f"{'streaming ' + reader.format + ' all chunks':<34} {stream_s:7.2f} s   peak {stream_peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+os.chdir(ROOT)
+
+from mock_stedi import serve, urls  # noqa: E402
+
+server = serve(latency="fixed:0")
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ.update(urls(server.server_address[1]))
+state_dir = Path(tempfile.mkdtemp())
+os.environ.update({
+    "STEDI_API_KEY": "bench",
+    "STATE_DB_PATH": str(state_dir / "state.db"),
+    "RESPONSE_ARCHIVE_PATH": "",
+})
+
+import pandas as pd  # noqa: E402
+from services import transaction_manifest  # noqa: E402
+from services.eligibility_service import open_results_cursor, submit_batch  # noqa: E402
+from services.request_builder import iter_batch_items, iter_records, prepare_requests  # noqa: E402
+from ui.batch_eligibility import record_batch_job  # noqa: E402
+from ui.render_batch_results import joined_results  # noqa: E402
+from utils.ingestion import SpreadsheetReader  # noqa: E402
+
+
+def roster(rows):
+    # Two service codes per subscriber, plus columns the API never echoes back
+    return pd.DataFrame({
+        "MemberID": [f"W{100000000 + i // 2}" for i in range(rows)],
+        "FirstName": "JOHN",
+        "LastName": [f"DOE{i // 2}" for i in range(rows)],
+        "DOB": "1980-01-02",
+        "ProviderName": "CLINIC",
+        "ProviderNPI": "1999999984",
+        "ServiceCode": ["30" if i % 2 == 0 else "88" for i in range(rows)],
+        "PayerName": "",
+        "PayerID": "60054",
+        "DOS": [f"2026-10-{1 + i % 28:02d}" for i in range(rows)],
+        "Clinic Notes": [f"note {i}" for i in range(rows)],
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(rows=20000, first_pages=40):
+    df = roster(rows)
+    reader = SpreadsheetReader(io.BytesIO(df.to_csv(index=False).encode()), "roster.csv")
+    items, members, sources, rejected = [], [], [], []
+    for chunk in reader.chunks():
+        prepared, chunk_rejected = prepare_requests(chunk)
+        uploaded = dict(zip(chunk.index, iter_records(chunk, reader.columns)))
+        for item, item_members in iter_batch_items(prepared):
+            items.append(item)
+            members.append(item_members)
+            sources.append([uploaded[label] for label, _ in item_members])
+        rejected.append(chunk_rejected)
+    rejected = pd.concat(rejected)
+
+    response = submit_batch(items)
+    group_id = response["groupId"]
+    _, record_ms = timed(lambda: record_batch_job(group_id, "roster.csv", "bench", response, items, members,
+                                                  rejected, reader.columns, sources))
+
+    cursor = open_results_cursor(group_id, page_size=100)
+    joined, join_ms = [], 0.0
+
+    def fetch(max_pages=None):
+        nonlocal join_ms
+        for page in cursor.pages(max_pages=max_pages):
+            start = time.perf_counter()
+            transaction_manifest.mark_received(item["submitterTransactionIdentifier"] for item in page)
+            joined.extend(joined_results(page, reader.columns))
+            join_ms += (time.perf_counter() - start) * 1000
+
+    fetch(first_pages)
+    missing, missing_ms = timed(lambda: transaction_manifest.missing_rows(group_id))
+    partial = len(joined)
+    fetch()
+    remaining, _ = timed(lambda: transaction_manifest.missing_rows(group_id))
+    # The manifest side of the join on its own, a page of transaction IDs at a time
+    transaction_ids = [item["submitterTransactionIdentifier"] for item in items]
+    _, lookup_ms = timed(lambda: [transaction_manifest.lookup(transaction_ids[i:i + 100])
+                                  for i in range(0, len(transaction_ids), 100)])
+
+    result = pd.DataFrame(joined).sort_values("Row")
+    expected = df.set_index(df.index + 1)
+    aligned = result.set_index("Row")
+    preserved = all((aligned[c].astype(str) == expected.loc[aligned.index, c].astype(str)).all()
+                    for c in ("DOS", "Clinic Notes", "ServiceCode", "MemberID"))
+
+    print(f"{rows} roster rows sent as {len(items)} multi-service requests in {len(response['batches'])} batches")
+    print(f"manifest written in {record_ms:.0f} ms")
+    print(f"after {first_pages} pages: {partial} rows joined, {len(missing)} reported missing in {missing_ms:.1f} ms")
+    print(f"all pages: {len(result)} rows joined in {join_ms:.0f} ms including 271 parsing "
+          f"({join_ms * 1000 / max(len(result), 1):.1f} us per row), {len(remaining)} missing")
+    print(f"manifest lookups alone: {lookup_ms:.0f} ms ({lookup_ms * 1000 / max(len(result), 1):.1f} us per row)")
+    print(f"every uploaded column matches its source row: {preserved}")
+
+
+if __name__ == "__main__":
+    main()
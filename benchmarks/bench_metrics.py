@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+
+from services.metrics import Metrics  # noqa: E402
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(rows=10000, threads=8):
+    # A 10k-row realtime run records about five observations per row
+    # (build share, HTTP, JSON parse, benefit parse, render share)
+    calls = rows * 5
+    enabled, disabled = Metrics(enabled=True), Metrics(enabled=False)
+
+    def timed(m):
+        with m.timer("http.eligibility", payer="60054"):
+            pass
+
+    baseline = per_call_us(lambda: None, calls)
+    print(f"empty call:             {baseline:6.2f} us")
+    print(f"observe (disabled):     {per_call_us(lambda: disabled.observe('parse', 0.01), calls):6.2f} us")
+    print(f"observe (enabled):      {per_call_us(lambda: enabled.observe('parse', 0.01), calls):6.2f} us")
+    timer_us = per_call_us(lambda: timed(enabled), calls)
+    print(f"timer + payer (enabled):{timer_us:6.2f} us")
+
+    # Same load spread over the worker threads, to show lock contention
+    workers = [threading.Thread(target=per_call_us, args=(lambda: timed(enabled), calls // threads))
+               for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    contended_s = time.perf_counter() - start
+    print(f"{calls} timers across {threads} threads: {contended_s * 1000:.1f} ms total")
+    print(f"overhead for a {rows}-row run: ~{timer_us * calls / 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
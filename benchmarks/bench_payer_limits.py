@@ -0,0 +1,95 @@
+import io
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+os.chdir(ROOT)
+
+from mock_stedi import serve, urls  # noqa: E402
+
+# One payer is down and takes DOWN_LATENCY to fail each call; the rest answer quickly
+DOWN_PAYER = "87726"
+DOWN_LATENCY = 1.0
+DOWN_EVERY = 4
+
+server = serve(latency="fixed:0.02", down_payers=[DOWN_PAYER], down_latency=DOWN_LATENCY)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ.update(urls(server.server_address[1]))
+os.environ.update({
+    "STEDI_API_KEY": "bench",
+    "ELIGIBILITY_CACHE_TTL": "0",
+    "MAX_SERVICE_CODES_PER_REQUEST": "1",
+    "HTTP_MAX_RETRIES": "1",
+    "HTTP_BACKOFF_BASE": "0.05",
+    "PAYER_BREAKER_COOLDOWN": "2",
+})
+
+import pandas as pd  # noqa: E402
+from services import payer_limiter  # noqa: E402
+from services.batch_runner import iter_results  # noqa: E402
+from utils.ingestion import SpreadsheetReader  # noqa: E402
+
+
+def roster(rows):
+    df = pd.DataFrame({
+        "MemberID": [f"W{100000000 + i}" for i in range(rows)],
+        "FirstName": "JOHN",
+        "LastName": [f"DOE{i}" for i in range(rows)],
+        "DOB": "1980-01-02",
+        "ProviderName": "CLINIC",
+        "ProviderNPI": "1999999984",
+        "ServiceCode": "30",
+        "PayerName": "",
+        "PayerID": [DOWN_PAYER if i % DOWN_EVERY == 0 else "60054" for i in range(rows)],
+    })
+    return df.to_csv(index=False).encode()
+
+
+def run(data, enabled, workers):
+    payer_limiter._limiters = payer_limiter.PayerLimiters(enabled=enabled)
+    down_before = mock_stats()["down"]
+    reader = SpreadsheetReader(io.BytesIO(data), "roster.csv")
+    start = time.perf_counter()
+    healthy_done = 0.0
+    errors = 0
+    for label, result in iter_results(reader, max_workers=workers):
+        if result["Eligibility Status"] == "Error":
+            errors += 1
+        if label % DOWN_EVERY:
+            healthy_done = time.perf_counter() - start
+    reader.close()
+    return {
+        "seconds": time.perf_counter() - start,
+        "healthy_done": healthy_done,
+        "errors": errors,
+        "down_calls": mock_stats()["down"] - down_before,
+    }
+
+
+def mock_stats():
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/stats") as resp:
+        return json.load(resp)
+
+
+def main(rows=400, workers=8):
+    data = roster(rows)
+    print(f"{rows} rows, 1 in {DOWN_EVERY} for a payer that fails after {DOWN_LATENCY}s, {workers} workers")
+    print(f"{'payer limits':<14}{'total s':>9}{'healthy rows done s':>21}{'calls to down payer':>21}{'errors':>8}")
+    for enabled in (False, True):
+        r = run(data, enabled, workers)
+        print(f"{'on' if enabled else 'off':<14}{r['seconds']:>9.1f}{r['healthy_done']:>21.1f}"
+              f"{r['down_calls']:>21}{r['errors']:>8}")
+    for state in payer_limiter.get_payer_limiters().snapshot():
+        print(state)
+
+
+if __name__ == "__main__":
+    main()
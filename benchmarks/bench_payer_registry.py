@@ -0,0 +1,71 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+
+from utils.payer_registry import PayerRegistry, payers_path  # noqa: E402
+
+
+def legacy_load_payers():
+    with open(payers_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [
+        {
+            "displayName": p["displayName"],
+            "primaryPayerId": p["primaryPayerId"],
+            "eligibility": p["transactionSupport"].get("eligibilityCheck") == "SUPPORTED",
+        }
+        for p in data["items"]
+        if p["transactionSupport"].get("eligibilityCheck") == "SUPPORTED"
+    ]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(repeat=20, rows=10000):
+    payers = legacy_load_payers()
+    names = [random.choice(payers)["displayName"].lower() for _ in range(rows)]
+
+    def legacy_lookup():
+        for name in names:
+            next((p for p in payers if p["displayName"].lower() == name), None)
+
+    snapshot = Path(tempfile.mkdtemp()) / "payers.snapshot"
+    PayerRegistry(snapshot_path=snapshot).refresh()
+    registry = PayerRegistry().refresh()
+
+    def registry_lookup():
+        for name in names:
+            registry.payer_id_for_name(name)
+
+    results = {
+        "legacy load_payers (json.load per rerun)": timed(legacy_load_payers, repeat),
+        "registry cold load (json)": timed(lambda: PayerRegistry().refresh(), repeat),
+        "registry cold load (snapshot)": timed(lambda: PayerRegistry(snapshot_path=snapshot).refresh(), repeat),
+        "registry warm rerun (mtime check)": timed(registry.refresh, repeat * 100),
+    }
+    for label, seconds in results.items():
+        print(f"{label:<45} {seconds * 1000:10.3f} ms")
+
+    legacy = timed(legacy_lookup, 1) / rows
+    indexed = timed(registry_lookup, 3) / rows
+    print(f"{'per-row name lookup (linear scan)':<45} {legacy * 1e6:10.3f} us")
+    print(f"{'per-row name lookup (registry index)':<45} {indexed * 1e6:10.3f} us")
+
+
+if __name__ == "__main__":
+    main()
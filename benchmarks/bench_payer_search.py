@@ -0,0 +1,77 @@
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+
+from utils.payer_registry import get_payer_registry  # noqa: E402
+from utils.payer_search import PayerIndex  # noqa: E402
+
+
+# Names whose trigrams are closest to a different payer's, with the payer they must not resolve to
+TRAPS = {"Health Net": "Network Health"}
+
+
+def roster_spelling(name, rng):
+    # The ways roster payer names drift from displayName
+    choice = rng.random()
+    if choice < 0.25:
+        return name + " Inc"
+    if choice < 0.5:
+        return name.upper()
+    if choice < 0.75:
+        return name.replace("Blue Cross Blue Shield", "BCBS").replace(" of ", " ")
+    return name.lower() + ", LLC"
+
+
+def main(seed=0):
+    rng = random.Random(seed)
+    registry = get_payer_registry()
+    names = [p["displayName"] for p in registry.eligible_payers()]
+
+    start = time.perf_counter()
+    index = PayerIndex(registry.eligible_payers())
+    build_ms = (time.perf_counter() - start) * 1000
+
+    queries = {roster_spelling(name, rng): name for name in names}
+    exact = sum(1 for q in queries if registry.payer_id_for_name(q))
+
+    start = time.perf_counter()
+    resolved = index.resolve_many(queries)
+    resolve_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    index.resolve_many(queries)
+    memo_ms = (time.perf_counter() - start) * 1000
+
+    right = sum(1 for q, payer in resolved.items() if payer and payer["displayName"] == queries[q])
+    wrong = sum(1 for q, payer in resolved.items() if payer and payer["displayName"] != queries[q])
+
+    prefixes = [name[:rng.randint(3, 8)] for name in rng.sample(names, 200)]
+    typeahead = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.search(prefix)
+        typeahead.append((time.perf_counter() - start) * 1000)
+
+    print(f"index build: {build_ms:.0f} ms over {len(names)} eligible payers")
+    print(f"{len(queries)} distinct roster spellings")
+    print(f"  exact lowercase match: {exact:5} resolved")
+    print(f"  fuzzy index:           {right:5} resolved correctly, {wrong} to another payer, "
+          f"{len(queries) - right - wrong} left unresolved")
+    print(f"  resolution: {resolve_ms:.1f} ms cold, {memo_ms:.2f} ms memoized")
+    for trap, wrong_payer in TRAPS.items():
+        payer = index.resolve(trap)
+        outcome = payer["displayName"] if payer else "unresolved"
+        print(f"  trap {trap!r}: {outcome}{' (WRONG)' if outcome == wrong_payer else ''}")
+    print(f"typeahead: median {statistics.median(typeahead):.2f} ms, max {max(typeahead):.2f} ms per query")
+
+
+if __name__ == "__main__":
+    main()
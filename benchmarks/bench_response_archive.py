@@ -0,0 +1,84 @@
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+os.environ.setdefault("RESPONSE_ARCHIVE_PATH", str(Path(tempfile.mkdtemp()) / "archive.db"))
+
+import pandas as pd  # noqa: E402
+from sample_271 import sample_corpus  # noqa: E402
+from services import response_archive  # noqa: E402
+from ui.render_batch_results import RESULT_COLUMNS, flatten_results  # noqa: E402
+
+
+def pages(size, page_size=100):
+    # Poll pages as they would arrive, each item tagged like a batch result
+    corpus = sample_corpus(size)
+    for i, item in enumerate(corpus):
+        item["batchId"] = "bench-batch"
+        item["submitterTransactionIdentifier"] = f"txn-{i:06d}"
+    return [corpus[i:i + page_size] for i in range(0, size, page_size)]
+
+
+def retained(build):
+    # Bytes still held by what build() returns, once its temporaries are gone
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, current
+
+
+def main(size=10000):
+    # Before: every raw response stays in the session alongside its rows
+    def legacy():
+        raw, records = [], []
+        for page in pages(size):
+            raw.extend(page)
+            records.extend(flatten_results(page))
+        return raw, records
+
+    # Now: responses are archived and dropped; the session keeps a compact frame
+    def compact():
+        frames = []
+        for page in pages(size):
+            response_archive.archive("bench-batch", [(item["submitterTransactionIdentifier"], item, None)
+                                                     for item in page])
+            frames.append(pd.DataFrame(flatten_results(page), columns=RESULT_COLUMNS))
+        return pd.concat(frames, ignore_index=True)
+
+    _, legacy_bytes = retained(legacy)
+    frame, _ = retained(compact)
+    # Arrow-backed columns live outside the Python allocator tracemalloc sees
+    compact_bytes = frame.memory_usage(deep=True).sum()
+
+    drill = []
+    for i in range(0, size, max(1, size // 200)):
+        start = time.perf_counter()
+        response_archive.get_response(f"txn-{i:06d}")
+        drill.append((time.perf_counter() - start) * 1000)
+
+    stats = response_archive.stats("bench-batch")
+    print(f"{size} responses, {len(frame)} result rows")
+    print(f"session memory, raw responses + rows: {legacy_bytes / 1e6:8.1f} MB")
+    print(f"session memory, compact frame:        {compact_bytes / 1e6:8.1f} MB  "
+          f"(x{legacy_bytes / max(compact_bytes, 1):.0f} smaller)")
+    print(f"archive: {stats['raw_bytes'] / 1e6:.1f} MB of JSON stored in {stats['stored_bytes'] / 1e6:.1f} MB "
+          f"(x{stats['raw_bytes'] / max(stats['stored_bytes'], 1):.1f})")
+    print(f"drill-down: median {statistics.median(drill):.2f} ms per response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+for key in ("STEDI_API_KEY", "ELIGIBILITY_URL", "POLL_URL"):
+    os.environ.setdefault(key, "bench")
+
+import pandas as pd  # noqa: E402
+from services.request_builder import prepare_requests  # noqa: E402
+from utils.payer_registry import get_payer_registry  # noqa: E402
+
+
+def roster(size, seed=0):
+    # A roster with a few percent of the mistakes payers reject rows for
+    rng = random.Random(seed)
+    payers = [(p["primaryPayerId"], p["displayName"]) for p in get_payer_registry().eligible_payers()[:50]]
+    npis = ["1234567893", "1245319599", "1003000126"]
+    rows = []
+    for i in range(size):
+        bad = rng.random() < 0.05
+        payer_id, payer_name = rng.choice(payers)
+        rows.append({
+            "PayerName": payer_name,
+            "PayerID": payer_id if not bad or i % 3 else "NOPE",
+            "ServiceCode": "30",
+            "MemberID": f"M{i:08d}" if not bad or i % 3 != 1 else "M 1",
+            "FirstName": "Pat",
+            "LastName": "Doe",
+            "DOB": "1980-04-02" if not bad or i % 3 != 2 else "2999-01-01",
+            "ProviderName": "Clinic",
+            "ProviderNPI": rng.choice(npis) if not bad else "1234567890",
+        })
+    return pd.DataFrame(rows)
+
+
+def main(size=50000):
+    df = roster(size)
+    payers = get_payer_registry()
+    prepare_requests(df.head(10), payers)
+
+    start = time.perf_counter()
+    _, rejected = prepare_requests(df, payers)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"{size} rows prepared and validated in {elapsed:.0f} ms ({elapsed * 1000 / size:.1f} us per row)")
+    print(f"{len(rejected)} rejected; most common reasons:")
+    for reason, count in rejected["Reason"].str.split("; ").explode().value_counts().head(5).items():
+        print(f"  {count:6}  {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import io
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+os.chdir(ROOT)
+
+from http.server import ThreadingHTTPServer  # noqa: E402
+from mock_stedi import MockStedi, make_handler, parse_latency, urls  # noqa: E402
+
+# Regression check for the payer limiter as shipped: no PAYER_* setting is
+# overridden here. Healthy payers must not be slowed down or turned away:
+# - one fast payer at 16 workers runs about as fast with limits as without
+# - one slow payer at 64 workers answers every row, none given up on
+# Exits non-zero if either fails.
+MIN_THROUGHPUT_RATIO = 0.8
+
+mock = MockStedi(latency="fixed:0.05", seed=1)
+server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(mock))
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ.update(urls(server.server_address[1]))
+os.environ.update({"STEDI_API_KEY": "bench", "ELIGIBILITY_CACHE_TTL": "0"})
+
+import pandas as pd  # noqa: E402
+from services import payer_limiter  # noqa: E402
+from services.batch_runner import iter_results  # noqa: E402
+from utils.ingestion import SpreadsheetReader  # noqa: E402
+
+
+def roster(rows):
+    return pd.DataFrame({
+        "MemberID": [f"W{100000000 + i}" for i in range(rows)],
+        "FirstName": "JOHN",
+        "LastName": [f"DOE{i}" for i in range(rows)],
+        "DOB": "1980-01-02",
+        "ProviderName": "CLINIC",
+        "ProviderNPI": "1999999984",
+        "ServiceCode": "30",
+        "PayerName": "",
+        "PayerID": "60054",
+    }).to_csv(index=False).encode()
+
+
+def run(data, workers, enabled=True):
+    payer_limiter._limiters = payer_limiter.PayerLimiters(enabled=enabled)
+    reader = SpreadsheetReader(io.BytesIO(data), "roster.csv")
+    start = time.perf_counter()
+    rows = errors = 0
+    for _, result in iter_results(reader, max_workers=workers):
+        rows += 1
+        errors += result["Eligibility Status"] == "Error"
+    reader.close()
+    return rows / (time.perf_counter() - start), errors
+
+
+def busy_payer_waits():
+    # Queue timeouts on a payer with no failures keep waiting for a slot
+    limiter = payer_limiter.PayerLimiter("busy", initial=1, max_limit=1)
+    limiter.acquire()
+    threading.Timer(0.5, limiter.release, args=(payer_limiter.OK, 0.5)).start()
+    try:
+        limiter.acquire(timeout=0.1)
+    except payer_limiter.PayerUnavailable:
+        return False
+    limiter.release(payer_limiter.OK, 0.0)
+    return True
+
+
+def main(rows=400, slow_rows=600):
+    failed = False
+
+    mock.latency = parse_latency("fixed:0.05")
+    data = roster(rows)
+    off, _ = run(data, 16, enabled=False)
+    on, errors = run(data, 16)
+    print(f"fast payer, 16 workers: {on:.1f} rows/s with limits, {off:.1f} without, {errors} errors")
+    if on < off * MIN_THROUGHPUT_RATIO or errors:
+        print("FAIL: the default payer limits throttle a healthy payer")
+        failed = True
+
+    mock.latency = parse_latency("fixed:2")
+    rate, errors = run(roster(slow_rows), 64)
+    print(f"slow payer (2 s), 64 workers: {rate:.1f} rows/s, {errors} errors")
+    if errors:
+        print("FAIL: rows for a slow but healthy payer were given up on")
+        failed = True
+
+    waits = busy_payer_waits()
+    print(f"queue timeout on a busy payer without failures keeps waiting: {waits}")
+    failed = failed or not waits
+
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import io
+import os
+import sys
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+os.chdir(ROOT)
+
+from http.server import ThreadingHTTPServer  # noqa: E402
+from mock_stedi import MockStedi, make_handler, urls  # noqa: E402
+
+# Regression check: a payer with a low rate of transient 5xx answers must not
+# make the limiter turn rows away unsent. Exits non-zero if any row ends as
+# an error that was never sent to the payer.
+ERROR_RATES = (0.02, 0.05)
+
+mock = MockStedi(latency="fixed:0.02", seed=1)
+server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(mock))
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+os.environ.update(urls(server.server_address[1]))
+os.environ.update({"STEDI_API_KEY": "bench", "ELIGIBILITY_CACHE_TTL": "0", "MAX_SERVICE_CODES_PER_REQUEST": "1"})
+
+import pandas as pd  # noqa: E402
+from services import payer_limiter  # noqa: E402
+from services.batch_runner import iter_results  # noqa: E402
+from utils.ingestion import SpreadsheetReader  # noqa: E402
+
+# Comments of rows the limiter refused without sending
+UNSENT = ("skipped", "without sending", "gave up after waiting")
+
+
+def roster(rows):
+    return pd.DataFrame({
+        "MemberID": [f"W{100000000 + i}" for i in range(rows)],
+        "FirstName": "JOHN",
+        "LastName": [f"DOE{i}" for i in range(rows)],
+        "DOB": "1980-01-02",
+        "ProviderName": "CLINIC",
+        "ProviderNPI": "1999999984",
+        "ServiceCode": "30",
+        "PayerName": "",
+        "PayerID": "60054",
+    }).to_csv(index=False).encode()
+
+
+def run(rate, rows, workers):
+    mock.error_5xx = rate
+    calls = mock.stats["eligibility"]
+    payer_limiter._limiters = payer_limiter.PayerLimiters()
+    reader = SpreadsheetReader(io.BytesIO(roster(rows)), "roster.csv")
+    unsent = errors = 0
+    for _, result in iter_results(reader, max_workers=workers):
+        if result["Eligibility Status"] == "Error":
+            errors += 1
+            if any(marker in str(result["Comment"]) for marker in UNSENT):
+                unsent += 1
+    reader.close()
+    return errors, unsent, mock.stats["eligibility"] - calls
+
+
+def main(rows=400, workers=8):
+    failed = False
+    for rate in ERROR_RATES:
+        errors, unsent, calls = run(rate, rows, workers)
+        print(f"5xx rate {rate:.0%}: {rows} rows, {calls} calls, {errors} errors, {unsent} never sent")
+        failed = failed or unsent > 0
+    if failed:
+        print("FAIL: rows were turned away by the payer limiter without being sent")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
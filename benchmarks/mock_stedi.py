@@ -0,0 +1,236 @@
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sample_271 import sample_response  # noqa: E402
+
+ELIGIBILITY_PATH = "/eligibility"
+BATCH_PATH = "/batch-eligibility"
+POLL_PATH = "/polling/batch-eligibility"
+
+
+def parse_latency(spec):
+    # "fixed:0.2", "uniform:0.1,0.5" or "lognormal:<median>,<sigma>" (seconds)
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+class MockStedi:
+    def __init__(self, latency="fixed:0", error_429=0.0, error_5xx=0.0, completion_delay=0.0,
+                 recorded_dir=None, seed=0, down_payers=(), down_latency=0.0):
+        self.latency = parse_latency(latency)
+        # Payers that are "down": every eligibility call for them answers 503
+        # after down_latency seconds (set it past the read timeout to time out)
+        self.down_payers = set(down_payers)
+        self.down_latency = down_latency
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.completion_delay = completion_delay
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.batches = {}
+        self.recorded = []
+        if recorded_dir:
+            for path in sorted(Path(recorded_dir).glob("*.json")):
+                data = json.loads(path.read_text())
+                self.recorded.extend(data if isinstance(data, list) else [data])
+        self.stats = {"eligibility": 0, "batch": 0, "poll": 0, "429": 0, "5xx": 0, "down": 0}
+
+    def draw(self):
+        with self.lock:
+            return self.latency(self.rng), self.rng.random()
+
+    def response_for(self, body):
+        subscriber = body.get("subscriber", {})
+        services = tuple(body.get("encounter", {}).get("serviceTypeCodes") or ["30"])
+        if self.recorded:
+            with self.lock:
+                template = self.rng.choice(self.recorded)
+            response = json.loads(json.dumps(template))
+            response.setdefault("subscriber", {}).update(subscriber)
+        else:
+            response = sample_response(
+                member_id=subscriber.get("memberId", ""),
+                first_name=subscriber.get("firstName", ""),
+                last_name=subscriber.get("lastName", ""),
+                dob=subscriber.get("dateOfBirth", ""),
+                payer_id=body.get("tradingPartnerServiceId", ""),
+                service_type_codes=services,
+                seed=zlib.crc32(f"{subscriber.get('memberId')}|{services}".encode()),
+            )
+        response["tradingPartnerServiceId"] = body.get("tradingPartnerServiceId")
+        return response
+
+    def submit(self, body):
+        batch_id = str(uuid.uuid4())
+        now = time.time()
+        items = body.get("items", [])
+        with self.lock:
+            self.batches[batch_id] = {
+                "items": items,
+                # Items complete one after another, completion_delay apart
+                "ready_at": [now + self.completion_delay * (i + 1) for i in range(len(items))],
+            }
+        return {"batchId": batch_id, "submittedAt": now}
+
+    def poll(self, batch_id, page_size, page_token):
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        now = time.time()
+        ready = sum(1 for t in batch["ready_at"] if t <= now)
+        start = int(page_token or 0)
+        end = min(start + page_size, ready)
+        items = []
+        for item in batch["items"][start:end]:
+            response = self.response_for(item)
+            response["batchId"] = batch_id
+            response["submitterTransactionIdentifier"] = item.get("submitterTransactionIdentifier")
+            items.append(response)
+        page = {"items": items}
+        if end < ready:
+            page["nextPageToken"] = str(end)
+        return page
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload=None, headers=None):
+            body = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _simulate(self, kind):
+            latency, roll = mock.draw()
+            time.sleep(latency)
+            with mock.lock:
+                mock.stats[kind] += 1
+            if roll < mock.error_429:
+                with mock.lock:
+                    mock.stats["429"] += 1
+                self._send(429, {"message": "Too Many Requests"}, {"Retry-After": "0.1"})
+                return False
+            if roll < mock.error_429 + mock.error_5xx:
+                with mock.lock:
+                    mock.stats["5xx"] += 1
+                self._send(503, {"message": "Service Unavailable"})
+                return False
+            return True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            path = urlparse(self.path).path
+            if path == ELIGIBILITY_PATH:
+                if body.get("tradingPartnerServiceId") in mock.down_payers:
+                    time.sleep(mock.down_latency)
+                    with mock.lock:
+                        mock.stats["down"] += 1
+                    self._send(503, {"message": "Payer unavailable"})
+                elif self._simulate("eligibility"):
+                    self._send(200, mock.response_for(body))
+            elif path == BATCH_PATH:
+                if self._simulate("batch"):
+                    self._send(200, mock.submit(body))
+            else:
+                self._send(404, {"message": "Not Found"})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stats":
+                self._send(200, mock.stats)
+                return
+            if url.path != POLL_PATH:
+                self._send(404, {"message": "Not Found"})
+                return
+            if not self._simulate("poll"):
+                return
+            query = parse_qs(url.query)
+            page = mock.poll(
+                query.get("batchId", [""])[0],
+                int(query.get("pageSize", ["100"])[0]),
+                query.get("pageToken", [None])[0],
+            )
+            if page is None:
+                self._send(404, {"message": "Batch not found"})
+            else:
+                self._send(200, page)
+
+    return Handler
+
+
+def serve(port=0, **options):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(MockStedi(**options)))
+    server.daemon_threads = True
+    return server
+
+
+def urls(port):
+    base = f"http://127.0.0.1:{port}"
+    return {
+        "ELIGIBILITY_URL": base + ELIGIBILITY_PATH,
+        "BATCH_ELIGIBILITY_URL": base + BATCH_PATH,
+        "POLL_URL": base + POLL_PATH,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Stedi eligibility endpoints")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:0.3,0.4",
+                        help="fixed:S | uniform:LO,HI | lognormal:MEDIAN,SIGMA (seconds)")
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="fraction of calls answered with 503")
+    parser.add_argument("--completion-delay", type=float, default=0.0,
+                        help="seconds between batch items becoming available to poll")
+    parser.add_argument("--recorded", help="directory of recorded 271 JSON payloads to serve")
+    parser.add_argument("--down-payers", default="", help="comma-separated payer IDs that always answer 503")
+    parser.add_argument("--down-latency", type=float, default=0.0,
+                        help="seconds a down payer takes to answer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = serve(args.port, latency=args.latency, error_429=args.error_429, error_5xx=args.error_5xx,
+                   completion_delay=args.completion_delay, recorded_dir=args.recorded, seed=args.seed,
+                   down_payers=[p for p in args.down_payers.split(",") if p], down_latency=args.down_latency)
+    port = server.server_address[1]
+    for key, value in urls(port).items():
+        print(f"{key}={value}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import io
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = ROOT / "benchmarks"
+RESULTS_DIR = BENCH_DIR / "results"
+SCENARIOS = ["check_eligibility", "batch_realtime", "submit_batch", "poll_batch_results"]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(rows, seconds, latencies):
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 2) if seconds else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def synthetic_sheet(rows):
+    import pandas as pd
+    return pd.DataFrame({
+        "MemberID": [f"W{100000000 + i}" for i in range(rows)],
+        "FirstName": "JOHN",
+        "LastName": [f"DOE{i % 97}" for i in range(rows)],
+        "DOB": "1980-01-02",
+        "ProviderName": "CLINIC",
+        "ProviderNPI": "1999999984",
+        "ServiceCode": [["30", "98", "MH", "UC"][i % 4] for i in range(rows)],
+        "PayerName": "",
+        "PayerID": "60054",
+    })
+
+
+def record_http(metrics, stage, latencies):
+    # Keeps every call of one metrics stage, for exact percentiles
+    observe = metrics.observe
+
+    def record(name, seconds, *args, **kwargs):
+        if name == stage:
+            latencies.append(seconds)
+        observe(name, seconds, *args, **kwargs)
+    metrics.observe = record
+
+
+def timed(fn, latencies):
+    def call(arg):
+        start = time.perf_counter()
+        try:
+            return fn(arg)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return call
+
+
+# Scenarios run in a child process so each reports its own peak RSS
+def run_scenario(name, options):
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+    from services.batch_runner import iter_results
+    from services.benefits import extract
+    from services.eligibility_service import check_eligibility, open_results_cursor, submit_batch
+    from services.metrics import metrics
+    from services.request_builder import build_batch_items, iter_form_data, prepare_requests
+    from utils.ingestion import SpreadsheetReader
+
+    rows, latencies = options["rows"], []
+    start = time.perf_counter()
+
+    if name == "check_eligibility":
+        rows = options["sequential_rows"]
+        prepared, _ = prepare_requests(synthetic_sheet(rows))
+        call = timed(check_eligibility, latencies)
+        errors = sum("error" in call(form) for form in iter_form_data(prepared))
+    elif name == "batch_realtime":
+        # The upload path as the page runs it: chunked reads, grouping,
+        # payer limits and parsing, with each HTTP call's latency recorded
+        buffer = io.BytesIO(synthetic_sheet(rows).to_csv(index=False).encode())
+        reader = SpreadsheetReader(buffer, "roster.csv")
+        record_http(metrics, "http.eligibility", latencies)
+        start = time.perf_counter()
+        rows = errors = 0
+        try:
+            for _, result in iter_results(reader, max_workers=options["concurrency"]):
+                rows += 1
+                errors += result["Eligibility Status"] == "Error"
+        finally:
+            reader.close()
+    elif name in ("submit_batch", "poll_batch_results"):
+        rows = options["batch_rows"]
+        items, _ = build_batch_items(synthetic_sheet(rows))
+        handle = submit_batch(items)
+        errors = len(handle.get("failedChunks", [])) if "error" not in handle else 1
+        if name == "poll_batch_results" and "error" not in handle:
+            start = time.perf_counter()
+            cursor = open_results_cursor(handle["groupId"])
+            page_start = time.perf_counter()
+            for page in cursor.pages():
+                latencies.append(time.perf_counter() - page_start)
+                for item in page:
+                    extract(item)
+                page_start = time.perf_counter()
+            errors += bool(cursor.error)
+    else:
+        raise ValueError(f"Unknown scenario {name}")
+
+    result = summarize(rows, time.perf_counter() - start, latencies)
+    result["errors"] = errors
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+def start_mock(options):
+    cmd = [sys.executable, str(BENCH_DIR / "mock_stedi.py"), "--port", "0", "--latency", options["latency"],
+           "--error-429", str(options["error_429"]), "--error-5xx", str(options["error_5xx"])]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    env = {}
+    while len(env) < 3:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("mock server exited during startup")
+        key, _, value = line.strip().partition("=")
+        env[key] = value
+    return proc, env
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(options, scenarios):
+    proc, urls = start_mock(options)
+    state_dir = tempfile.mkdtemp()
+    env = dict(
+        os.environ, **urls,
+        STEDI_API_KEY="bench",
+        ELIGIBILITY_CACHE_TTL="0",
+        STATE_DB_PATH=os.path.join(state_dir, "state.db"),
+        HTTP_POOL_SIZE=str(max(10, options["concurrency"])),
+        HTTP_BACKOFF_BASE="0.05",
+    )
+    results = {}
+    try:
+        for name in scenarios:
+            out = subprocess.check_output(
+                [sys.executable, __file__, "--scenario", name, "--options", json.dumps(options)], env=env, text=True
+            )
+            results[name] = json.loads(out.strip().splitlines()[-1])
+            print(f"{name:<20} " + "  ".join(f"{k}={v}" for k, v in results[name].items()), flush=True)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results
+
+
+def compare(old_path, new_path):
+    old, new = json.loads(Path(old_path).read_text()), json.loads(Path(new_path).read_text())
+    print(f"{old['revision']} ({old['timestamp']}) -> {new['revision']} ({new['timestamp']})")
+    for name, after in new["results"].items():
+        before = old["results"].get(name, {})
+        for metric in ("rows_per_sec", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"):
+            a, b = before.get(metric), after.get(metric)
+            if a and b:
+                print(f"{name:<20} {metric:<13} {a:>10} -> {b:>10}  ({(b - a) / a * 100:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmarks against the mock Stedi server")
+    parser.add_argument("--rows", type=int, default=500, help="rows for the batch realtime scenario")
+    parser.add_argument("--sequential-rows", type=int, default=50)
+    parser.add_argument("--batch-rows", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", default="lognormal:0.1,0.4")
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-5xx", type=float, default=0.0)
+    parser.add_argument("--only", nargs="*", choices=SCENARIOS)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved result files")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--options", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.scenario:
+        # Retry warnings are expected with error injection; keep scenario output parseable
+        logging.basicConfig(level=logging.ERROR)
+        print(json.dumps(run_scenario(args.scenario, json.loads(args.options))))
+        return
+
+    options = {
+        "rows": args.rows,
+        "sequential_rows": args.sequential_rows,
+        "batch_rows": args.batch_rows,
+        "concurrency": args.concurrency,
+        "latency": args.latency,
+        "error_429": args.error_429,
+        "error_5xx": args.error_5xx,
+    }
+    results = run_suite(options, args.only or SCENARIOS)
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    revision = git_revision()
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = RESULTS_DIR / f"{timestamp}_{revision}.json"
+    path.write_text(json.dumps({"revision": revision, "timestamp": timestamp, "options": options,
+                                "results": results}, indent=2))
+    print(f"Saved {path.relative_to(ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
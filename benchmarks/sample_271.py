@@ -0,0 +1,142 @@
+import random
+
+# Shapes follow Stedi's JSON 271 eligibility response. Values are synthetic
+# but the benefit mix (coverage, deductibles, copays, coinsurance and
+# out-of-pocket across service types, levels and networks) mirrors what
+# commercial payers return.
+SERVICE_TYPES = {
+    "30": "Health Benefit Plan Coverage",
+    "1": "Medical Care",
+    "33": "Chiropractic",
+    "35": "Dental Care",
+    "47": "Hospital",
+    "48": "Hospital - Inpatient",
+    "50": "Hospital - Outpatient",
+    "86": "Emergency Services",
+    "88": "Pharmacy",
+    "98": "Professional (Physician) Visit - Office",
+    "AL": "Vision (Optometry)",
+    "MH": "Mental Health",
+    "UC": "Urgent Care",
+}
+
+PLANS = ["Choice Plus PPO", "Open Access HMO", "Select EPO", "Gold 1500 POS", "Medicare Advantage PPO"]
+OTHER_PAYERS = ["Medicare Part B", "Blue Cross Blue Shield of Texas", "Aetna", "Cigna Healthcare"]
+
+
+def _benefit(code, name, stcs, level=None, network=None, time=None, **extra):
+    benefit = {
+        "code": code,
+        "name": name,
+        "serviceTypeCodes": stcs,
+        "serviceTypes": [SERVICE_TYPES.get(s, s) for s in stcs],
+    }
+    if level:
+        benefit["coverageLevelCode"] = level
+        benefit["coverageLevel"] = {"IND": "Individual", "FAM": "Family"}[level]
+    if network:
+        benefit["inPlanNetworkIndicatorCode"] = network
+        benefit["inPlanNetworkIndicator"] = {"Y": "Yes", "N": "No", "W": "Not Applicable"}[network]
+    if time:
+        benefit["timeQualifierCode"] = time
+        benefit["timeQualifier"] = {"23": "Calendar Year", "29": "Remaining", "27": "Visit"}[time]
+    benefit.update(extra)
+    return benefit
+
+
+def sample_response(member_id="W000000001", first_name="JOHN", last_name="DOE", dob="19800102",
+                    payer_id="60054", service_type_codes=("30",), active=True, seed=None):
+    rng = random.Random(seed)
+    plan = rng.choice(PLANS)
+    year = rng.choice([2025, 2026])
+    benefits = []
+
+    if active:
+        for stc in sorted(set(service_type_codes) | {"30"} | set(rng.sample(list(SERVICE_TYPES), 6))):
+            benefits.append(_benefit("1", "Active Coverage", [stc], level="IND", planCoverage=plan,
+                                     insuranceType="Preferred Provider Organization (PPO)",
+                                     benefitsDateInformation={"plan": f"{year}0101-{year}1231"}))
+    else:
+        benefits.append(_benefit("6", "Inactive", ["30"]))
+
+    for network, factor in (("Y", 1), ("N", 2)):
+        annual = rng.choice([500, 1000, 1500, 3000]) * factor
+        met = rng.randint(0, annual)
+        for level, mult in (("IND", 1), ("FAM", 2)):
+            benefits.append(_benefit("C", "Deductible", ["30"], level, network, "23",
+                                     benefitAmount=str(annual * mult)))
+            benefits.append(_benefit("C", "Deductible", ["30"], level, network, "29",
+                                     benefitAmount=str(max(0, annual * mult - met))))
+            benefits.append(_benefit("G", "Out of Pocket (Stop Loss)", ["30"], level, network, "23",
+                                     benefitAmount=str(annual * mult * 4)))
+        benefits.append(_benefit("A", "Co-Insurance", ["30"], "IND", network,
+                                 benefitPercent=str(0.2 * factor)))
+
+    for stc, copay in (("98", 25), ("UC", 50), ("86", 250), ("MH", 30), ("AL", 10)):
+        benefits.append(_benefit("B", "Co-Payment", [stc], "IND", "Y", "27", benefitAmount=str(copay)))
+        benefits.append(_benefit("B", "Co-Payment", [stc], "IND", "N", "27", benefitAmount=str(copay * 2)))
+
+    benefits.append(_benefit("F", "Limitations", ["33"], "IND", "Y", "23", quantity="20",
+                             quantityQualifier="Visits"))
+    if rng.random() < 0.15:
+        benefits.append(_benefit("R", "Other or Additional Payor", ["30"], benefitsRelatedEntities=[{
+            "entityIdentifier": "Secondary Payer",
+            "entityType": "Non-Person Entity",
+            "entityName": rng.choice(OTHER_PAYERS),
+            "entityIdentification": "MI",
+            "entityIdentificationValue": f"S{rng.randint(10**7, 10**8)}",
+        }], benefitsDateInformation={"coordinationOfBenefits": f"{year}0101"}))
+
+    return {
+        "meta": {
+            "senderId": "STEDI",
+            "submitterId": "117151744",
+            "applicationMode": "production",
+            "traceId": f"{rng.getrandbits(64):016x}",
+            "outboundTraceId": f"{rng.getrandbits(64):016x}",
+        },
+        "controlNumber": f"{rng.randint(1, 999999999):09d}",
+        "reassociationKey": f"{rng.randint(1, 999999999):09d}",
+        "tradingPartnerServiceId": payer_id,
+        "provider": {"providerName": "CLINIC", "entityIdentifier": "Provider", "entityType": "Non-Person Entity",
+                     "npi": "1999999984"},
+        "subscriber": {
+            "memberId": member_id,
+            "firstName": first_name,
+            "lastName": last_name,
+            "gender": rng.choice(["M", "F"]),
+            "entityIdentifier": "Insured or Subscriber",
+            "entityType": "Person",
+            "dateOfBirth": dob,
+            "groupNumber": f"{rng.randint(100000, 999999)}",
+            "address": {"address1": "1 MAIN ST", "city": "AUSTIN", "state": "TX", "postalCode": "78701"},
+        },
+        "payer": {
+            "entityIdentifier": "Payer",
+            "entityType": "Non-Person Entity",
+            "name": "SAMPLE HEALTH PLAN",
+            "federalTaxpayersIdNumber": "411289245",
+            "contactInformation": {"contacts": [{"communicationMode": "Telephone",
+                                                 "communicationNumber": "8008771178"}]},
+        },
+        "planInformation": {"groupNumber": f"{rng.randint(100000, 999999)}", "groupDescription": plan.upper()},
+        "planDateInformation": {"planBegin": f"{year}0101", "planEnd": f"{year}1231",
+                                "eligibilityBegin": f"{year - rng.randint(0, 5)}0101"},
+        "planStatus": [{
+            "statusCode": "1" if active else "6",
+            "status": "Active Coverage" if active else "Inactive",
+            "planDetails": plan,
+            "serviceTypeCodes": list(service_type_codes),
+        }],
+        "benefitsInformation": benefits,
+        "errors": [],
+    }
+
+
+def sample_corpus(size, seed=0):
+    rng = random.Random(seed)
+    return [
+        sample_response(member_id=f"W{i:09d}", active=rng.random() > 0.1,
+                        service_type_codes=(rng.choice(["30", "98", "MH", "UC"]),), seed=seed * 1000003 + i)
+        for i in range(size)
+    ]
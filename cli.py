@@ -0,0 +1,122 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Headless batch runs: no Streamlit import anywhere on this path, and no
+# pandas in the parent, which only finds inputs and hands them out
+from config.settings import BATCH_CONCURRENCY
+from utils.formats import EXPORT_FORMATS, UPLOAD_TYPES, export_format
+
+logger = logging.getLogger("eligibility.cli")
+
+
+def find_inputs(paths):
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix.lower().lstrip(".") in UPLOAD_TYPES))
+        elif path.is_file():
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+    return files
+
+
+def output_paths(inputs, output, fmt=None):
+    output = Path(output)
+    # A single input may name its output file directly; otherwise output is a directory
+    if len(inputs) == 1 and output.suffix and not output.is_dir():
+        return {inputs[0]: (output, export_format(output, fmt))}
+    fmt = export_format(output, fmt or "csv")
+    output.mkdir(parents=True, exist_ok=True)
+    return {path: (output / f"{path.stem}_results.{fmt}", fmt) for path in inputs}
+
+
+def process_file(input_path, output_path, fmt, concurrency):
+    # Imported here so worker processes pay for pandas and the service layer, not the parent
+    from services.batch_runner import RESULT_COLUMNS, iter_results
+    from services.request_builder import missing_columns
+    from utils.export import OrderedSink, open_writer
+    from utils.ingestion import SpreadsheetReader
+
+    start = time.perf_counter()
+    reader = SpreadsheetReader(str(input_path))
+    try:
+        missing = missing_columns(reader.columns)
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        sink = OrderedSink(open_writer(output_path, RESULT_COLUMNS, fmt))
+        rows = errors = 0
+        try:
+            for label, result in iter_results(reader, max_workers=concurrency):
+                sink.add(label, result)
+                rows += 1
+                errors += result["Eligibility Status"] == "Error"
+                if rows % 1000 == 0:
+                    logger.info(f"{input_path.name}: {rows} of {reader.total_rows or '?'} rows checked")
+        finally:
+            sink.close()
+    finally:
+        reader.close()
+
+    return {
+        "input": str(input_path),
+        "output": str(output_path),
+        "rows": rows,
+        "errors": errors,
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run batch eligibility checks without the web UI")
+    parser.add_argument("inputs", nargs="+", help="roster files or directories of them")
+    parser.add_argument("-o", "--output", required=True,
+                        help="output file (single input) or directory; the suffix picks the format")
+    parser.add_argument("-f", "--format", choices=EXPORT_FORMATS, help="output format when writing to a directory")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="concurrent eligibility checks per file")
+    parser.add_argument("-p", "--processes", type=int, default=min(4, os.cpu_count() or 1),
+                        help="files processed in parallel")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    try:
+        inputs = find_inputs(args.inputs)
+        outputs = output_paths(inputs, args.output, args.format)
+    except (FileNotFoundError, ValueError) as e:
+        parser.error(str(e))
+    if not inputs:
+        parser.error("No roster files found")
+
+    failed = 0
+    processes = max(1, min(args.processes, len(inputs)))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {
+            pool.submit(process_file, path, out, fmt, args.concurrency): path
+            for path, (out, fmt) in outputs.items()
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"{path}: {e}")
+                continue
+            logger.info(
+                f"{path.name}: {summary['rows']} rows ({summary['errors']} errors) in {summary['seconds']}s "
+                f"-> {summary['output']}"
+            )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
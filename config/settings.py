@@ -8,6 +8,97 @@ ELIGIBILITY_URL = os.getenv("ELIGIBILITY_URL")
 BATCH_ELIGIBILITY_URL = os.getenv("BATCH_ELIGIBILITY_URL")
 POLL_URL = os.getenv("POLL_URL")
 
+# Optional precompiled payer index; skips parsing payers.json on a cold start.
+PAYER_SNAPSHOT_PATH = os.getenv("PAYER_SNAPSHOT_PATH") or None
+
+# Roster payer names without an exact match are matched approximately; the best
+# payer needs at least this trigram similarity (0-1) and a clear lead over the next
+PAYER_MATCH_THRESHOLD = float(os.getenv("PAYER_MATCH_THRESHOLD", "0.75"))
+
+# Payer IDs this account has completed enrollment with; their eligibility
+# checks are sent even though the payer list marks them ENROLLMENT_REQUIRED
+ENROLLED_PAYER_IDS = frozenset(p.strip().upper() for p in os.getenv("ENROLLED_PAYER_IDS", "").split(",") if p.strip())
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Shared HTTP session: pool size per host, timeouts in seconds, retry policy
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", str(max(10, BATCH_CONCURRENCY))))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+ELIGIBILITY_READ_TIMEOUT = float(os.getenv("ELIGIBILITY_READ_TIMEOUT", "15"))
+BATCH_READ_TIMEOUT = float(os.getenv("BATCH_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+# Eligibility response cache; a TTL of 0 disables it. Set ELIGIBILITY_CACHE_PATH
+# to a SQLite file to keep cached responses across restarts.
+ELIGIBILITY_CACHE_TTL = float(os.getenv("ELIGIBILITY_CACHE_TTL", str(4 * 60 * 60)))
+ELIGIBILITY_CACHE_SIZE = int(os.getenv("ELIGIBILITY_CACHE_SIZE", "5000"))
+ELIGIBILITY_CACHE_PATH = os.getenv("ELIGIBILITY_CACHE_PATH") or None
+
+# Background batch watcher poll intervals, in seconds
+BATCH_WATCH_INITIAL_INTERVAL = float(os.getenv("BATCH_WATCH_INITIAL_INTERVAL", "5"))
+BATCH_WATCH_MAX_INTERVAL = float(os.getenv("BATCH_WATCH_MAX_INTERVAL", "300"))
+BATCH_WATCH_BACKOFF = float(os.getenv("BATCH_WATCH_BACKOFF", "2"))
+# Finished batches stay listed this long before the watcher forgets them
+BATCH_WATCH_RETAIN_FINISHED = float(os.getenv("BATCH_WATCH_RETAIN_FINISHED", "3600"))
+
+# Per-payer limits for real-time checks: an optional token bucket (requests per
+# second, burst size; off by default, set a rate only for a payer with a known
+# quota) and an adaptive concurrency limit. The limit starts at the run's
+# worker count (at least PAYER_INITIAL_CONCURRENCY), grows while calls finish
+# under PAYER_LATENCY_TARGET seconds and halves on 429/5xx/timeouts. After
+# PAYER_BREAKER_FAILURES consecutive failures a payer's calls fail fast for
+# PAYER_BREAKER_COOLDOWN seconds (doubling up to PAYER_BREAKER_MAX_COOLDOWN
+# while it keeps failing). A call queued PAYER_QUEUE_TIMEOUT seconds only
+# gives up if the payer has been failing; a busy healthy payer is waited for.
+PAYER_LIMITS_ENABLED = os.getenv("PAYER_LIMITS_ENABLED", "true").lower() not in ("0", "false", "no")
+PAYER_RATE_LIMIT = float(os.getenv("PAYER_RATE_LIMIT", "0"))
+PAYER_BURST = int(os.getenv("PAYER_BURST", "20"))
+PAYER_INITIAL_CONCURRENCY = int(os.getenv("PAYER_INITIAL_CONCURRENCY", "4"))
+PAYER_MIN_CONCURRENCY = int(os.getenv("PAYER_MIN_CONCURRENCY", "1"))
+PAYER_MAX_CONCURRENCY = int(os.getenv("PAYER_MAX_CONCURRENCY", "64"))
+PAYER_LATENCY_TARGET = float(os.getenv("PAYER_LATENCY_TARGET", "5"))
+PAYER_QUEUE_TIMEOUT = float(os.getenv("PAYER_QUEUE_TIMEOUT", "30"))
+PAYER_BREAKER_FAILURES = int(os.getenv("PAYER_BREAKER_FAILURES", "5"))
+PAYER_BREAKER_COOLDOWN = float(os.getenv("PAYER_BREAKER_COOLDOWN", "30"))
+PAYER_BREAKER_MAX_COOLDOWN = float(os.getenv("PAYER_BREAKER_MAX_COOLDOWN", "300"))
+# Batch realtime rows skipped by an open breaker are retried this many times
+# at the end of the run before they are recorded as errors
+PAYER_DEFER_PASSES = int(os.getenv("PAYER_DEFER_PASSES", "1"))
+
+# Async batch submissions are split into chunks of at most BATCH_CHUNK_SIZE items
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "1000"))
+BATCH_SUBMIT_CONCURRENCY = int(os.getenv("BATCH_SUBMIT_CONCURRENCY", "4"))
+
+# Rows for the same subscriber, payer and provider are sent as one request
+# carrying up to this many service type codes; 1 sends one request per row
+MAX_SERVICE_CODES_PER_REQUEST = int(os.getenv("MAX_SERVICE_CODES_PER_REQUEST", "10"))
+
+# Uploaded rosters are read and dispatched in chunks of this many rows
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "1000"))
+
+# Local SQLite file for submission groups and other state that outlives a session
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "eligibility_state.db")
+
+# Saved jobs and results, submission manifests and archived raw responses are
+# purged once they are this many days old; 0 keeps them until deleted
+STATE_RETENTION_DAYS = float(os.getenv("STATE_RETENTION_DAYS", "30"))
+
+# Delta re-checks send a row again when its earlier result was checked more
+# than this many calendar days ago; 1 reuses yesterday's results, 0 only today's
+DELTA_MAX_AGE_DAYS = int(os.getenv("DELTA_MAX_AGE_DAYS", "1"))
+
+# Compressed archive of raw 271 responses for drill-down and audit; set it
+# empty to keep no raw responses
+RESPONSE_ARCHIVE_PATH = os.getenv("RESPONSE_ARCHIVE_PATH", "eligibility_archive.db") or None
+
+# Result exports are built in memory up to this size, then in a private temp file
+EXPORT_SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", str(32 * 1024 * 1024)))
+
+# In-process timing and counters shown on the Diagnostics tab
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+
 if not ELIGIBILITY_URL:
     raise ValueError("ELIGIBILITY_URL not found in .env")
 if not STEDI_API_KEY:
@@ -0,0 +1,45 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config.settings import BATCH_CONCURRENCY
+from services.eligibility_service import check_eligibility
+from services.http_session import ensure_pool_size
+from services.payer_limiter import get_payer_limiters
+
+logger = logging.getLogger(__name__)
+
+
+# Yields (index, result) as each call completes. Only a small window of
+# `items` is pulled ahead of the workers, so lazy iterators are consumed
+# incrementally; exceptions come back as {"error": ...} like the service calls.
+def run_concurrently(fn, items, max_workers=None):
+    max_workers = max(1, int(max_workers or BATCH_CONCURRENCY))
+    items = iter(enumerate(items))
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="eligibility") as pool:
+        def fill():
+            while len(pending) < max_workers * 2:
+                try:
+                    idx, item = next(items)
+                except StopIteration:
+                    return
+                pending[pool.submit(fn, item)] = idx
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                idx = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    logger.error(f"Row {idx} failed: {e}")
+                    result = {"error": str(e)}
+                yield idx, result
+            fill()
+
+
+def run_eligibility_checks(form_rows, max_workers=None):
+    ensure_pool_size(int(max_workers or BATCH_CONCURRENCY))
+    get_payer_limiters().expect_workers(int(max_workers or BATCH_CONCURRENCY))
+    return run_concurrently(check_eligibility, form_rows, max_workers=max_workers)
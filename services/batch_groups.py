@@ -0,0 +1,64 @@
+import time
+from services import state_db
+
+_lock = state_db.lock
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS batch_groups ("
+    " group_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, batch_id TEXT NOT NULL,"
+    " item_count INTEGER NOT NULL, created_at REAL NOT NULL,"
+    " PRIMARY KEY (group_id, chunk_index))",
+]
+
+
+def _db():
+    return state_db.connect(__name__, SCHEMA)
+
+
+def record_group(group_id, chunks):
+    # chunks: [(chunk_index, batch_id, item_count), ...] for the chunks that were accepted
+    now = time.time()
+    with _lock:
+        db = _db()
+        db.executemany(
+            "INSERT OR REPLACE INTO batch_groups (group_id, chunk_index, batch_id, item_count, created_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [(group_id, idx, batch_id, count, now) for idx, batch_id, count in chunks],
+        )
+        db.commit()
+
+
+def get_group(group_id):
+    with _lock:
+        rows = _db().execute(
+            "SELECT batch_id, item_count FROM batch_groups WHERE group_id = ? ORDER BY chunk_index",
+            (group_id,),
+        ).fetchall()
+    return [{"batchId": batch_id, "itemCount": count} for batch_id, count in rows]
+
+
+def list_groups(limit=50):
+    with _lock:
+        rows = _db().execute(
+            "SELECT group_id, COUNT(*), SUM(item_count), MIN(created_at) FROM batch_groups"
+            " GROUP BY group_id ORDER BY MIN(created_at) DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    return [
+        {"groupId": group_id, "batches": batches, "items": items, "createdAt": created_at}
+        for group_id, batches, items, created_at in rows
+    ]
+
+
+def delete_group(group_id):
+    with _lock:
+        db = _db()
+        db.execute("DELETE FROM batch_groups WHERE group_id = ?", (group_id,))
+        db.commit()
+
+
+def purge(before):
+    with _lock:
+        db = _db()
+        db.execute("DELETE FROM batch_groups WHERE created_at < ?", (before,))
+        db.commit()
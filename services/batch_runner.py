@@ -0,0 +1,136 @@
+import time
+from collections import deque
+from itertools import count
+import numpy as np
+from config.settings import PAYER_DEFER_PASSES
+from services.batch_executor import run_eligibility_checks
+from services.benefits import extract
+from services.metrics import metrics
+from services.request_builder import group_requests, iter_records, prepare_requests
+
+
+def result_row(row, eligibility_status=np.nan, comment=np.nan, **fields):
+    result = {
+        "DOS": np.nan,
+        "Patient's Name": f"{row['FirstName']} {row['LastName']}",
+        "DOB": row["DOB"],
+        "Primary Insurance Name": row["PayerName"],
+        "Member ID": row["MemberID"],
+        "Plan Name & Type": np.nan,
+        "Remaining Deductible": np.nan,
+        "Co-pay": np.nan,
+        "Referral Required": np.nan,
+        "Active Date": np.nan,
+        "Termination Date": np.nan,
+        "Outstanding Balance": np.nan,
+        "Eligibility Status": fields.pop("Eligibility Status", eligibility_status),
+        "Secondary Insurance Name": np.nan,
+        "Member ID (Secondary)": np.nan,
+        "Active Date (Secondary)": np.nan,
+        "Termination Date (Secondary)": np.nan,
+        "Eligibility Status (Secondary)": np.nan,
+        "Comment": comment,
+        # What was asked, as entered, so an export can be the baseline of a delta re-check
+        "Payer ID": row.get("PayerID", np.nan),
+        "Service Code": row.get("ServiceCode", np.nan),
+        "Provider NPI": row.get("ProviderNPI", np.nan),
+    }
+    result.update(fields)
+    return result
+
+
+RESULT_COLUMNS = list(result_row({"FirstName": "", "LastName": "", "DOB": "", "PayerName": "", "MemberID": ""}))
+
+
+def parse_response(row, response, service=None):
+    if "error" in response:
+        return result_row(row, eligibility_status="Error", comment=response["error"])
+    return result_row(row, **extract(response, service=service))
+
+
+# Yields (row label, result row) as checks complete, in completion order.
+# Chunks are read, built and dispatched as the executor asks for more work,
+# so checks start before the whole file has been read. Rows of a chunk that
+# share a subscriber, payer and provider go out as one multi-code request
+# whose response is fanned back out to each row. Rows that can't be
+# turned into a request fail locally, without an API call. Labels in `skip`
+# (already checked) are never sent; once `stop` is set no new rows are sent,
+# but checks already in flight still complete and are yielded. Requests a
+# payer's circuit breaker refused are retried at the end of the run, once the
+# breaker lets calls through again; rows still deferred after
+# PAYER_DEFER_PASSES retries come back as errors. on_response, if given, is
+# called with (transaction ID, raw response, row labels) for every response
+# the payer returned, before its rows are yielded. payer_matches are the
+# confirmed approximate payer name matches, see prepare_requests.
+def iter_results(reader, max_workers=None, skip=None, stop=None, on_response=None, payer_matches=None):
+    rows = {}
+    members = {}
+    sent = count()
+    local = deque()
+    deferred = []
+
+    def stopped():
+        return stop is not None and stop.is_set()
+
+    def form_rows():
+        for chunk in metrics.timed_iter("ingest", reader.chunks()):
+            if stopped():
+                return
+            if skip:
+                chunk = chunk[~chunk.index.isin(skip)]
+                if chunk.empty:
+                    continue
+            with metrics.timer("build"):
+                prepared, rejected = prepare_requests(chunk, payer_matches=payer_matches)
+                grouped = group_requests(prepared)
+            rows.update(zip(chunk.index, iter_records(chunk, list(chunk.columns))))
+            for label, reason in rejected["Reason"].items():
+                local.append((label, result_row(rows.pop(label), eligibility_status="Error", comment=reason)))
+            for form_data, request_members in grouped:
+                if stopped():
+                    return
+                members[next(sent)] = (form_data, request_members)
+                yield form_data
+
+    def results(response, request_members):
+        for label, service in request_members:
+            row = rows.pop(label)
+            try:
+                with metrics.timer("parse"):
+                    result = parse_response(row, response, service)
+            except Exception as e:
+                result = result_row(row, eligibility_status="Error", comment=str(e))
+            yield label, result
+
+    def dispatch(requests):
+        for i, response in run_eligibility_checks(requests, max_workers=max_workers):
+            while local:
+                yield local.popleft()
+            form_data, request_members = members.pop(i)
+            if response.get("retryAt") and passes_left:
+                deferred.append((response["retryAt"], form_data, request_members))
+                continue
+            if on_response is not None and "error" not in response:
+                on_response(form_data["transaction_id"], response, [label for label, _ in request_members])
+            yield from results(response, request_members)
+
+    passes_left = PAYER_DEFER_PASSES
+    yield from dispatch(form_rows())
+    while local:
+        yield local.popleft()
+
+    while deferred and not stopped():
+        # Wait for the breakers to half-open, then send the deferred requests again
+        delay = max(retry_at for retry_at, _, _ in deferred) - time.time()
+        if delay > 0:
+            metrics.incr("payer_deferred", len(deferred))
+            if stop is not None:
+                if stop.wait(delay):
+                    return
+            else:
+                time.sleep(delay)
+        passes_left -= 1
+        retry = deferred[:]
+        deferred.clear()
+        members.update(enumerate((form_data, request_members) for _, form_data, request_members in retry))
+        yield from dispatch(form_data for _, form_data, _ in retry)
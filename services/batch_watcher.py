@@ -0,0 +1,233 @@
+import hashlib
+import heapq
+import json
+import logging
+import random
+import threading
+import time
+from config.settings import (
+    BATCH_WATCH_INITIAL_INTERVAL,
+    BATCH_WATCH_MAX_INTERVAL,
+    BATCH_WATCH_BACKOFF,
+    BATCH_WATCH_RETAIN_FINISHED,
+)
+from services import response_archive, transaction_manifest
+from services.eligibility_service import BatchResultsCursor
+
+logger = logging.getLogger(__name__)
+
+# Without a known item count a batch is treated as finished once this many
+# consecutive full walks turn up no new results.
+STABLE_POLLS_WITHOUT_TOTAL = 3
+
+
+def result_key(item):
+    # Results are rebuilt on every walk, so one without a transaction ID is
+    # recognised by its content: the subscriber and trace numbers, or failing
+    # those the whole result
+    transaction_id = item.get("submitterTransactionIdentifier")
+    if transaction_id:
+        return transaction_id
+    content = {k: item[k] for k in ("subscriber", "subscriberTraceNumbers", "controlNumber") if item.get(k)} or item
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class WatchedBatch:
+    def __init__(self, batch_id, expected_items=None):
+        self.batch_id = batch_id
+        self.expected_items = expected_items
+        self.status = "pending"
+        self.seen = set()
+        self.cursor = None
+        self.polls = 0
+        self.stable_polls = 0
+        self.interval = BATCH_WATCH_INITIAL_INTERVAL
+        self.next_poll = time.time()
+        self.last_polled = None
+        self.error = None
+        self.finished_at = None
+        self.subscribers = []
+
+    @property
+    def finished(self):
+        return self.status in ("complete", "stopped")
+
+    def finish(self, status):
+        self.status = status
+        self.finished_at = time.time()
+
+    def snapshot(self):
+        return {
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "completed_items": len(self.seen),
+            "expected_items": self.expected_items,
+            "polls": self.polls,
+            "last_polled": self.last_polled,
+            "next_poll": None if self.finished else self.next_poll,
+            "error": self.error,
+        }
+
+
+class BatchWatcher:
+    # One scheduler thread serves every watched batch from a heap ordered by
+    # next poll time.
+    def __init__(self):
+        self._batches = {}
+        self._heap = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="batch-watcher", daemon=True)
+            self._thread.start()
+
+    def _evict(self):
+        # Caller holds the lock
+        cutoff = time.time() - BATCH_WATCH_RETAIN_FINISHED
+        for batch_id in [b.batch_id for b in self._batches.values() if b.finished and b.finished_at < cutoff]:
+            del self._batches[batch_id]
+
+    def watch(self, batch_id, expected_items=None):
+        with self._cond:
+            self._evict()
+            batch = self._batches.get(batch_id)
+            if batch is None or batch.finished:
+                batch = WatchedBatch(batch_id, expected_items)
+                self._batches[batch_id] = batch
+                heapq.heappush(self._heap, (batch.next_poll, batch_id))
+                self._ensure_thread()
+                self._cond.notify()
+            elif expected_items is not None:
+                batch.expected_items = expected_items
+            return batch.snapshot()
+
+    def unwatch(self, batch_id):
+        with self._cond:
+            batch = self._batches.get(batch_id)
+            if batch and not batch.finished:
+                batch.finish("stopped")
+        self._notify(batch)
+
+    def subscribe(self, batch_id, callback):
+        with self._cond:
+            batch = self._batches[batch_id]
+            batch.subscribers.append(callback)
+
+        def unsubscribe():
+            with self._cond:
+                if callback in batch.subscribers:
+                    batch.subscribers.remove(callback)
+        return unsubscribe
+
+    def status(self, batch_id=None):
+        with self._cond:
+            self._evict()
+            if batch_id is not None:
+                batch = self._batches.get(batch_id)
+                return batch.snapshot() if batch else None
+            return [b.snapshot() for b in self._batches.values()]
+
+    def _notify(self, batch):
+        if batch is None:
+            return
+        snapshot = self.status(batch.batch_id)
+        for callback in list(batch.subscribers):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Batch watcher subscriber failed for {batch.batch_id}: {e}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due, batch_id = self._heap[0]
+                delay = due - time.time()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+                heapq.heappop(self._heap)
+                batch = self._batches.get(batch_id)
+                if batch is None or batch.finished or batch.next_poll != due:
+                    continue
+                batch.status = "running"
+
+            try:
+                self._poll(batch)
+            except Exception as e:
+                # One bad batch must not take the scheduler thread down with it
+                logger.error(f"Batch watcher poll failed for {batch.batch_id}: {e}")
+                with self._cond:
+                    batch.polls += 1
+                    batch.last_polled = time.time()
+                    batch.error = str(e)
+                    batch.status = "error"
+                    batch.interval = min(BATCH_WATCH_MAX_INTERVAL, batch.interval * BATCH_WATCH_BACKOFF)
+                    batch.next_poll = batch.last_polled + batch.interval * random.uniform(0.8, 1.2)
+            self._notify(batch)
+
+            with self._cond:
+                if not batch.finished:
+                    heapq.heappush(self._heap, (batch.next_poll, batch_id))
+
+    def _poll(self, batch):
+        if batch.cursor is None or batch.cursor.done:
+            batch.cursor = BatchResultsCursor(batch.batch_id)
+        before = len(batch.seen)
+
+        for page in batch.cursor.pages():
+            # Every walk after the first starts from page one again; only
+            # results not seen on an earlier walk are new
+            new = [item for item in page if result_key(item) not in batch.seen]
+            transaction_ids = [item["submitterTransactionIdentifier"]
+                               for item in new if item.get("submitterTransactionIdentifier")]
+            # Keep the raw responses while we have them, for drill-down later,
+            # and tick their rows off the submission's manifest. Results only
+            # count as seen once kept, so a failed page is picked up next walk
+            if transaction_ids:
+                response_archive.archive(batch.batch_id, [
+                    (item["submitterTransactionIdentifier"], item, None)
+                    for item in new if item.get("submitterTransactionIdentifier")
+                ])
+                transaction_manifest.mark_received(transaction_ids)
+            for item in new:
+                batch.seen.add(result_key(item))
+
+        with self._cond:
+            batch.polls += 1
+            batch.last_polled = time.time()
+            batch.error = batch.cursor.error
+            progressed = len(batch.seen) > before
+
+            if batch.expected_items is not None and len(batch.seen) >= batch.expected_items:
+                batch.finish("complete")
+            elif batch.expected_items is None and batch.cursor.done and batch.seen:
+                batch.stable_polls = 0 if progressed else batch.stable_polls + 1
+                if batch.stable_polls >= STABLE_POLLS_WITHOUT_TOTAL:
+                    batch.finish("complete")
+            if batch.finished:
+                return
+
+            # Stay quick while results are arriving, back off while idle or failing
+            if progressed and not batch.error:
+                batch.interval = max(BATCH_WATCH_INITIAL_INTERVAL, batch.interval / BATCH_WATCH_BACKOFF)
+            else:
+                batch.interval = min(BATCH_WATCH_MAX_INTERVAL, batch.interval * BATCH_WATCH_BACKOFF)
+            batch.next_poll = batch.last_polled + batch.interval * random.uniform(0.8, 1.2)
+            batch.status = "error" if batch.error else "waiting"
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_batch_watcher():
+    global _watcher
+    if _watcher is None:
+        with _watcher_lock:
+            if _watcher is None:
+                _watcher = BatchWatcher()
+    return _watcher
@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+
+# X12 271 benefit codes used by the field specs below
+ACTIVE_COVERAGE = "1"
+INACTIVE = "6"
+COPAY = "B"
+DEDUCTIBLE = "C"
+OTHER_PAYER = "R"
+
+# In-network indicators that apply to an in-network visit ("W": applies
+# either way), and the time qualifier of an amount still to be met
+IN_NETWORK = ("Y", "W")
+REMAINING = "29"
+
+# Stands in for the service type code that was asked for on the request
+REQUESTED_SERVICE = "requested"
+
+ANY = None
+
+# Benefit fields behind the key components after the service type code
+CHECK_FIELDS = ("coverageLevelCode", "inPlanNetworkIndicatorCode", "timeQualifierCode")
+
+
+class FieldSpec:
+    # A benefit lookup. ANY matches every value of that key component; a spec
+    # list is tried in order, so specific specs can fall back to looser ones.
+    def __init__(self, code, service_type=ANY, coverage_level=ANY, in_network=ANY, time_qualifier=ANY,
+                 field="benefitAmount"):
+        self.code = code
+        self.key = (service_type, coverage_level, in_network, time_qualifier)
+        self.field = field
+        # (benefit field, value) pairs checked after the code/service lookup
+        self.checks = tuple((name, part) for name, part in zip(CHECK_FIELDS, self.key[1:]) if part is not ANY)
+
+
+# Both lists stop at the patient's own in-network benefit for the services
+# asked about: a family, out-of-network, calendar-year total or other
+# service's amount would fill the column with a different benefit
+def _deductible(*service_types):
+    return [FieldSpec(DEDUCTIBLE, stc, "IND", network, REMAINING)
+            for stc in service_types for network in IN_NETWORK]
+
+
+def _copay(*service_types):
+    return [FieldSpec(COPAY, stc, ANY, network) for stc in service_types for network in IN_NETWORK]
+
+
+# Output column -> specs; these fill the batch result columns
+DEFAULT_FIELDS = {
+    "Plan Name & Type": [FieldSpec(ACTIVE_COVERAGE, REQUESTED_SERVICE, field="planCoverage"),
+                         FieldSpec(ACTIVE_COVERAGE, field="planCoverage")],
+    "Remaining Deductible": _deductible(REQUESTED_SERVICE, "30"),
+    "Co-pay": _copay(REQUESTED_SERVICE, "30"),
+}
+
+
+class BenefitIndex:
+    # One pass groups benefits by code. The codes specs look up by service
+    # type code (the part of the key every service-specific spec pins down)
+    # are then indexed on it the first time they're asked for; the few
+    # benefits under a service are checked against the rest of the spec's key
+    def __init__(self, response):
+        self.response = response
+        self.by_code = by_code = {}
+        for benefit in response.get("benefitsInformation") or ():
+            code = benefit.get("code")
+            if code in by_code:
+                by_code[code].append(benefit)
+            else:
+                by_code[code] = [benefit]
+        # code -> service type code -> benefits
+        self._by_service = {}
+
+    def _services(self, code):
+        services = self._by_service[code] = {}
+        for benefit in self.by_code.get(code, ()):
+            for stc in benefit.get("serviceTypeCodes") or (None,):
+                if stc in services:
+                    services[stc].append(benefit)
+                else:
+                    services[stc] = [benefit]
+        return services
+
+    def find(self, spec, service=None):
+        service_type = spec.key[0]
+        if service_type is ANY:
+            candidates = self.by_code.get(spec.code, ())
+        else:
+            if service_type == REQUESTED_SERVICE:
+                if not service:
+                    return []
+                service_type = service
+            services = self._by_service.get(spec.code)
+            if services is None:
+                services = self._services(spec.code)
+            candidates = services.get(service_type, ())
+        checks = spec.checks
+        if not checks:
+            return candidates
+        found = []
+        for benefit in candidates:
+            get = benefit.get
+            for name, part in checks:
+                if get(name) != part:
+                    break
+            else:
+                found.append(benefit)
+        return found
+
+    def value(self, specs, service=None):
+        for spec in specs:
+            for benefit in self.find(spec, service):
+                value = benefit.get(spec.field)
+                if value not in (None, ""):
+                    return value
+        return np.nan
+
+    def has(self, code):
+        return code in self.by_code
+
+    def status(self):
+        if self.has(ACTIVE_COVERAGE):
+            return "Active"
+        if self.has(INACTIVE):
+            return "Inactive"
+        for plan in self.response.get("planStatus") or []:
+            if plan.get("statusCode") == ACTIVE_COVERAGE:
+                return "Active"
+            if plan.get("statusCode") == INACTIVE:
+                return "Inactive"
+        return np.nan
+
+    def coverage_dates(self):
+        dates = self.response.get("planDateInformation") or {}
+        begin = dates.get("eligibilityBegin") or dates.get("planBegin")
+        # Only an eligibility end terminates coverage; a plan end is just the
+        # end of the plan year, so without one the termination date stays empty
+        end = dates.get("eligibilityEnd")
+        if not begin:
+            for benefit in self.find(FieldSpec(ACTIVE_COVERAGE)):
+                info = benefit.get("benefitsDateInformation") or {}
+                begin = info.get("eligibilityBegin") or info.get("planBegin")
+                end = end or info.get("eligibilityEnd")
+                # "plan" carries a YYYYMMDD-YYYYMMDD range
+                if not begin and info.get("plan"):
+                    begin = info["plan"].partition("-")[0]
+                if begin:
+                    break
+        return begin or np.nan, end or np.nan
+
+    def secondary_insurance(self):
+        for benefit in self.find(FieldSpec(OTHER_PAYER)):
+            for entity in benefit.get("benefitsRelatedEntities") or []:
+                if not entity.get("entityName"):
+                    continue
+                member_id = np.nan
+                if entity.get("entityIdentification") == "MI":
+                    member_id = entity.get("entityIdentificationValue", np.nan)
+                info = benefit.get("benefitsDateInformation") or {}
+                return {
+                    "Secondary Insurance Name": entity["entityName"],
+                    "Member ID (Secondary)": member_id,
+                    "Active Date (Secondary)": info.get("benefitBegin") or info.get("coordinationOfBenefits", np.nan),
+                    "Termination Date (Secondary)": info.get("benefitEnd", np.nan),
+                    "Eligibility Status (Secondary)": "Active",
+                }
+        return {}
+
+
+def extract(response, fields=None, service=None):
+    index = BenefitIndex(response)
+    active, terminated = index.coverage_dates()
+    result = {column: index.value(specs, service) for column, specs in (fields or DEFAULT_FIELDS).items()}
+    result.update({
+        "Active Date": active,
+        "Termination Date": terminated,
+        "Eligibility Status": index.status(),
+    })
+    result.update(index.secondary_insurance())
+    return result
+
+
+def extract_many(responses, fields=None, services=None):
+    services = services if services is not None else [None] * len(responses)
+    return pd.DataFrame(
+        [extract(response, fields, service) for response, service in zip(responses, services)]
+    )
+
+
+BENEFIT_COLUMNS = ["name", "coverageLevel", "benefitAmount", "benefitPercent", "inPlanNetworkIndicator", "serviceTypes"]
+
+
+def benefit_table(response):
+    rows = []
+    for benefit in response.get("benefitsInformation") or []:
+        row = {column: benefit.get(column, "") for column in BENEFIT_COLUMNS}
+        if isinstance(row["serviceTypes"], list):
+            row["serviceTypes"] = ", ".join(row["serviceTypes"])
+        rows.append(row)
+    return rows
@@ -0,0 +1,143 @@
+import datetime
+import io
+import numpy as np
+import pandas as pd
+from config.settings import DELTA_MAX_AGE_DAYS
+from services import job_store
+from services.batch_runner import RESULT_COLUMNS
+from services.request_builder import iter_records
+from utils.ingestion import SpreadsheetReader
+from utils.payer_search import normalize_name
+
+# Delta re-checks match a new roster against earlier results row by row and
+# only send the rows whose result can't be reused. Rows are matched on payer
+# name, member ID and service code (numbered when that repeats); the
+# patient's name, DOB, payer ID and provider NPI decide whether a matched
+# row changed.
+
+# Result columns a previous results file needs for matching
+MATCH_COLUMNS = [
+    "Primary Insurance Name", "Member ID", "Patient's Name", "DOB", "Eligibility Status",
+    "Payer ID", "Service Code", "Provider NPI",
+]
+# Roster columns behind the result columns that older job results don't carry
+SOURCE_COLUMNS = {"Payer ID": "PayerID", "Service Code": "ServiceCode", "Provider NPI": "ProviderNPI"}
+
+# Why a row is sent again, in the order they're checked
+NEW = "new"
+CHANGED = "changed"
+ERRORED = "errored"
+STALE = "stale"
+CARRIED = "carried"
+
+
+def _ids(series):
+    # Excel turns numeric member IDs into floats; compare them as digits
+    text = series.astype("string").fillna("").str.strip().str.replace(r"\.0$", "", regex=True)
+    return text.str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+
+
+def _payers(series):
+    text = series.astype("string").fillna("")
+    return text.map({name: normalize_name(name) for name in text.unique()})
+
+
+def _names(series):
+    text = series.astype("string").fillna("").str.upper()
+    return text.str.replace(r"[^A-Z0-9]+", " ", regex=True).str.strip()
+
+
+def _dates(series):
+    parsed = pd.to_datetime(series.astype("string"), errors="coerce", format="mixed")
+    return parsed.dt.strftime("%Y-%m-%d").fillna("")
+
+
+def _keyed(payer, member_id, service, name, dob, payer_id, npi):
+    keys = pd.DataFrame({"key": _payers(payer) + "|" + _ids(member_id) + "|" + _ids(service)})
+    keys["fingerprint"] = _names(name) + "|" + _dates(dob) + "|" + _ids(payer_id) + "|" + _ids(npi)
+    return keys
+
+
+def _numbered(keys):
+    # A subscriber's rows pair up with their earlier results in order
+    keys["key"] = keys["key"] + "|" + keys.groupby("key").cumcount().astype("string")
+    return keys
+
+
+def job_results_frame(job_id):
+    rows = list(job_store.iter_job_results(job_id, marked=True, labels=True))
+    frame = pd.DataFrame([result for _, result in rows])
+    missing = [c for c in SOURCE_COLUMNS if c not in frame.columns or frame[c].isna().all()]
+    name, data = job_store.job_source(job_id)
+    if rows and missing and data is not None:
+        # Results recorded before they carried these columns; take them from the upload
+        reader = SpreadsheetReader(io.BytesIO(data), name)
+        try:
+            source = pd.concat(list(reader.chunks())).reindex([label for label, _ in rows])
+        finally:
+            reader.close()
+        for column in missing:
+            frame[column] = source[SOURCE_COLUMNS[column]].to_numpy()
+    return frame.reindex(columns=list(frame.columns) + [c for c in SOURCE_COLUMNS if c not in frame.columns])
+
+
+def results_file_frame(reader, checked_at):
+    # An exported results file; rows without a Checked At count as checked at checked_at
+    frames = list(reader.chunks())
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=MATCH_COLUMNS)
+    missing = [c for c in MATCH_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Results file is missing columns: {', '.join(missing)}")
+    checked_at = pd.Timestamp(checked_at).strftime("%Y-%m-%d %H:%M:%S")
+    if "Checked At" in frame.columns:
+        frame["Checked At"] = frame["Checked At"].astype("string").fillna(checked_at)
+    else:
+        frame["Checked At"] = checked_at
+    return frame
+
+
+# Decides which rows of the roster in `reader` need checking again, given
+# `previous` results (job_results_frame or results_file_frame). Returns
+# (carry, reasons): carry is [(row label, result, checked_at)] for rows whose
+# earlier result still stands, ready for job_store.carry_rows; reasons maps
+# each row label to NEW, CHANGED, ERRORED, STALE or CARRIED.
+def plan_delta(reader, previous, max_age_days=DELTA_MAX_AGE_DAYS, today=None):
+    chunks = [
+        _keyed(chunk["PayerName"], chunk["MemberID"], chunk["ServiceCode"],
+               chunk["FirstName"].astype("string").fillna("") + " " + chunk["LastName"].astype("string").fillna(""),
+               chunk["DOB"], chunk["PayerID"], chunk["ProviderNPI"]).set_index(chunk.index)
+        for chunk in reader.chunks()
+    ]
+    if not chunks:
+        return [], pd.Series(dtype="string")
+    rows = _numbered(pd.concat(chunks))
+
+    if previous.empty:
+        return [], pd.Series(NEW, index=rows.index, dtype="string")
+    earlier = _numbered(_keyed(previous["Primary Insurance Name"], previous["Member ID"], previous["Service Code"],
+                               previous["Patient's Name"], previous["DOB"], previous["Payer ID"],
+                               previous["Provider NPI"]))
+    earlier["position"] = np.arange(len(earlier))
+    earlier["errored"] = previous["Eligibility Status"].astype("string").fillna("").str.strip().eq("Error").to_numpy()
+    earlier["checked_at"] = pd.to_datetime(previous["Checked At"], errors="coerce", format="mixed").to_numpy()
+
+    matched = rows.join(earlier.set_index("key"), on="key", rsuffix="_earlier")
+    # Ages count calendar days, so a daily run reuses yesterday's results whatever the hour
+    cutoff = pd.Timestamp(today or datetime.date.today()) - pd.Timedelta(days=max_age_days)
+    # Unmatched rows compare as NA; np.select needs plain booleans
+    reasons = pd.Series(np.select(
+        [
+            matched["position"].isna().to_numpy(),
+            (matched["fingerprint"] != matched["fingerprint_earlier"]).to_numpy(dtype=bool, na_value=True),
+            matched["errored"].to_numpy(dtype=bool, na_value=False),
+            ~(matched["checked_at"].dt.normalize() >= cutoff).to_numpy(dtype=bool, na_value=False),
+        ],
+        [NEW, CHANGED, ERRORED, STALE],
+        default=CARRIED,
+    ), index=rows.index, dtype="string")
+
+    kept = matched[reasons == CARRIED]
+    results = previous.iloc[kept["position"].astype(int)].reindex(columns=RESULT_COLUMNS)
+    checked_at = [ts.to_pydatetime().timestamp() for ts in kept["checked_at"]]
+    carry = list(zip(kept.index, iter_records(results, RESULT_COLUMNS), checked_at))
+    return carry, reasons
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config.settings import (
+    ELIGIBILITY_CACHE_TTL,
+    ELIGIBILITY_CACHE_SIZE,
+    ELIGIBILITY_CACHE_PATH,
+)
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(body):
+    subscriber = body.get("subscriber", {})
+    provider = body.get("provider", {})
+    normalized = {
+        "payer": str(body.get("tradingPartnerServiceId", "")).strip().upper(),
+        "member": str(subscriber.get("memberId", "")).strip().upper(),
+        "first": str(subscriber.get("firstName", "")).strip().lower(),
+        "last": str(subscriber.get("lastName", "")).strip().lower(),
+        "dob": "".join(ch for ch in str(subscriber.get("dateOfBirth", "")) if ch.isdigit()),
+        "services": sorted(str(c).strip().upper() for c in body.get("encounter", {}).get("serviceTypeCodes", [])),
+        "npi": str(provider.get("npi", "")).strip(),
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+def is_cacheable(response):
+    # A 200 can still carry payer or validation errors (AAA rejections,
+    # payer unavailable); those are worth asking again, not remembering
+    return isinstance(response, dict) and "error" not in response and not response.get("errors")
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exc = None
+
+
+class EligibilityCache:
+    def __init__(self, ttl=ELIGIBILITY_CACHE_TTL, max_size=ELIGIBILITY_CACHE_SIZE, db_path=ELIGIBILITY_CACHE_PATH):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._db = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS eligibility_cache (key TEXT PRIMARY KEY, stored_at REAL, body TEXT)"
+            )
+            self._db.execute("DELETE FROM eligibility_cache WHERE stored_at < ?", (time.time() - ttl,))
+            self._db.commit()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_size > 0
+
+    def _remember(self, key, stored_at, response):
+        self._entries[key] = (stored_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT stored_at, body FROM eligibility_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or time.time() - row[0] > self.ttl:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_put(self, key, stored_at, response):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO eligibility_cache (key, stored_at, body) VALUES (?, ?, ?)",
+                (key, stored_at, json.dumps(response)),
+            )
+            self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        if self._db is not None:
+            entry = self._disk_get(key)
+            if entry:
+                with self._lock:
+                    self._remember(key, *entry)
+                    self.disk_hits += 1
+                return entry[1]
+        return None
+
+    def put(self, key, response):
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, response)
+        if self._db is not None:
+            try:
+                self._disk_put(key, stored_at, response)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not persist cached eligibility response: {e}")
+
+    # Cached responses are shared between callers and must be treated as read-only.
+    def get_or_fetch(self, key, fetch, force_refresh=False):
+        if not self.enabled:
+            return fetch()
+
+        if not force_refresh:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+
+        # Single flight: identical concurrent requests wait on the first one
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.exc is not None:
+                raise call.exc
+            return call.result
+
+        try:
+            call.result = fetch()
+            if is_cacheable(call.result):
+                self.put(key, call.result)
+            return call.result
+        except Exception as e:
+            call.exc = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM eligibility_cache")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "size": len(self._entries),
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_eligibility_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EligibilityCache()
+                metrics.register_collector("cache", _cache.stats)
+    return _cache
@@ -1,11 +1,22 @@
 import requests
 import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from config.settings import (
     ELIGIBILITY_URL,
     BATCH_ELIGIBILITY_URL,
     POLL_URL,
     STEDI_API_KEY,
+    ELIGIBILITY_READ_TIMEOUT,
+    BATCH_READ_TIMEOUT,
+    BATCH_CHUNK_SIZE,
+    BATCH_SUBMIT_CONCURRENCY,
 )
+from services.http_session import send
+from services.eligibility_cache import cache_key, get_eligibility_cache
+from services.batch_groups import record_group, get_group
+from services.metrics import metrics
+from services.payer_limiter import PayerUnavailable, get_payer_limiters
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +28,7 @@ HEADERS = {
 
 def build_request_body(form_data):
     return {
-        "encounter": {"serviceTypeCodes": [form_data["service_type_code"]]},
+        "encounter": {"serviceTypeCodes": form_data.get("service_type_codes") or [form_data["service_type_code"]]},
         "provider": {
             "npi": form_data["provider_npi"],
             "organizationName": form_data["provider_name"],
@@ -32,52 +43,220 @@ def build_request_body(form_data):
     }
 
 
-def check_eligibility(form_data):
+def check_eligibility(form_data, force_refresh=False):
     body = build_request_body(form_data)
-    try:
-        resp = requests.post(ELIGIBILITY_URL, json=body, headers=HEADERS, timeout=15)
-        resp.raise_for_status()
-        return resp.json()
-    except requests.RequestException as e:
-        logger.error(f"Eligibility check failed: {e}")
-        return {"error": str(e)}
+    return get_eligibility_cache().get_or_fetch(
+        cache_key(body), lambda: _post_eligibility(body), force_refresh=force_refresh
+    )
+
+
+def _post_eligibility(body):
+    payer = body.get("tradingPartnerServiceId")
+    limiter = get_payer_limiters().get(payer)
+    with metrics.timer("http.eligibility", payer=payer) as call:
+        try:
+            resp = send(
+                "POST", ELIGIBILITY_URL, ELIGIBILITY_READ_TIMEOUT, limiter=limiter, json=body, headers=HEADERS
+            )
+            resp.raise_for_status()
+        except PayerUnavailable as e:
+            # Not sent at all; retryAt lets batch runs defer the row instead.
+            # The breaker already logged why, so don't log every skipped row
+            logger.debug(str(e))
+            call["error"] = True
+            return {"error": str(e), "retryAt": e.retry_at}
+        except requests.RequestException as e:
+            logger.error(f"Eligibility check failed: {e}")
+            call["error"] = True
+            return {"error": str(e)}
+    with metrics.timer("parse.json"):
+        try:
+            return resp.json()
+        except ValueError as e:
+            logger.error(f"Eligibility response was not JSON: {e}")
+            return {"error": str(e)}
+
 
+def _submit_chunk(body):
+    with metrics.timer("http.batch_submit") as call:
+        try:
+            resp = send(
+                "POST", BATCH_ELIGIBILITY_URL, BATCH_READ_TIMEOUT, idempotent=False, json=body, headers=HEADERS
+            )
+            resp.raise_for_status()
+            return resp.json()
+        except requests.RequestException as e:
+            logger.error(f"Batch submission failed: {e}")
+            call["error"] = True
+            return {"error": str(e)}
+
+
+def submit_batch(items, name="batch-submission"):
+    # Large submissions are split into API-sized chunks, sent in parallel and
+    # recorded as one group; the returned handle's groupId polls them all.
+    items = list(items)
+    chunks = [items[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(items), BATCH_CHUNK_SIZE)] or [[]]
+    bodies = [
+        {"items": chunk, "name": name if len(chunks) == 1 else f"{name}-{idx + 1}-of-{len(chunks)}"}
+        for idx, chunk in enumerate(chunks)
+    ]
 
-def submit_batch(items):
-    body = {
-        "items": items,
-        "name": "batch-submission",
+    with ThreadPoolExecutor(max_workers=min(BATCH_SUBMIT_CONCURRENCY, len(bodies))) as pool:
+        responses = list(pool.map(_submit_chunk, bodies))
+
+    accepted, failed = [], []
+    for idx, (chunk, resp) in enumerate(zip(chunks, responses)):
+        if "error" in resp or not resp.get("batchId"):
+            failed.append({"chunk": idx, "items": len(chunk), "error": resp.get("error", "No batchId returned")})
+        else:
+            accepted.append((idx, resp["batchId"], len(chunk)))
+
+    if not accepted:
+        return {"error": failed[0]["error"]}
+
+    group_id = f"group-{uuid.uuid4()}"
+    record_group(group_id, accepted)
+    handle = {
+        "groupId": group_id,
+        "batches": [{"batchId": batch_id, "itemCount": count, "chunk": idx} for idx, batch_id, count in accepted],
+        "submittedItems": sum(count for _, _, count in accepted),
+        "failedChunks": failed,
     }
+    if len(chunks) == 1:
+        handle.update(responses[0])
+    return handle
 
-    try:
-        resp = requests.post(BATCH_ELIGIBILITY_URL, json=body, headers=HEADERS, timeout=30)
+
+def fetch_batch_results_page(batch_id, page_size=100, page_token=None):
+    params = {"batchId": batch_id, "pageSize": page_size}
+    if page_token:
+        params["pageToken"] = page_token
+    with metrics.timer("http.poll"):
+        resp = send("GET", POLL_URL, BATCH_READ_TIMEOUT, headers=HEADERS, params=params)
         resp.raise_for_status()
+    with metrics.timer("parse.json"):
         return resp.json()
-    except requests.RequestException as e:
-        logger.error(f"Batch submission failed: {e}")
-        return {"error": str(e)}
 
-def poll_batch_results(batch_id, auto_paginate=True, page_size=100):
-    params = {"batchId": batch_id, "pageSize": page_size}
-    all_items, next_token = [], None
 
-    while True:
-        if next_token:
-            params["pageToken"] = next_token
+class BatchResultsCursor:
+    # Checkpointed walk over a batch's result pages. page_token always points
+    # at the next page not yet handed to the caller, so after a failure or an
+    # interrupted loop, pages() picks up where it stopped. The checkpoint moves
+    # before a page is yielded: a page counts as taken once the caller has it,
+    # and the caller keeps it before doing anything that can be interrupted.
+    def __init__(self, batch_id, page_size=100, page_token=None):
+        self.batch_id = batch_id
+        self.page_size = page_size
+        self.page_token = page_token
+        self.pages_fetched = 0
+        self.items_fetched = 0
+        self.done = False
+        self.error = None
 
-        try:
-            resp = requests.get(POLL_URL, headers=HEADERS, params=params, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
-        except requests.RequestException as e:
-            logger.error(f"Polling failed: {e}")
-            return {"error": str(e)}
+    def pages(self, max_pages=None):
+        fetched = 0
+        while not self.done and (max_pages is None or fetched < max_pages):
+            try:
+                data = fetch_batch_results_page(self.batch_id, self.page_size, self.page_token)
+            except requests.RequestException as e:
+                logger.error(f"Polling failed: {e}")
+                self.error = str(e)
+                return
+            self.error = None
+            items = data.get("items", [])
+            next_token = data.get("nextPageToken")
+
+            fetched += 1
+            self.pages_fetched += 1
+            self.items_fetched += len(items)
+            self.page_token = next_token
+            self.done = not next_token
+
+            yield items
+
+    def items(self, max_pages=None):
+        for page in self.pages(max_pages):
+            yield from page
+
+    def to_dict(self):
+        return {
+            "batch_id": self.batch_id,
+            "page_size": self.page_size,
+            "page_token": self.page_token,
+            "pages_fetched": self.pages_fetched,
+            "items_fetched": self.items_fetched,
+            "done": self.done,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        cursor = cls(state["batch_id"], state.get("page_size", 100), state.get("page_token"))
+        cursor.pages_fetched = state.get("pages_fetched", 0)
+        cursor.items_fetched = state.get("items_fetched", 0)
+        cursor.done = state.get("done", False)
+        return cursor
 
-        items = data.get("items", [])
-        all_items.extend(items)
 
-        next_token = data.get("nextPageToken")
-        if not auto_paginate or not next_token:
-            break
+class GroupResultsCursor:
+    # Chains the cursors of every batch in a submission group into one stream
+    def __init__(self, group_id, batch_ids, page_size=100):
+        self.batch_id = group_id
+        self.page_size = page_size
+        self.cursors = [BatchResultsCursor(batch_id, page_size) for batch_id in batch_ids]
+        self.error = None
 
+    @property
+    def done(self):
+        return all(c.done for c in self.cursors)
+
+    @property
+    def pages_fetched(self):
+        return sum(c.pages_fetched for c in self.cursors)
+
+    @property
+    def items_fetched(self):
+        return sum(c.items_fetched for c in self.cursors)
+
+    def pages(self, max_pages=None):
+        self.error = None
+        fetched = 0
+        for cursor in self.cursors:
+            if cursor.done:
+                continue
+            remaining = None if max_pages is None else max_pages - fetched
+            for page in cursor.pages(remaining):
+                fetched += 1
+                yield page
+            if cursor.error:
+                self.error = cursor.error
+                return
+            if max_pages is not None and fetched >= max_pages:
+                return
+
+    def items(self, max_pages=None):
+        for page in self.pages(max_pages):
+            yield from page
+
+    def to_dict(self):
+        return {"group_id": self.batch_id, "page_size": self.page_size, "cursors": [c.to_dict() for c in self.cursors]}
+
+    @classmethod
+    def from_dict(cls, state):
+        cursor = cls(state["group_id"], [], state.get("page_size", 100))
+        cursor.cursors = [BatchResultsCursor.from_dict(c) for c in state["cursors"]]
+        return cursor
+
+
+def open_results_cursor(batch_or_group_id, page_size=100):
+    group = get_group(batch_or_group_id)
+    if group:
+        return GroupResultsCursor(batch_or_group_id, [b["batchId"] for b in group], page_size)
+    return BatchResultsCursor(batch_or_group_id, page_size)
+
+
+def poll_batch_results(batch_id, auto_paginate=True, page_size=100):
+    cursor = open_results_cursor(batch_id, page_size)
+    all_items = list(cursor.items(max_pages=None if auto_paginate else 1))
+    if cursor.error:
+        return {"error": cursor.error}
     return {"items": all_items}
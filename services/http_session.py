@@ -0,0 +1,120 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from config.settings import (
+    HTTP_POOL_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+)
+from services.metrics import metrics
+from services.payer_limiter import FAILED, TIMEOUT, outcome_for_status
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# A non-idempotent POST (batch submission) is only retried when we know the
+# server did not act on it.
+SAFE_RETRY_STATUSES = frozenset({429})
+
+_session = None
+_pool_size = HTTP_POOL_SIZE
+_session_lock = threading.Lock()
+
+
+def _mount(session, pool_size):
+    # Retries are handled in send() so they can honor Retry-After
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                _mount(session, _pool_size)
+                session.headers.update({"Connection": "keep-alive"})
+                _session = session
+    return _session
+
+
+def ensure_pool_size(size):
+    # Concurrency can be raised per run (UI input, CLI flag); grow the pool so
+    # workers don't open throwaway connections. It never shrinks.
+    global _pool_size
+    session = get_session()
+    with _session_lock:
+        if size > _pool_size:
+            _pool_size = size
+            _mount(session, size)
+
+
+def backoff_delay(attempt):
+    # Full jitter: uniform over [0, base * 2^attempt], capped
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def retry_after_delay(resp):
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), HTTP_BACKOFF_MAX)
+
+
+def send(method, url, read_timeout, idempotent=True, limiter=None, **kwargs):
+    # limiter: a PayerLimiter each attempt has to get a slot from; it may raise
+    # PayerUnavailable instead of sending
+    retry_statuses = RETRY_STATUSES if idempotent else SAFE_RETRY_STATUSES
+    kwargs["timeout"] = (HTTP_CONNECT_TIMEOUT, read_timeout)
+    session = get_session()
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        last_attempt = attempt == HTTP_MAX_RETRIES
+        if limiter is not None:
+            limiter.acquire()
+        start = time.perf_counter()
+        # Any exception from the attempt counts as a failure, so the slot is always given back
+        outcome, retry_after = FAILED, None
+        try:
+            resp = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            outcome = TIMEOUT if isinstance(e, requests.Timeout) else FAILED
+            # Without idempotency only a failed connect is known not to have reached the server
+            retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+            if last_attempt or not retryable:
+                raise
+            delay = backoff_delay(attempt)
+            metrics.incr("http_retries")
+            metrics.incr(f"http_retry_{type(e).__name__}")
+            logger.warning(f"{method} {url} failed ({e}); retry {attempt + 1} in {delay:.2f}s")
+        else:
+            retry_after = retry_after_delay(resp) if resp.status_code in RETRY_STATUSES else None
+            outcome = outcome_for_status(resp.status_code)
+            if resp.status_code not in retry_statuses or last_attempt:
+                return resp
+            delay = retry_after
+            if delay is None:
+                delay = backoff_delay(attempt)
+            metrics.incr("http_retries")
+            metrics.incr(f"http_retry_{resp.status_code}")
+            logger.warning(f"{method} {url} returned {resp.status_code}; retry {attempt + 1} in {delay:.2f}s")
+            resp.close()
+        finally:
+            if limiter is not None:
+                limiter.release(outcome, time.perf_counter() - start, retry_after)
+        time.sleep(delay)
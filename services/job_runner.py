@@ -0,0 +1,147 @@
+import io
+import logging
+import threading
+import time
+from config.settings import BATCH_CONCURRENCY
+from services import job_store, response_archive
+from services.batch_runner import iter_results
+from utils.ingestion import SpreadsheetReader
+
+logger = logging.getLogger(__name__)
+
+# Completed rows are written to the job store in small transactions
+FLUSH_ROWS = 200
+FLUSH_SECONDS = 1.0
+
+
+class JobRunner:
+    # Runs batch realtime jobs on background threads, so a job keeps going
+    # (and keeps recording results) whatever happens to the browser session
+    # that started it. A UI rerun only ever reads the job store.
+    def __init__(self):
+        self._threads = {}
+        self._stops = {}
+        self._lock = threading.Lock()
+        self._recovered = False
+
+    def _recover(self):
+        # Jobs left "running" by a previous server process have no thread
+        # behind them any more; mark them so the UI offers to resume
+        if self._recovered:
+            return
+        self._recovered = True
+        for job in job_store.list_jobs(job_store.REALTIME, limit=1000):
+            if job["status"] in ("pending", "running", "stopping"):
+                job_store.set_status(job["job_id"], "interrupted", only_if=("pending", "running", "stopping"))
+
+    def is_running(self, job_id):
+        with self._lock:
+            thread = self._threads.get(job_id)
+            return thread is not None and thread.is_alive()
+
+    def start(self, job_id):
+        # Starting a job that is already running here is a no-op, so repeated
+        # clicks or reruns can't send its rows twice
+        with self._lock:
+            self._recover()
+            thread = self._threads.get(job_id)
+            if thread is not None and thread.is_alive():
+                return False
+            job = job_store.get_job(job_id)
+            if job is None or job["status"] == "done":
+                return False
+            stop = threading.Event()
+            thread = threading.Thread(target=self._run, args=(job_id, stop), name=f"job-{job_id[:8]}", daemon=True)
+            self._threads[job_id] = thread
+            self._stops[job_id] = stop
+            job_store.set_status(job_id, "running")
+            thread.start()
+            return True
+
+    def stop(self, job_id):
+        with self._lock:
+            stop = self._stops.get(job_id)
+        if stop is not None and self.is_running(job_id):
+            stop.set()
+            job_store.set_status(job_id, "stopping", only_if=("running",))
+
+    def status(self, job_id):
+        with self._lock:
+            self._recover()
+        job = job_store.get_job(job_id)
+        if job is None:
+            return None
+        job["counts"] = job_store.row_counts(job_id)
+        job["completed"] = sum(job["counts"].values())
+        job["running"] = self.is_running(job_id)
+        return job
+
+    def _run(self, job_id, stop):
+        job = job_store.get_job(job_id)
+        name, data = job_store.job_source(job_id)
+        buffer = []
+        responses = []
+        last_flush = time.monotonic()
+
+        def keep_response(transaction_id, response, labels):
+            responses.append((transaction_id, response, labels))
+
+        def flush():
+            nonlocal buffer, last_flush
+            # Responses first, so every recorded row can be drilled into
+            if responses:
+                response_archive.archive(job_id, responses)
+                responses.clear()
+            if buffer:
+                job_store.record_rows(job_id, buffer)
+                buffer = []
+            last_flush = time.monotonic()
+
+        try:
+            reader = SpreadsheetReader(io.BytesIO(data), name)
+            if job["total_rows"] is None and reader.total_rows is not None:
+                job_store.update_job(job_id, total_rows=reader.total_rows)
+            done = job_store.completed_labels(job_id)
+            if done:
+                logger.info(f"Resuming job {job_id} after {len(done)} completed rows")
+            workers = job["workers"] or BATCH_CONCURRENCY
+            try:
+                for label, result in iter_results(reader, max_workers=workers, skip=done, stop=stop,
+                                                  on_response=keep_response,
+                                                  payer_matches=job_store.payer_matches(job_id)):
+                    status = "error" if result["Eligibility Status"] == "Error" else "done"
+                    buffer.append((label, status, result))
+                    if len(buffer) >= FLUSH_ROWS or time.monotonic() - last_flush > FLUSH_SECONDS:
+                        flush()
+            finally:
+                flush()
+                reader.close()
+
+            # A stop that lands after the last row still leaves a complete job
+            total = job_store.get_job(job_id)["total_rows"]
+            completed = len(job_store.completed_labels(job_id))
+            if not stop.is_set() or (total is not None and completed >= total):
+                job_store.update_job(job_id, total_rows=completed)
+                job_store.set_status(job_id, "done")
+                job_store.drop_source(job_id)
+            else:
+                job_store.set_status(job_id, "stopped")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            job_store.set_status(job_id, "failed", error=str(e))
+        finally:
+            with self._lock:
+                self._stops.pop(job_id, None)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner()
+    return _runner
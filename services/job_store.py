@@ -0,0 +1,263 @@
+import datetime
+import json
+import time
+import uuid
+from services import state_db
+
+# Job kinds
+REALTIME = "realtime"
+BATCH = "batch"
+
+# Statuses a job stops in; anything else may still make progress
+FINISHED = ("done", "failed", "stopped")
+
+# Row status for a result carried forward from earlier results by a delta
+# re-check, rather than checked by this job
+CARRIED = "carried"
+# Extra result columns marking which rows a job checked itself
+MARK_COLUMNS = ["Refreshed", "Checked At"]
+
+_lock = state_db.lock
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    " job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, name TEXT, source_hash TEXT,"
+    " total_rows INTEGER, workers INTEGER, status TEXT NOT NULL, error TEXT,"
+    " created_at REAL NOT NULL, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS jobs_source ON jobs (kind, source_hash, created_at)",
+    # The upload itself, so a job can be resumed after the server restarts
+    "CREATE TABLE IF NOT EXISTS job_sources (job_id TEXT PRIMARY KEY, name TEXT NOT NULL, data BLOB NOT NULL)",
+    # Approximate payer name matches the user confirmed for the job's upload
+    "CREATE TABLE IF NOT EXISTS job_payer_matches ("
+    " job_id TEXT NOT NULL, payer_name TEXT NOT NULL, payer_id TEXT NOT NULL,"
+    " PRIMARY KEY (job_id, payer_name))",
+    "CREATE TABLE IF NOT EXISTS job_rows ("
+    " job_id TEXT NOT NULL, row_label INTEGER NOT NULL, status TEXT NOT NULL,"
+    " result TEXT, updated_at REAL NOT NULL, PRIMARY KEY (job_id, row_label))",
+]
+
+
+def _db():
+    return state_db.connect(__name__, SCHEMA)
+
+
+JOB_COLUMNS = "job_id, kind, name, source_hash, total_rows, workers, status, error, created_at, updated_at"
+
+
+def _job(row):
+    job_id, kind, name, source_hash, total, workers, status, error, created, updated = row
+    return {
+        "job_id": job_id, "kind": kind, "name": name, "source_hash": source_hash, "total_rows": total,
+        "workers": workers, "status": status, "error": error, "created_at": created, "updated_at": updated,
+    }
+
+
+def create_job(kind, name, source_hash=None, total_rows=None, workers=None, status="pending", job_id=None,
+               source=None, payer_matches=None):
+    job_id = job_id or str(uuid.uuid4())
+    now = time.time()
+    with _lock:
+        db = _db()
+        db.execute(
+            f"INSERT INTO jobs ({JOB_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+            (job_id, kind, name, source_hash, total_rows, workers, status, now, now),
+        )
+        if source is not None:
+            db.execute("INSERT INTO job_sources (job_id, name, data) VALUES (?, ?, ?)", (job_id, name, source))
+        if payer_matches:
+            db.executemany(
+                "INSERT INTO job_payer_matches (job_id, payer_name, payer_id) VALUES (?, ?, ?)",
+                [(job_id, payer_name, payer_id) for payer_name, payer_id in payer_matches.items()],
+            )
+        db.commit()
+    return job_id
+
+
+def get_job(job_id):
+    with _lock:
+        row = _db().execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _job(row) if row else None
+
+
+def find_job(kind, source_hash):
+    # Latest job for the same uploaded content
+    with _lock:
+        row = _db().execute(
+            f"SELECT {JOB_COLUMNS} FROM jobs WHERE kind = ? AND source_hash = ? ORDER BY created_at DESC LIMIT 1",
+            (kind, source_hash),
+        ).fetchone()
+    return _job(row) if row else None
+
+
+def list_jobs(kind=None, limit=50):
+    query = f"SELECT {JOB_COLUMNS} FROM jobs"
+    params = ()
+    if kind:
+        query += " WHERE kind = ?"
+        params = (kind,)
+    with _lock:
+        rows = _db().execute(query + " ORDER BY created_at DESC LIMIT ?", params + (limit,)).fetchall()
+    return [_job(row) for row in rows]
+
+
+def set_status(job_id, status, error=None, only_if=None):
+    # only_if: update only when the current status is one of these
+    query = "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?"
+    params = (status, error, time.time(), job_id)
+    if only_if:
+        query += f" AND status IN ({', '.join('?' * len(only_if))})"
+        params += tuple(only_if)
+    with _lock:
+        db = _db()
+        changed = db.execute(query, params).rowcount
+        db.commit()
+    return bool(changed)
+
+
+def update_job(job_id, **fields):
+    allowed = {"total_rows", "workers", "name"}
+    fields = {k: v for k, v in fields.items() if k in allowed}
+    if not fields:
+        return
+    assignments = ", ".join(f"{k} = ?" for k in fields)
+    with _lock:
+        db = _db()
+        db.execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+            tuple(fields.values()) + (time.time(), job_id),
+        )
+        db.commit()
+
+
+def job_source(job_id):
+    with _lock:
+        row = _db().execute("SELECT name, data FROM job_sources WHERE job_id = ?", (job_id,)).fetchone()
+    return (row[0], bytes(row[1])) if row else (None, None)
+
+
+def drop_source(job_id):
+    # A finished job never reads its upload again
+    with _lock:
+        db = _db()
+        db.execute("DELETE FROM job_sources WHERE job_id = ?", (job_id,))
+        db.commit()
+
+
+def payer_matches(job_id):
+    with _lock:
+        rows = _db().execute(
+            "SELECT payer_name, payer_id FROM job_payer_matches WHERE job_id = ?", (job_id,)
+        ).fetchall()
+    return dict(rows)
+
+
+def record_rows(job_id, rows):
+    # rows: [(row_label, status, result_dict), ...]; one transaction per call
+    now = time.time()
+    with _lock:
+        db = _db()
+        db.executemany(
+            "INSERT OR REPLACE INTO job_rows (job_id, row_label, status, result, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(job_id, int(label), status, json.dumps(result, default=str), now) for label, status, result in rows],
+        )
+        db.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (now, job_id))
+        db.commit()
+
+
+def carry_rows(job_id, rows):
+    # rows: [(row_label, result_dict, checked_at), ...]; carried rows keep the
+    # time they were originally checked
+    with _lock:
+        db = _db()
+        db.executemany(
+            "INSERT OR REPLACE INTO job_rows (job_id, row_label, status, result, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(job_id, int(label), CARRIED, json.dumps(result, default=str), checked_at)
+             for label, result, checked_at in rows],
+        )
+        db.commit()
+
+
+def _result(result, status, updated_at, marked):
+    result = json.loads(result)
+    if marked:
+        result["Refreshed"] = "No" if status == CARRIED else "Yes"
+        result["Checked At"] = datetime.datetime.fromtimestamp(updated_at).strftime("%Y-%m-%d %H:%M:%S")
+    return result
+
+
+def completed_labels(job_id):
+    with _lock:
+        rows = _db().execute("SELECT row_label FROM job_rows WHERE job_id = ?", (job_id,)).fetchall()
+    return {label for (label,) in rows}
+
+
+def row_counts(job_id):
+    with _lock:
+        rows = _db().execute(
+            "SELECT status, COUNT(*) FROM job_rows WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall()
+    return dict(rows)
+
+
+def job_results(job_id, limit=None, marked=False):
+    # Results in row order; NaN round-trips through json as NaN. marked adds
+    # MARK_COLUMNS to each result
+    query = "SELECT result, status, updated_at FROM job_rows WHERE job_id = ? ORDER BY row_label"
+    params = (job_id,)
+    if limit:
+        query += " LIMIT ?"
+        params += (limit,)
+    with _lock:
+        rows = _db().execute(query, params).fetchall()
+    return [_result(result, status, updated_at, marked) for result, status, updated_at in rows]
+
+
+def iter_job_results(job_id, page_rows=1000, marked=False, labels=False):
+    # Streams results in row order a page at a time, without holding the lock
+    # (or every result) for the whole walk; labels yields (row_label, result)
+    after = -1
+    while True:
+        with _lock:
+            rows = _db().execute(
+                "SELECT row_label, result, status, updated_at FROM job_rows WHERE job_id = ? AND row_label > ?"
+                " ORDER BY row_label LIMIT ?",
+                (job_id, after, page_rows),
+            ).fetchall()
+        for label, result, status, updated_at in rows:
+            result = _result(result, status, updated_at, marked)
+            yield (label, result) if labels else result
+        if len(rows) < page_rows:
+            return
+        after = rows[-1][0]
+
+
+def iter_job_rows(job_id, status=None):
+    # (row_label, status, result) for every recorded row, in row order
+    query = "SELECT row_label, status, result FROM job_rows WHERE job_id = ?"
+    params = (job_id,)
+    if status:
+        query += " AND status = ?"
+        params += (status,)
+    with _lock:
+        rows = _db().execute(query + " ORDER BY row_label", params).fetchall()
+    for label, row_status, result in rows:
+        yield label, row_status, json.loads(result)
+
+
+def delete_job(job_id):
+    with _lock:
+        db = _db()
+        for table in ("job_rows", "job_payer_matches", "job_sources", "jobs"):
+            db.execute(f"DELETE FROM {table} WHERE job_id = ?", (job_id,))
+        db.commit()
+
+
+def purge(before):
+    # Deletes jobs last updated before the given time; returns their IDs
+    with _lock:
+        db = _db()
+        job_ids = [job_id for (job_id,) in db.execute("SELECT job_id FROM jobs WHERE updated_at < ?", (before,))]
+        for table in ("job_rows", "job_payer_matches", "job_sources", "jobs"):
+            db.executemany(f"DELETE FROM {table} WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+        db.commit()
+    return job_ids
@@ -0,0 +1,170 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from config.settings import METRICS_ENABLED
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count", "errors", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+        self.max = 0.0
+
+    def observe(self, seconds, error=False):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": self.errors / self.count if self.count else 0.0,
+            "mean_ms": self.total / self.count * 1000 if self.count else None,
+            "p50_ms": _ms(self.quantile(0.5)),
+            "p95_ms": _ms(self.quantile(0.95)),
+            "p99_ms": _ms(self.quantile(0.99)),
+            "max_ms": self.max * 1000,
+            "total_seconds": self.total,
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.counts)),
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000
+
+
+class Metrics:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._payers = {}
+        self._counters = {}
+        self._collectors = {}
+        self.started = time.time()
+
+    def observe(self, stage, seconds, payer=None, error=False):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = Histogram()
+            hist.observe(seconds, error)
+            if payer:
+                hist = self._payers.get(payer)
+                if hist is None:
+                    hist = self._payers[payer] = Histogram()
+                hist.observe(seconds, error)
+
+    @contextmanager
+    def timer(self, stage, payer=None):
+        start = time.perf_counter()
+        outcome = {"error": False}
+        try:
+            yield outcome
+        except Exception:
+            outcome["error"] = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, payer, outcome["error"])
+
+    def timed_iter(self, stage, iterable):
+        # Times each step of an iterator, e.g. reading the next upload chunk
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(stage, time.perf_counter() - start)
+            yield item
+
+    def incr(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def register_collector(self, name, fn):
+        # fn() returns a flat dict of numbers, read at snapshot time
+        self._collectors[name] = fn
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._payers.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            snap = {
+                "since": self.started,
+                "stages": {name: h.summary() for name, h in self._stages.items()},
+                "payers": {name: h.summary() for name, h in self._payers.items()},
+                "counters": dict(self._counters),
+            }
+        snap["collectors"] = {name: fn() for name, fn in self._collectors.items()}
+        return snap
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, default=str)
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        lines = []
+
+        def histogram(metric, label, values):
+            lines.append(f"# TYPE {metric} histogram")
+            for name, summary in values.items():
+                cumulative = 0
+                for bound, count in summary["buckets"].items():
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {summary["total_seconds"]}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {summary["count"]}')
+            lines.append(f"# TYPE {metric}_errors_total counter")
+            for name, summary in values.items():
+                lines.append(f'{metric}_errors_total{{{label}="{name}"}} {summary["errors"]}')
+
+        histogram("eligibility_stage_seconds", "stage", snap["stages"])
+        histogram("eligibility_payer_seconds", "payer", snap["payers"])
+        lines.append("# TYPE eligibility_events_total counter")
+        for name, value in snap["counters"].items():
+            lines.append(f'eligibility_events_total{{event="{name}"}} {value}')
+        for collector, values in snap["collectors"].items():
+            for name, value in values.items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"eligibility_{collector}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,303 @@
+import logging
+import threading
+import time
+import requests
+from config.settings import (
+    PAYER_LIMITS_ENABLED,
+    PAYER_RATE_LIMIT,
+    PAYER_BURST,
+    PAYER_INITIAL_CONCURRENCY,
+    PAYER_MIN_CONCURRENCY,
+    PAYER_MAX_CONCURRENCY,
+    PAYER_LATENCY_TARGET,
+    PAYER_QUEUE_TIMEOUT,
+    PAYER_BREAKER_FAILURES,
+    PAYER_BREAKER_COOLDOWN,
+    PAYER_BREAKER_MAX_COOLDOWN,
+)
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Outcomes reported back by send() for each attempt
+OK = "ok"
+THROTTLED = "throttled"
+FAILED = "error"
+TIMEOUT = "timeout"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class PayerUnavailable(requests.RequestException):
+    # Raised instead of sending when a payer's breaker is open or a failing
+    # payer's queue doesn't move; retry_at is a time.time() after which a retry may get through
+    def __init__(self, message, retry_at=None):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+def outcome_for_status(status_code):
+    if status_code == 429:
+        return THROTTLED
+    if status_code >= 500:
+        return FAILED
+    # Other 4xx responses are about the request, not the payer's health
+    return OK
+
+
+class PayerLimiter:
+    # Token bucket plus an AIMD concurrency limit and a circuit breaker for one
+    # payer. acquire() blocks until the payer has a free slot and a token;
+    # release() reports how the call went and adjusts the limit.
+    def __init__(self, payer, rate=PAYER_RATE_LIMIT, burst=PAYER_BURST, initial=PAYER_INITIAL_CONCURRENCY,
+                 min_limit=PAYER_MIN_CONCURRENCY, max_limit=PAYER_MAX_CONCURRENCY,
+                 latency_target=PAYER_LATENCY_TARGET, failure_threshold=PAYER_BREAKER_FAILURES,
+                 cooldown=PAYER_BREAKER_COOLDOWN, max_cooldown=PAYER_BREAKER_MAX_COOLDOWN):
+        self.payer = payer
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+
+        self._cond = threading.Condition()
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self.in_flight = 0
+
+        self.state = CLOSED
+        self.cooldown = cooldown
+        self._opened_at = 0.0
+        self._probing = False
+        self.consecutive_failures = 0
+
+        self.sent = 0
+        self.ok = 0
+        self.throttled = 0
+        self.failed = 0
+        self.fast_failed = 0
+        self.latency = None
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _retry_at(self, now):
+        # Wall-clock time the breaker lets a probe through
+        return time.time() + max(0.0, self._opened_at + self.cooldown - now)
+
+    def acquire(self, timeout=PAYER_QUEUE_TIMEOUT):
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.state == OPEN:
+                    if now - self._opened_at < self.cooldown:
+                        self.fast_failed += 1
+                        metrics.incr("payer_fast_fail")
+                        raise PayerUnavailable(
+                            f"Payer {self.payer} is failing; skipped without sending "
+                            f"(retry in {self._opened_at + self.cooldown - now:.0f}s)",
+                            retry_at=self._retry_at(now),
+                        )
+                    self.state = HALF_OPEN
+                    logger.info(f"Payer {self.payer}: circuit half-open, sending a probe")
+
+                # While half-open only the probe goes out; everyone else waits on its outcome
+                if self.state == HALF_OPEN:
+                    ready = not self._probing
+                else:
+                    ready = self.in_flight < int(self.limit)
+                wait = None
+                if ready:
+                    self._refill(now)
+                    if now < self._blocked_until:
+                        wait = self._blocked_until - now
+                    elif self.rate > 0 and self._tokens < 1:
+                        wait = (1 - self._tokens) / self.rate
+                    else:
+                        if self.rate > 0:
+                            self._tokens -= 1
+                        if self.state == HALF_OPEN:
+                            self._probing = True
+                        self.in_flight += 1
+                        self.sent += 1
+                        metrics.observe("limiter.wait", now - start)
+                        return
+
+                # A payer about to trip its breaker and already at its limit would
+                # only tie this worker up behind calls likely to fail too; a
+                # stray failure alone just queues like any other busy payer
+                if not ready and self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                    self.fast_failed += 1
+                    metrics.incr("payer_fast_fail")
+                    raise PayerUnavailable(
+                        f"Payer {self.payer} is failing; skipped instead of queueing behind "
+                        f"{self.in_flight} slow calls",
+                        retry_at=time.time() + max(self.latency or 0.0, 1.0),
+                    )
+
+                # A long queue alone is no reason to give up: a slow payer
+                # that keeps answering is just waited for. Only a payer whose
+                # last calls failed gives up the slot to the deferral pass
+                remaining = deadline - now
+                if remaining <= 0:
+                    if self.consecutive_failures:
+                        self.fast_failed += 1
+                        metrics.incr("payer_queue_timeout")
+                        raise PayerUnavailable(
+                            f"Payer {self.payer} is failing; gave up after waiting {timeout:.0f}s for a slot",
+                            retry_at=time.time() + max(self.latency or 0.0, 1.0),
+                        )
+                    deadline = now + timeout
+                    remaining = timeout
+                self._cond.wait(remaining if wait is None else min(wait, remaining))
+
+    def release(self, outcome, latency, retry_after=None):
+        with self._cond:
+            now = time.monotonic()
+            busy = self.in_flight
+            self.in_flight -= 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            probe = self.state == HALF_OPEN and self._probing
+            if probe:
+                self._probing = False
+
+            if outcome == OK:
+                self.ok += 1
+                self.consecutive_failures = 0
+                if probe:
+                    self.state = CLOSED
+                    self.cooldown = self.base_cooldown
+                    logger.info(f"Payer {self.payer}: circuit closed")
+                # Additive increase, only while the limit is actually in use
+                if latency <= self.latency_target and busy * 2 >= int(self.limit):
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                if outcome == THROTTLED:
+                    self.throttled += 1
+                    if retry_after:
+                        self._blocked_until = max(self._blocked_until, now + retry_after)
+                else:
+                    self.failed += 1
+                    self.consecutive_failures += 1
+                # Multiplicative decrease, at most once per round trip so a burst
+                # of failures already in flight counts as one signal
+                if now - self._last_decrease >= latency:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = now
+                if probe and outcome != THROTTLED:
+                    self._open(now, self.cooldown * 2)
+                elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                    self._open(now, self.base_cooldown)
+            self._cond.notify_all()
+
+    def expect(self, workers):
+        # A run is about to send with this many workers. A healthy payer
+        # starts it with that many slots rather than growing into them one
+        # round trip at a time; a failing or throttled one keeps its limit
+        with self._cond:
+            now = time.monotonic()
+            if self.state == CLOSED and not self.consecutive_failures and now >= self._blocked_until:
+                self.limit = max(self.limit, float(min(workers, self.max_limit)))
+                self._cond.notify_all()
+
+    def _open(self, now, cooldown):
+        self.state = OPEN
+        self.cooldown = min(cooldown, self.max_cooldown)
+        self._opened_at = now
+        metrics.incr("payer_circuit_open")
+        logger.warning(
+            f"Payer {self.payer}: circuit open after {self.consecutive_failures} failures; "
+            f"failing fast for {self.cooldown:.0f}s"
+        )
+
+    def retry_at(self):
+        # When a deferred call for this payer is worth trying again (time.time())
+        with self._cond:
+            now = time.monotonic()
+            if self.state == OPEN:
+                return self._retry_at(now)
+            return time.time() + max(0.0, self._blocked_until - now)
+
+    def snapshot(self):
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "payer": self.payer,
+                "state": self.state,
+                "limit": round(self.limit, 1),
+                "in_flight": self.in_flight,
+                "tokens": round(self._tokens, 1) if self.rate > 0 else None,
+                "sent": self.sent,
+                "ok": self.ok,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "fast_failed": self.fast_failed,
+                "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+                "retry_in_s": round(self._opened_at + self.cooldown - now, 1) if self.state == OPEN else None,
+            }
+
+
+class PayerLimiters:
+    def __init__(self, enabled=PAYER_LIMITS_ENABLED, **options):
+        self.enabled = enabled
+        self._options = options
+        self._initial = options.pop("initial", PAYER_INITIAL_CONCURRENCY)
+        self._workers = 0
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+    def get(self, payer):
+        if not self.enabled or not payer:
+            return None
+        limiter = self._limiters.get(payer)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(payer)
+                if limiter is None:
+                    limiter = self._limiters[payer] = PayerLimiter(
+                        payer, initial=max(self._initial, self._workers), **self._options
+                    )
+        return limiter
+
+    def expect_workers(self, workers):
+        # Called as a run starts; payers seen from now on start at this limit
+        with self._lock:
+            self._workers = workers
+            limiters = list(self._limiters.values())
+        for limiter in limiters:
+            limiter.expect(workers)
+
+    def snapshot(self):
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return [limiter.snapshot() for limiter in limiters]
+
+    def reset(self):
+        with self._lock:
+            self._limiters.clear()
+
+
+_limiters = None
+_limiters_lock = threading.Lock()
+
+
+def get_payer_limiters():
+    global _limiters
+    if _limiters is None:
+        with _limiters_lock:
+            if _limiters is None:
+                _limiters = PayerLimiters()
+    return _limiters
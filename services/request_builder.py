@@ -0,0 +1,199 @@
+import os
+import numpy as np
+import pandas as pd
+from config.settings import MAX_SERVICE_CODES_PER_REQUEST
+from services.eligibility_service import build_request_body
+from services.validation import add_reason, validate_requests
+from utils.payer_registry import get_payer_registry
+
+REQUIRED_COLUMNS = [
+    "MemberID", "FirstName", "LastName", "DOB",
+    "ProviderName", "ProviderNPI", "ServiceCode",
+    "PayerName", "PayerID"
+]
+
+# Columns of the prepared frame, matching the form_data keys build_request_body expects
+FORM_COLUMNS = [
+    "payer_id", "service_type_code", "member_id", "first_name", "last_name",
+    "dob", "provider_name", "provider_npi",
+]
+
+# Approximate payer name matches offered for confirmation
+PAYER_MATCH_COLUMNS = ["PayerName", "Matched Payer", "PayerID"]
+
+# Rows that agree on these go to the same subscriber, payer and provider
+GROUP_COLUMNS = [
+    "payer_id", "member_id", "first_name", "last_name", "dob", "provider_name", "provider_npi",
+]
+
+
+def missing_columns(columns):
+    return [c for c in REQUIRED_COLUMNS if c not in columns]
+
+
+def _text(series):
+    # Excel hands integer-looking IDs back as floats (12345.0); keep them integral
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if (values == values.round()).all():
+            series = series.astype("Int64")
+    return series.astype("string").str.strip().fillna("")
+
+
+def _parse_dates(series):
+    parsed = pd.to_datetime(series, errors="coerce")
+    # A single inferred format covers most sheets; retry the leftovers one by one
+    retry = parsed.isna() & series.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(series[retry].astype(str), errors="coerce", format="mixed")
+    return parsed
+
+
+def fuzzy_payer_matches(df, payers=None):
+    # Approximate matches for this frame's payer names, for the user to confirm
+    # before prepare_requests uses them: PayerName, matched payer, PayerID
+    payers = payers or get_payer_registry()
+    names = _text(df["PayerName"])
+    names = names[(_text(df["PayerID"]) == "") & (names != "")].unique()
+    index = payers.search_index()
+    rows = []
+    for name in names:
+        if payers.payer_id_for_name(name):
+            continue
+        payer = index.resolve(name)
+        if payer:
+            rows.append({"PayerName": name, "Matched Payer": payer["displayName"], "PayerID": payer["primaryPayerId"]})
+    return pd.DataFrame(rows, columns=PAYER_MATCH_COLUMNS)
+
+
+def bulk_uuid4(n):
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = raw.tobytes().hex()
+    return [
+        f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+        for h in (hexed[i:i + 32] for i in range(0, 32 * n, 32))
+    ]
+
+
+# Normalizes and validates a whole sheet column by column. Returns (prepared,
+# rejected): prepared keeps the input index and holds FORM_COLUMNS plus
+# transaction_id, rejected holds the input rows that can't be sent, with a
+# Reason column listing every problem found. Payer names without an exact
+# match only resolve through payer_matches ({PayerName: PayerID}), the
+# approximate matches a user confirmed.
+def prepare_requests(df, payers=None, payer_matches=None):
+    payers = payers or get_payer_registry()
+    out = pd.DataFrame(index=df.index)
+    out["member_id"] = _text(df["MemberID"])
+    out["first_name"] = _text(df["FirstName"]).str.replace("`", "'", regex=False)
+    out["last_name"] = _text(df["LastName"]).str.replace("`", "'", regex=False)
+    out["provider_name"] = _text(df["ProviderName"])
+    out["provider_npi"] = _text(df["ProviderNPI"])
+    out["service_type_code"] = _text(df["ServiceCode"])
+
+    dob = _parse_dates(df["DOB"])
+    out["dob"] = dob.dt.strftime("%Y-%m-%d").fillna("")
+
+    payer_id = _text(df["PayerID"])
+    payer_name = _text(df["PayerName"])
+    by_name = payer_name.str.lower().map(payers.name_to_id)
+    if payer_matches:
+        by_name = by_name.fillna(payer_name.map(payer_matches))
+    out["payer_id"] = payer_id.where(payer_id != "", by_name).fillna("")
+
+    reasons = pd.Series("", index=df.index, dtype="string")
+    reasons = add_reason(reasons, dob.isna(), "Invalid DOB '" + df["DOB"].astype("string").fillna("") + "'")
+    reasons = add_reason(
+        reasons, out["payer_id"] == "",
+        "No valid PayerID for payer '" + df["PayerName"].astype("string").fillna("") + "'",
+    )
+    checks = validate_requests(out, payers)
+    reasons = add_reason(reasons, checks != "", checks)
+
+    bad = reasons != ""
+    rejected = df.loc[bad].copy()
+    rejected["Reason"] = reasons[bad]
+
+    prepared = out.loc[~bad, FORM_COLUMNS].copy()
+    prepared["transaction_id"] = bulk_uuid4(len(prepared))
+    return prepared, rejected
+
+
+def iter_records(frame, columns):
+    # Much cheaper than DataFrame.to_dict("records") on Arrow-backed strings
+    values = [frame[c].tolist() for c in columns]
+    for row in zip(*values):
+        yield dict(zip(columns, row))
+
+
+def iter_form_data(prepared):
+    yield from iter_records(prepared, FORM_COLUMNS)
+
+
+# Merges rows for the same subscriber, payer and provider into requests of up
+# to `limit` distinct service codes. Returns [(form_data, members)], where
+# form_data carries service_type_codes (and the first row's transaction_id)
+# and members lists the (row label, service code) pairs the response answers.
+def group_requests(prepared, limit=MAX_SERVICE_CODES_PER_REQUEST):
+    limit = max(1, int(limit))
+    if prepared.empty:
+        return []
+    group_ids = prepared.groupby(GROUP_COLUMNS, sort=False).ngroup().tolist()
+    requests, open_request, code_slots = [], {}, {}
+    records = iter_records(prepared, FORM_COLUMNS + ["transaction_id"])
+    for label, group, record in zip(prepared.index, group_ids, records):
+        code = record["service_type_code"]
+        slots = code_slots.setdefault(group, {})
+        idx = slots.get(code)
+        if idx is None:
+            # A repeated code rides along with the request that already asks for it
+            idx = open_request.get(group)
+            if idx is None or len(requests[idx][1]) >= limit:
+                idx = open_request[group] = len(requests)
+                requests.append((record, [], []))
+            requests[idx][1].append(code)
+            slots[code] = idx
+        requests[idx][2].append((label, code))
+
+    grouped = []
+    for record, codes, members in requests:
+        form_data = dict(record, service_type_code=codes[0], service_type_codes=codes)
+        grouped.append((form_data, members))
+    return grouped
+
+
+# Yields (item, members) per grouped request, see group_requests
+def iter_batch_items(prepared, limit=MAX_SERVICE_CODES_PER_REQUEST):
+    for form_data, members in group_requests(prepared, limit):
+        item = build_request_body(form_data)
+        item["submitterTransactionIdentifier"] = form_data["transaction_id"]
+        yield item, members
+
+
+def rejected_rows(reader, payers=None, payer_matches=None):
+    # Pre-flight pass over a whole upload: the rows prepare_requests would reject
+    payers = payers or get_payer_registry()
+    try:
+        rejected = [prepare_requests(chunk, payers, payer_matches)[1] for chunk in reader.chunks()]
+    finally:
+        reader.close()
+    return pd.concat(rejected) if rejected else pd.DataFrame()
+
+
+def upload_payer_matches(reader, payers=None):
+    # Approximate payer matches over a whole upload, one row per distinct name
+    payers = payers or get_payer_registry()
+    try:
+        matches = [fuzzy_payer_matches(chunk, payers) for chunk in reader.chunks()]
+    finally:
+        reader.close()
+    if not matches:
+        return pd.DataFrame(columns=PAYER_MATCH_COLUMNS)
+    return pd.concat(matches).drop_duplicates("PayerName")
+
+
+def build_batch_items(df, payers=None, payer_matches=None):
+    prepared, rejected = prepare_requests(df, payers, payer_matches)
+    return [item for item, _ in iter_batch_items(prepared)], rejected
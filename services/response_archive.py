@@ -0,0 +1,134 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from config.settings import RESPONSE_ARCHIVE_PATH
+
+# Raw 271 responses, zlib-compressed and keyed by transaction ID, so result
+# tables only have to carry the handful of fields they show. Bodies are only
+# decompressed when someone drills into a row.
+
+_lock = threading.Lock()
+_conn = None
+
+
+def enabled():
+    return RESPONSE_ARCHIVE_PATH is not None
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(RESPONSE_ARCHIVE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " transaction_id TEXT PRIMARY KEY, job_id TEXT, received_at REAL NOT NULL,"
+            " raw_bytes INTEGER NOT NULL, body BLOB NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS responses_job ON responses (job_id)")
+        # Roster rows a response answered; one multi-service response covers several
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_rows ("
+            " job_id TEXT NOT NULL, row_label INTEGER NOT NULL, transaction_id TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, row_label))"
+        )
+        _conn.commit()
+    return _conn
+
+
+def compress(response):
+    raw = json.dumps(response, separators=(",", ":"), default=str).encode()
+    return len(raw), zlib.compress(raw, 6)
+
+
+def archive(job_id, responses):
+    # responses: [(transaction_id, response, row_labels), ...]; one transaction per call
+    if not enabled() or not responses:
+        return
+    now = time.time()
+    records, rows = [], []
+    for transaction_id, response, labels in responses:
+        raw_bytes, body = compress(response)
+        records.append((transaction_id, job_id, now, raw_bytes, body))
+        rows.extend((job_id, int(label), transaction_id) for label in labels or ())
+    with _lock:
+        db = _db()
+        db.executemany(
+            "INSERT OR REPLACE INTO responses (transaction_id, job_id, received_at, raw_bytes, body)"
+            " VALUES (?, ?, ?, ?, ?)",
+            records,
+        )
+        if rows:
+            db.executemany(
+                "INSERT OR REPLACE INTO response_rows (job_id, row_label, transaction_id) VALUES (?, ?, ?)", rows
+            )
+        db.commit()
+
+
+def get_response(transaction_id):
+    if not enabled() or not transaction_id:
+        return None
+    with _lock:
+        row = _db().execute("SELECT body FROM responses WHERE transaction_id = ?", (transaction_id,)).fetchone()
+    return json.loads(zlib.decompress(row[0])) if row else None
+
+
+def transaction_for_row(job_id, row_label):
+    if not enabled():
+        return None
+    with _lock:
+        row = _db().execute(
+            "SELECT transaction_id FROM response_rows WHERE job_id = ? AND row_label = ?", (job_id, int(row_label))
+        ).fetchone()
+    return row[0] if row else None
+
+
+def archived_rows(job_id):
+    # Row labels with an archived response, in row order
+    if not enabled():
+        return []
+    with _lock:
+        rows = _db().execute(
+            "SELECT row_label FROM response_rows WHERE job_id = ? ORDER BY row_label", (job_id,)
+        ).fetchall()
+    return [label for (label,) in rows]
+
+
+def stats(job_id=None):
+    if not enabled():
+        return {"responses": 0, "raw_bytes": 0, "stored_bytes": 0}
+    query = "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+    params = ()
+    if job_id:
+        query += " WHERE job_id = ?"
+        params = (job_id,)
+    with _lock:
+        count, raw_bytes, stored_bytes = _db().execute(query, params).fetchone()
+    return {"responses": count, "raw_bytes": raw_bytes, "stored_bytes": stored_bytes}
+
+
+def delete_jobs(job_ids):
+    if not enabled():
+        return
+    with _lock:
+        db = _db()
+        for table in ("response_rows", "responses"):
+            db.executemany(f"DELETE FROM {table} WHERE job_id = ?", [(job_id,) for job_id in job_ids])
+        db.commit()
+
+
+def purge(before):
+    # Drops responses received before the given time; returns how many
+    if not enabled():
+        return 0
+    with _lock:
+        db = _db()
+        count = db.execute("DELETE FROM responses WHERE received_at < ?", (before,)).rowcount
+        db.execute(
+            "DELETE FROM response_rows WHERE NOT EXISTS"
+            " (SELECT 1 FROM responses r WHERE r.transaction_id = response_rows.transaction_id)"
+        )
+        db.commit()
+    return count
@@ -0,0 +1,49 @@
+import logging
+import sqlite3
+import threading
+import time
+from config.settings import STATE_RETENTION_DAYS
+from services import batch_groups, job_store, response_archive, transaction_manifest
+
+logger = logging.getLogger(__name__)
+
+# Expired state is looked for at most this often, in seconds
+PURGE_INTERVAL = 60 * 60
+
+_lock = threading.Lock()
+_last_purge = 0.0
+
+
+def delete_job(job_id):
+    # A job or batch submission and everything kept for it: its upload,
+    # results, manifest, batch group and archived raw responses
+    batch_ids = transaction_manifest.batch_ids(job_id)
+    response_archive.delete_jobs([job_id] + batch_ids)
+    transaction_manifest.delete(job_id)
+    batch_groups.delete_group(job_id)
+    job_store.delete_job(job_id)
+    logger.info(f"Deleted job {job_id}")
+
+
+def purge_expired(retention_days=STATE_RETENTION_DAYS, now=None):
+    # Cheap to call on every rerun; returns None when nothing was looked at
+    global _last_purge
+    now = now or time.time()
+    with _lock:
+        if not retention_days or now - _last_purge < PURGE_INTERVAL:
+            return None
+        _last_purge = now
+    before = now - retention_days * 24 * 60 * 60
+    try:
+        counts = {
+            "jobs": len(job_store.purge(before)),
+            "manifests": transaction_manifest.purge(before),
+            "responses": response_archive.purge(before),
+        }
+        batch_groups.purge(before)
+    except sqlite3.Error as e:
+        logger.error(f"Purging state older than {retention_days} days failed: {e}")
+        return None
+    if any(counts.values()):
+        logger.info(f"Purged state older than {retention_days} days: {counts}")
+    return counts
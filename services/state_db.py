@@ -0,0 +1,26 @@
+import sqlite3
+import threading
+from config.settings import STATE_DB_PATH
+
+# The state database is shared by job_store, batch_groups and
+# transaction_manifest. They share one connection and one lock, so their
+# writes queue up here instead of racing each other for SQLite's write lock.
+# Each module creates its own tables the first time it connects.
+
+lock = threading.Lock()
+_conn = None
+_ready = set()
+
+
+def connect(name, schema):
+    # Caller holds lock; schema is a list of statements run once per name
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(STATE_DB_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+    if name not in _ready:
+        for statement in schema:
+            _conn.execute(statement)
+        _conn.commit()
+        _ready.add(name)
+    return _conn
@@ -0,0 +1,142 @@
+import json
+import time
+from services import state_db
+
+# What each submitted transaction answers: its batch and the roster rows it
+# was built from, as they were uploaded. Poll results are joined back to the
+# upload by transaction ID, and rows are marked as their result arrives, so
+# the rows still waiting are one indexed query away.
+
+# SQLite's default limit on bound parameters is 999
+LOOKUP_CHUNK = 500
+
+_lock = state_db.lock
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS manifests ("
+    " group_id TEXT PRIMARY KEY, columns TEXT NOT NULL, created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS manifest_rows ("
+    " transaction_id TEXT NOT NULL, row_label INTEGER NOT NULL, group_id TEXT NOT NULL,"
+    " batch_id TEXT NOT NULL, service_code TEXT, source TEXT NOT NULL, received_at REAL,"
+    " PRIMARY KEY (transaction_id, row_label))",
+    "CREATE INDEX IF NOT EXISTS manifest_rows_group ON manifest_rows (group_id, received_at)",
+    "CREATE INDEX IF NOT EXISTS manifest_rows_batch ON manifest_rows (batch_id, received_at)",
+]
+
+
+def _db():
+    return state_db.connect(__name__, SCHEMA)
+
+
+def record(group_id, columns, rows):
+    # rows: [(transaction_id, batch_id, row_label, service_code, source_row_dict), ...]
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT OR REPLACE INTO manifests (group_id, columns, created_at) VALUES (?, ?, ?)",
+            (group_id, json.dumps(list(columns)), time.time()),
+        )
+        db.executemany(
+            "INSERT OR REPLACE INTO manifest_rows"
+            " (transaction_id, row_label, group_id, batch_id, service_code, source, received_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, NULL)",
+            [(transaction_id, int(label), group_id, batch_id, service, json.dumps(source, default=str))
+             for transaction_id, batch_id, label, service, source in rows],
+        )
+        db.commit()
+
+
+def columns_for(batch_or_group_id):
+    # Upload columns of the submission a batch or group ID belongs to, or None
+    with _lock:
+        db = _db()
+        row = db.execute("SELECT columns FROM manifests WHERE group_id = ?", (batch_or_group_id,)).fetchone()
+        if row is None:
+            row = db.execute(
+                "SELECT m.columns FROM manifests m JOIN"
+                " (SELECT group_id FROM manifest_rows WHERE batch_id = ? LIMIT 1) b ON b.group_id = m.group_id",
+                (batch_or_group_id,),
+            ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _chunks(values):
+    values = list(values)
+    for i in range(0, len(values), LOOKUP_CHUNK):
+        yield values[i:i + LOOKUP_CHUNK]
+
+
+def lookup(transaction_ids):
+    # {transaction_id: [(row_label, service_code, source_row), ...] in row order}
+    found = {}
+    with _lock:
+        db = _db()
+        for ids in _chunks(set(transaction_ids)):
+            found_rows = db.execute(
+                "SELECT transaction_id, row_label, service_code, source FROM manifest_rows"
+                f" WHERE transaction_id IN ({', '.join('?' * len(ids))}) ORDER BY transaction_id, row_label",
+                ids,
+            ).fetchall()
+            for transaction_id, label, service, source in found_rows:
+                found.setdefault(transaction_id, []).append((label, service, json.loads(source)))
+    return found
+
+
+def mark_received(transaction_ids):
+    now = time.time()
+    with _lock:
+        db = _db()
+        for ids in _chunks(set(transaction_ids)):
+            db.execute(
+                f"UPDATE manifest_rows SET received_at = ? WHERE received_at IS NULL"
+                f" AND transaction_id IN ({', '.join('?' * len(ids))})",
+                [now] + ids,
+            )
+        db.commit()
+
+
+def missing_rows(batch_or_group_id):
+    # (row_label, batch_id, transaction_id, source_row) for rows with no result yet, in row order
+    with _lock:
+        rows = _db().execute(
+            "SELECT row_label, batch_id, transaction_id, source FROM manifest_rows"
+            " WHERE received_at IS NULL AND (group_id = ? OR batch_id = ?) ORDER BY row_label",
+            (batch_or_group_id, batch_or_group_id),
+        ).fetchall()
+    return [(label, batch_id, transaction_id, json.loads(source)) for label, batch_id, transaction_id, source in rows]
+
+
+def group_for(batch_or_group_id):
+    # The submission a batch belongs to, or None for a batch with no manifest
+    with _lock:
+        row = _db().execute(
+            "SELECT group_id FROM manifest_rows WHERE group_id = ? OR batch_id = ? LIMIT 1",
+            (batch_or_group_id, batch_or_group_id),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def batch_ids(group_id):
+    with _lock:
+        rows = _db().execute("SELECT DISTINCT batch_id FROM manifest_rows WHERE group_id = ?", (group_id,)).fetchall()
+    return [batch_id for (batch_id,) in rows]
+
+
+def delete(group_id):
+    with _lock:
+        db = _db()
+        db.execute("DELETE FROM manifest_rows WHERE group_id = ?", (group_id,))
+        db.execute("DELETE FROM manifests WHERE group_id = ?", (group_id,))
+        db.commit()
+
+
+def purge(before):
+    # Drops the manifests of submissions made before the given time; returns how many
+    with _lock:
+        db = _db()
+        group_ids = [(group_id,) for (group_id,) in
+                     db.execute("SELECT group_id FROM manifests WHERE created_at < ?", (before,))]
+        db.executemany("DELETE FROM manifest_rows WHERE group_id = ?", group_ids)
+        db.executemany("DELETE FROM manifests WHERE group_id = ?", group_ids)
+        db.commit()
+    return len(group_ids)
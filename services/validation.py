@@ -0,0 +1,140 @@
+import datetime
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config.settings import ENROLLED_PAYER_IDS
+from utils.payer_registry import get_payer_registry
+from utils.utils import load_service_type_codes
+
+member_id_rules_path = Path("data/member_id_rules.json")
+
+# X12 NM109 allows up to 80 characters; payers reject punctuation and spaces
+MEMBER_ID_PATTERN = r"[A-Za-z0-9-]{2,80}"
+EARLIEST_DOB = pd.Timestamp("1900-01-01")
+
+
+@lru_cache(maxsize=1)
+def member_id_rules():
+    # {payer ID: (compiled pattern, rule name, example)} from data/member_id_rules.json
+    with open(member_id_rules_path, "r", encoding="utf-8") as f:
+        rules = json.load(f)["rules"]
+    payers = get_payer_registry().payers
+    by_payer = {}
+    for rule in rules:
+        entry = (re.compile(rule["pattern"]), rule["name"], rule.get("example", ""))
+        for payer_id in rule.get("payerIds", []):
+            by_payer[payer_id.upper()] = entry
+        if rule.get("displayNamePattern"):
+            name_pattern = re.compile(rule["displayNamePattern"], re.IGNORECASE)
+            for p in payers:
+                if p["primaryPayerId"] and name_pattern.search(p["displayName"]):
+                    by_payer.setdefault(p["primaryPayerId"].upper(), entry)
+    return by_payer
+
+
+def npi_is_valid(npi):
+    # Vectorized NPI check digit: Luhn over the 9 leading digits with the
+    # 80840 card-issuer prefix, which always contributes 24 to the sum
+    npi = npi.astype("string").fillna("")
+    shaped = npi.str.fullmatch(r"\d{10}").fillna(False).to_numpy(dtype=bool)
+    valid = np.zeros(len(npi), dtype=bool)
+    if shaped.any():
+        digits = np.frombuffer("".join(npi[shaped].tolist()).encode("ascii"), dtype=np.uint8)
+        digits = digits.reshape(-1, 10).astype(np.int16) - ord("0")
+        doubled = digits[:, 0:9:2] * 2
+        total = 24 + (doubled // 10 + doubled % 10).sum(axis=1) + digits[:, 1:9:2].sum(axis=1)
+        valid[shaped] = (10 - total % 10) % 10 == digits[:, 9]
+    return pd.Series(valid, index=npi.index)
+
+
+def _payer_support(payer_ids, payers):
+    # {payer ID: reason it can't be checked, or ""} for each distinct ID
+    support = {}
+    for payer_id in payer_ids:
+        payer = payers.find_by_id(payer_id)
+        if not payer_id:
+            support[payer_id] = ""
+        elif payer is None:
+            support[payer_id] = f"Unknown payer ID '{payer_id}'"
+        elif payer["eligibility"] or payer_id.upper() in ENROLLED_PAYER_IDS:
+            support[payer_id] = ""
+        elif payer.get("eligibilityCheck") == "ENROLLMENT_REQUIRED":
+            support[payer_id] = (
+                f"{payer['displayName']} requires enrollment before eligibility checks "
+                "(add its ID to ENROLLED_PAYER_IDS once enrolled)"
+            )
+        else:
+            support[payer_id] = f"{payer['displayName']} does not support eligibility checks"
+    return support
+
+
+def add_reason(reasons, mask, message):
+    # Appends message (a string or a per-row Series) to the rows in mask
+    mask = mask.fillna(False).astype(bool)
+    if not mask.any():
+        return reasons
+    if not isinstance(message, str):
+        message = message[mask]
+    first = mask & (reasons == "")
+    reasons = reasons.mask(first, message)
+    return reasons.mask(mask & ~first, reasons + "; " + message)
+
+
+# Checks normalized request rows (FORM_COLUMNS, as prepare_requests builds
+# them) column by column. Returns a Reason per row, "" for rows that are fine
+# to send. A blank payer ID or DOB isn't reported here; prepare_requests
+# explains those with the roster's own values.
+def validate_requests(frame, payers=None, today=None):
+    payers = payers or get_payer_registry()
+    today = pd.Timestamp(today or datetime.date.today())
+    reasons = pd.Series("", index=frame.index, dtype="string")
+    if frame.empty:
+        return reasons
+
+    member_id = frame["member_id"]
+    reasons = add_reason(reasons, member_id == "", "Missing MemberID")
+    reasons = add_reason(reasons, (member_id != "") & ~member_id.str.fullmatch(MEMBER_ID_PATTERN),
+                         "MemberID '" + member_id + "' must be 2-80 letters, digits or hyphens")
+    reasons = add_reason(reasons, frame["first_name"] == "", "Missing FirstName")
+    reasons = add_reason(reasons, frame["last_name"] == "", "Missing LastName")
+    reasons = add_reason(reasons, frame["provider_name"] == "", "Missing ProviderName")
+
+    npi = frame["provider_npi"]
+    reasons = add_reason(reasons, ~npi_is_valid(npi), "Invalid ProviderNPI '" + npi + "'")
+
+    codes = frame["service_type_code"]
+    known_codes = [option.split(":")[0] for option in load_service_type_codes()]
+    reasons = add_reason(reasons, ~codes.isin(known_codes), "Unknown ServiceCode '" + codes + "'")
+
+    dob = pd.to_datetime(frame["dob"], format="%Y-%m-%d", errors="coerce")
+    reasons = add_reason(reasons, dob > today, "DOB " + frame["dob"] + " is in the future")
+    reasons = add_reason(reasons, dob < EARLIEST_DOB, "DOB " + frame["dob"] + " is before 1900")
+
+    payer_id = frame["payer_id"]
+    support = payer_id.map(_payer_support(payer_id.unique(), payers))
+    reasons = add_reason(reasons, support != "", support)
+
+    # Payer-specific member ID formats, one pass per rule that applies
+    rules = member_id_rules()
+    upper_ids = payer_id.str.upper()
+    ruled = upper_ids.isin(list(rules)) & (member_id != "")
+    if ruled.any():
+        for rule_payer in upper_ids[ruled].unique():
+            pattern, name, example = rules[rule_payer]
+            rows = ruled & (upper_ids == rule_payer)
+            bad = rows & ~member_id.str.upper().str.fullmatch(pattern.pattern)
+            reasons = add_reason(reasons, bad, f"MemberID is not a valid {name} (e.g. {example})")
+    return reasons
+
+
+def validate_form(form_data, payers=None):
+    # The same checks for a single real-time request; returns a list of reasons
+    frame = pd.DataFrame([{k: str(form_data.get(k) or "").strip() for k in (
+        "payer_id", "service_type_code", "member_id", "first_name", "last_name", "dob", "provider_name",
+        "provider_npi",
+    )}], dtype="string")
+    reason = validate_requests(frame, payers).iloc[0]
+    return reason.split("; ") if reason else []
@@ -1,98 +1,156 @@
+import datetime
+import hashlib
+import io
+from functools import lru_cache
 import pandas as pd
 import streamlit as st
-import uuid
-from utils.utils import load_payers
+from config.settings import BATCH_CHUNK_SIZE
+from utils.payer_registry import get_payer_registry
+from services import job_store, transaction_manifest
 from services.eligibility_service import submit_batch
+from services.metrics import metrics
+from services.request_builder import (
+    REQUIRED_COLUMNS,
+    iter_batch_items,
+    iter_records,
+    missing_columns,
+    prepare_requests,
+    upload_payer_matches,
+)
+from ui.payer_matches import render_payer_matches
+from ui.reject_report import render_reject_report
+from ui.render_batch_results import watch_batches
+from utils.ingestion import UPLOAD_TYPES, SpreadsheetReader
+
+
+@lru_cache(maxsize=1)
+def template_bytes():
+    # Header-only workbook, built once per process
+    import openpyxl
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Sheet1"
+    sheet.append(REQUIRED_COLUMNS)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def record_batch_job(group_id, name, source_hash, response, items, members, rejected, columns, sources):
+    # Per-row outcome of a submission: which batch and transaction answer each
+    # row (and for which service code), or why the row wasn't sent. Accepted
+    # rows also go into the transaction manifest with their uploaded values,
+    # parallel to members in sources, for joining results back to the upload.
+    batch_ids = {batch["chunk"]: batch["batchId"] for batch in response["batches"]}
+    failures = {failed["chunk"]: failed["error"] for failed in response["failedChunks"]}
+    rows, manifest = [], []
+    for i, (item, item_members, item_sources) in enumerate(zip(items, members, sources)):
+        chunk = i // BATCH_CHUNK_SIZE
+        transaction_id = item["submitterTransactionIdentifier"]
+        for (label, service), source in zip(item_members, item_sources):
+            outcome = {"transactionId": transaction_id, "serviceTypeCode": service}
+            if chunk in batch_ids:
+                rows.append((label, "submitted", dict(outcome, batchId=batch_ids[chunk])))
+                manifest.append((transaction_id, batch_ids[chunk], label, service, source))
+            else:
+                rows.append((label, "failed", dict(outcome, error=failures.get(chunk))))
+    if "Reason" in rejected:
+        rows.extend((label, "rejected", {"error": reason}) for label, reason in rejected["Reason"].items())
+
+    job_store.create_job(
+        job_store.BATCH, name, source_hash=source_hash, total_rows=len(rows), status="submitted", job_id=group_id
+    )
+    job_store.record_rows(group_id, rows)
+    transaction_manifest.record(group_id, columns, manifest)
 
 
 def render_batch_form():
-    st.info("Upload an Excel file with subscriber demographics to check eligibility in batch.")
-
-    template_df = pd.DataFrame(columns=[
-        "MemberID", "FirstName", "LastName", "DOB",
-        "ProviderName", "ProviderNPI", "ServiceCode",
-        "PayerName", "PayerID"
-    ])
-
-    template_file = "batch_template.xlsx"
-    template_df.to_excel(template_file, index=False)
+    st.info("Upload an Excel, CSV or Parquet file with subscriber demographics to check eligibility in batch.")
 
     st.download_button(
         label="Download template Excel",
-        data=open(template_file, "rb"),
+        data=template_bytes(),
         file_name="batch_template.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
 
-    uploaded_file = st.file_uploader("Upload Excel file", type=["xlsx", "xls"])
+    uploaded_file = st.file_uploader("Upload roster file", type=UPLOAD_TYPES, key="batch_submit_upload")
 
     if not uploaded_file:
         return
 
     try:
-        df = pd.read_excel(uploaded_file)
+        reader = SpreadsheetReader(uploaded_file, uploaded_file.name)
     except Exception as e:
         st.error(f"Failed to read uploaded file: {e}")
         return
 
-    required_columns = [
-        "MemberID", "FirstName", "LastName", "DOB",
-        "ProviderName", "ProviderNPI", "ServiceCode",
-        "PayerName", "PayerID"
-    ]
+    # The reader keeps an Excel workbook open for the send path; close it on
+    # every way out, including the early returns
+    try:
+        _render_upload(uploaded_file, reader)
+    finally:
+        reader.close()
+
 
-    missing = [c for c in required_columns if c not in df.columns]
+def _render_upload(uploaded_file, reader):
+    missing = missing_columns(reader.columns)
     if missing:
         st.error(f"Missing required columns: {', '.join(missing)}")
         return
 
-    if len(df) > 1000:
-        st.error("Maximum batch size is 1000 rows.")
-        return
-
     st.success(f"File uploaded: {uploaded_file.name}")
-    st.dataframe(df.head(10))
-
-    payers = load_payers()
-
-    if st.button("Send Batch Request"):
-        items = []
-        for _, row in df.iterrows():
-            payer_id = str(row.get("PayerID", "")).strip()
-            payer_name = str(row.get("PayerName", "")).strip().lower()
-
-            if not payer_id:
-                match = next((p for p in payers if p["displayName"].lower() == payer_name), None)
-                if match:
-                    payer_id = match["primaryPayerId"]
-
-            if not payer_id:
-                st.warning(f"No valid PayerID for payer '{row.get('PayerName')}', skipping.")
-                continue
-
-            first_name = str(row["FirstName"]).replace("`", "'")
-            last_name = str(row["LastName"]).replace("`", "'")
-            dob_str = pd.to_datetime(row["DOB"]).strftime("%Y%m%d")
-
-            items.append({
-                "encounter": {"serviceTypeCodes": [str(row["ServiceCode"])]},
-                "provider": {
-                    "npi": str(row["ProviderNPI"]),
-                    "organizationName": row["ProviderName"],
-                },
-                "submitterTransactionIdentifier": str(uuid.uuid4()),
-                "subscriber": {
-                    "dateOfBirth": dob_str,
-                    "firstName": first_name,
-                    "lastName": last_name,
-                    "memberId": str(row["MemberID"]),
-                },
-                "tradingPartnerServiceId": payer_id,
-            })
+    st.dataframe(reader.preview(10))
+
+    payers = get_payer_registry()
+
+    # Every submission is billed, so the same file is only sent again on request
+    data = uploaded_file.getvalue()
+    source_hash = hashlib.sha256(data).hexdigest()
+    previous = job_store.find_job(job_store.BATCH, source_hash)
+    allow_send = True
+    if previous:
+        submitted = datetime.datetime.fromtimestamp(previous["created_at"]).strftime("%Y-%m-%d %H:%M")
+        st.warning(
+            f"This file was already submitted on {submitted} as Group ID {previous['job_id']}. "
+            "Fetch its results in the View Batch Results tab."
+        )
+        allow_send = st.checkbox("Submit this file again", key="batch_resubmit")
+
+    # Approximate payer matches are found once per upload and confirmed before anything is built
+    matches = st.session_state.get("batch_payer_matches")
+    if not matches or matches[0] != source_hash:
+        with metrics.timer("validate"):
+            matches = (source_hash, upload_payer_matches(SpreadsheetReader(io.BytesIO(data), uploaded_file.name),
+                                                         payers))
+        st.session_state["batch_payer_matches"] = matches
+    payer_matches = render_payer_matches(matches[1], key=f"batch_payer_matches_{source_hash[:12]}")
+
+    if st.button("Send Batch Request", disabled=not allow_send):
+        items, members, sources, rejected = [], [], [], []
+        try:
+            for chunk in metrics.timed_iter("ingest", reader.chunks()):
+                with metrics.timer("build"):
+                    prepared, chunk_rejected = prepare_requests(chunk, payers, payer_matches)
+                    uploaded = dict(zip(chunk.index, iter_records(chunk, reader.columns)))
+                    for item, item_members in iter_batch_items(prepared):
+                        items.append(item)
+                        members.append(item_members)
+                        sources.append([uploaded[label] for label, _ in item_members])
+                rejected.append(chunk_rejected)
+        except Exception as e:
+            st.error(f"Failed to read uploaded file: {e}")
+            return
+
+        rejected = pd.concat(rejected) if rejected else pd.DataFrame()
+        render_reject_report(rejected, key="batch_reject_report")
 
         if not items:
             st.error("No valid rows to send.")
             return
+        sent_rows = sum(len(item_members) for item_members in members)
+        if sent_rows > len(items):
+            st.caption(f"{sent_rows} rows share subscribers and go out as {len(items)} multi-service requests.")
 
         with st.spinner("Submitting batch to Stedi..."):
             response = submit_batch(items)
@@ -101,6 +159,23 @@ def render_batch_form():
             st.error(f"Batch submission failed: {response['error']}")
             return
 
-        batch_id = response.get("batchId", "N/A")
-        st.success(f"Batch submitted successfully. Batch ID: {batch_id}")
-        st.info("Results will be available asynchronously. Retrieve them later using the Poll Batch Results section.")
+        group_id = response["groupId"]
+        batches = response["batches"]
+        record_batch_job(group_id, uploaded_file.name, source_hash, response, items, members, rejected,
+                         reader.columns, sources)
+        watch_batches(batches)
+
+        if len(batches) == 1 and not response["failedChunks"]:
+            st.success(f"Batch submitted successfully. Batch ID: {batches[0]['batchId']}")
+        else:
+            st.success(
+                f"Submitted {response['submittedItems']} requests as {len(batches)} batches. "
+                f"Group ID: {group_id}"
+            )
+            st.dataframe(pd.DataFrame(batches))
+        for failed in response["failedChunks"]:
+            st.error(f"Chunk {failed['chunk'] + 1} ({failed['items']} requests) was not accepted: {failed['error']}")
+        st.info(
+            "Results will be available asynchronously. Progress is tracked in the View Batch Results tab; "
+            f"fetch the whole submission there with Group ID {group_id}."
+        )
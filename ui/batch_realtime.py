@@ -1,111 +1,282 @@
+import datetime
+import hashlib
+import io
 import streamlit as st
 import pandas as pd
-import numpy as np
-from services.eligibility_service import build_request_body, check_eligibility
+from config.settings import BATCH_CONCURRENCY, DELTA_MAX_AGE_DAYS
+from services import delta_check, job_store, response_archive, retention
+from services.batch_runner import RESULT_COLUMNS
+from services.job_runner import get_job_runner
+from services.metrics import metrics
+from services.payer_limiter import OPEN, get_payer_limiters
+from services.request_builder import missing_columns, rejected_rows, upload_payer_matches
+from ui.downloads import render_download
+from ui.payer_matches import render_payer_matches
+from ui.reject_report import render_reject_report
+from ui.render_batch_results import render_raw_response
+from utils.ingestion import UPLOAD_TYPES, SpreadsheetReader
+
+# Rows shown on the page; downloads always include every row
+DISPLAY_ROWS = 1000
+
+# Statuses a realtime job can be resumed from
+RESUMABLE = ("interrupted", "stopped", "failed")
+
+
+def _job_label(job):
+    created = datetime.datetime.fromtimestamp(job["created_at"]).strftime("%Y-%m-%d %H:%M")
+    return f"{job['name']} · {created} · {job['status']}"
+
+
+def _start_job(uploaded_file, data, source_hash, workers, payer_matches, carry=None):
+    # carry: earlier results to record up front, so the job never sends those rows
+    reader = SpreadsheetReader(io.BytesIO(data), uploaded_file.name)
+    job_id = job_store.create_job(
+        job_store.REALTIME, uploaded_file.name, source_hash=source_hash, total_rows=reader.total_rows,
+        workers=workers, source=data, payer_matches=payer_matches,
+    )
+    reader.close()
+    if carry:
+        job_store.carry_rows(job_id, carry)
+    get_job_runner().start(job_id)
+    return job_id
+
+
+def _result_columns(job):
+    # Jobs that carried earlier results forward say which rows they checked themselves
+    marked = bool(job["counts"].get(job_store.CARRIED))
+    return marked, RESULT_COLUMNS + job_store.MARK_COLUMNS if marked else RESULT_COLUMNS
+
+
+def _render_job_status(job):
+    total = job["total_rows"]
+    done = job["completed"]
+    fraction = min(done / total, 1.0) if total else 0.0
+    st.progress(fraction, text=f"Checked {done} of {total or '?'} rows · {job['status']}")
+    if job["counts"].get("error"):
+        st.caption(f"{job['counts']['error']} rows ended in an error")
+    if job["counts"].get(job_store.CARRIED):
+        st.caption(f"{job['counts'][job_store.CARRIED]} rows carried forward from earlier results")
+    if job["error"]:
+        st.error(f"Job failed: {job['error']}")
+
+
+@st.fragment(run_every=2)
+def _render_live_job(job_id):
+    runner = get_job_runner()
+    job = runner.status(job_id)
+    if not job["running"]:
+        # Finished while we were watching; redraw the full view
+        st.rerun()
+    _render_job_status(job)
+    failing = [p["payer"] for p in get_payer_limiters().snapshot() if p["state"] == OPEN]
+    if failing:
+        st.warning(f"Failing payers, retried at the end of the run: {', '.join(failing)}")
+    if st.button("Stop", key=f"stop_{job_id}"):
+        runner.stop(job_id)
+    marked, columns = _result_columns(job)
+    with metrics.timer("render"):
+        st.dataframe(pd.DataFrame(job_store.job_results(job_id, limit=DISPLAY_ROWS, marked=marked)))
+    if job["completed"]:
+        render_download(lambda: job_store.iter_job_results(job_id, marked=marked), columns,
+                        "eligibility_results_partial", key=f"partial_{job_id}", label="Download results so far")
+
+
+def _render_finished_job(job_id):
+    runner = get_job_runner()
+    job = runner.status(job_id)
+    _render_job_status(job)
+
+    if job["status"] in RESUMABLE:
+        st.info(f"{job['completed']} rows are already checked and will not be sent again.")
+        if st.button("Resume", key=f"resume_{job_id}"):
+            runner.start(job_id)
+            st.rerun()
+
+    if not job["completed"]:
+        st.warning("The uploaded file has no rows." if job["status"] == "done" else "No rows checked yet.")
+        return
+
+    marked, columns = _result_columns(job)
+    with metrics.timer("render"):
+        st.write("Processed Results:",
+                 pd.DataFrame(job_store.job_results(job_id, limit=DISPLAY_ROWS, marked=marked)))
+    if job["completed"] > DISPLAY_ROWS:
+        st.caption(f"Showing the first {DISPLAY_ROWS} of {job['completed']} rows; the download has all of them.")
+    render_download(lambda: job_store.iter_job_results(job_id, marked=marked), columns, "eligibility_results",
+                    key=f"download_{job_id}")
+
+    if response_archive.enabled():
+        with st.expander("Raw response"):
+            # Decompressed from the archive only for the row asked for
+            row = st.number_input("Row in the uploaded file", min_value=1, max_value=max(job["total_rows"] or 1, 1),
+                                  value=None, key=f"raw_row_{job_id}")
+            if row:
+                transaction_id = response_archive.transaction_for_row(job_id, row - 1)
+                if transaction_id:
+                    render_raw_response(transaction_id)
+                else:
+                    st.caption("No archived response for this row; it ended in an error, was not checked, "
+                               "or was carried forward from earlier results.")
+
+
+def _render_delta_form(uploaded_file, data, source_hash, workers, payer_matches):
+    st.caption(
+        "Rows matching an earlier result by payer, member ID and service code keep that result. Only new "
+        "rows, rows whose name, DOB, payer ID or provider NPI changed, rows that ended in an error and "
+        "results older than the age below are sent."
+    )
+    basis = st.radio("Compare against", ["Earlier job", "Results file"], horizontal=True, key="delta_basis")
+    if basis == "Earlier job":
+        jobs = job_store.list_jobs(job_store.REALTIME)
+        if not jobs:
+            st.caption("No earlier jobs yet.")
+            return
+        labels = {job["job_id"]: _job_label(job) for job in jobs}
+        earlier_job = st.selectbox("Earlier job", list(labels), format_func=labels.get, key="delta_job")
+    else:
+        results_file = st.file_uploader("Earlier results file", type=UPLOAD_TYPES, key="delta_results_upload")
+        checked_on = st.date_input("Checked on", help="Used for rows without a Checked At column",
+                                   key="delta_checked_on")
+    max_age = st.number_input("Re-check results checked more than this many days ago", min_value=0,
+                              value=DELTA_MAX_AGE_DAYS, step=1, key="delta_max_age",
+                              help="0 re-checks everything not checked today")
+
+    if st.button("Run delta check"):
+        try:
+            if basis == "Earlier job":
+                previous = delta_check.job_results_frame(earlier_job)
+            elif results_file is None:
+                st.error("Upload the earlier results file first.")
+                return
+            else:
+                reader = SpreadsheetReader(results_file, results_file.name)
+                previous = delta_check.results_file_frame(reader, checked_on)
+                reader.close()
+        except Exception as e:
+            st.error(f"Failed to read earlier results: {e}")
+            return
+
+        reader = SpreadsheetReader(io.BytesIO(data), uploaded_file.name)
+        with metrics.timer("delta"):
+            carry, reasons = delta_check.plan_delta(reader, previous, max_age)
+        reader.close()
+        job_id = _start_job(uploaded_file, data, source_hash, workers, payer_matches, carry=carry)
+        st.session_state["realtime_job_id"] = job_id
+        st.session_state["realtime_delta_plan"] = (job_id, reasons.value_counts().to_dict())
+
+
+def _render_delta_plan(job_id):
+    plan = st.session_state.get("realtime_delta_plan")
+    if not plan or plan[0] != job_id:
+        return
+    counts = plan[1]
+    total = sum(counts.values())
+    sent = total - counts.get(delta_check.CARRIED, 0)
+    why = ", ".join(f"{counts[reason]} {reason}" for reason in (
+        delta_check.NEW, delta_check.CHANGED, delta_check.ERRORED, delta_check.STALE,
+    ) if counts.get(reason))
+    st.info(f"Re-checking {sent} of {total} rows{f' ({why})' if why else ''}; the rest keep their earlier results.")
+
+
+def render_job(job_id):
+    _render_delta_plan(job_id)
+    if get_job_runner().is_running(job_id):
+        _render_live_job(job_id)
+    else:
+        _render_finished_job(job_id)
 
 
 def render_batch_realtime():
     st.header("Batch Eligibility Check")
 
-    uploaded_file = st.file_uploader("Upload Excel file", type=["xlsx"])
+    uploaded_file = st.file_uploader("Upload roster file", type=UPLOAD_TYPES, key="batch_realtime_upload")
 
     if uploaded_file:
-        df = pd.read_excel(uploaded_file)
-        st.write("Preview of uploaded file:", df.head())
-
-        if st.button("Run Eligibility Check"):
-            results = []
-
-            for idx, row in df.iterrows():
-                try:
-                    # Build request for each row
-                    request_body = build_request_body(
-                        member_id=row["MemberID"],
-                        first_name=row["FirstName"],
-                        last_name=row["LastName"],
-                        dob=row["DOB"],
-                        provider_name=row["ProviderName"],
-                        provider_npi=row["ProviderNPI"],
-                        service_code=row["ServiceCode"],
-                        payer_name=row["PayerName"],
-                        payer_id=row["PayerID"]
-                    )
-
-                    # Call API
-                    response = check_eligibility(request_body)
-
-                    # Parse the response safely
-                    benefit_info = response.get("benefitsInformation", [])
-                    deductible = np.nan
-                    copay = np.nan
-                    plan_name = np.nan
-                    active_date = np.nan
-                    termination_date = np.nan
-                    eligibility_status = np.nan
-                    comment = np.nan
-
-                    for item in benefit_info:
-                        if item.get("name") == "Deductible":
-                            deductible = item.get("benefitAmount", np.nan)
-                        if item.get("name") == "Co-Payment":
-                            copay = item.get("benefitAmount", np.nan)
-                        if item.get("name") == "Active Coverage":
-                            eligibility_status = "Active"
-                            plan_name = item.get("planCoverage", np.nan)
-                        if "Active" in item.get("name", "") and "Terminated" in item.get("name", ""):
-                            eligibility_status = "Inactive"
-
-                    # Build result row
-                    results.append({
-                        "DOS": np.nan,
-                        "Patient's Name": f"{row['FirstName']} {row['LastName']}",
-                        "DOB": row["DOB"],
-                        "Primary Insurance Name": row["PayerName"],
-                        "Member ID": row["MemberID"],
-                        "Plan Name & Type": plan_name,
-                        "Remaining Deductible": deductible,
-                        "Co-pay": copay,
-                        "Referral Required": np.nan,
-                        "Active Date": active_date,
-                        "Termination Date": termination_date,
-                        "Outstanding Balance": np.nan,
-                        "Eligibility Status": eligibility_status,
-                        "Secondary Insurance Name": np.nan,
-                        "Member ID (Secondary)": np.nan,
-                        "Active Date (Secondary)": np.nan,
-                        "Termination Date (Secondary)": np.nan,
-                        "Eligibility Status (Secondary)": np.nan,
-                        "Comment": comment
-                    })
-
-                except Exception as e:
-                    results.append({
-                        "DOS": np.nan,
-                        "Patient's Name": f"{row['FirstName']} {row['LastName']}",
-                        "DOB": row["DOB"],
-                        "Primary Insurance Name": row["PayerName"],
-                        "Member ID": row["MemberID"],
-                        "Plan Name & Type": np.nan,
-                        "Remaining Deductible": np.nan,
-                        "Co-pay": np.nan,
-                        "Referral Required": np.nan,
-                        "Active Date": np.nan,
-                        "Termination Date": np.nan,
-                        "Outstanding Balance": np.nan,
-                        "Eligibility Status": "Error",
-                        "Secondary Insurance Name": np.nan,
-                        "Member ID (Secondary)": np.nan,
-                        "Active Date (Secondary)": np.nan,
-                        "Termination Date (Secondary)": np.nan,
-                        "Eligibility Status (Secondary)": np.nan,
-                        "Comment": str(e)
-                    })
-
-            # Convert results to DataFrame
-            result_df = pd.DataFrame(results)
-
-            # Display and download link
-            st.write("Processed Results:", result_df)
-            output_path = "batch_results.xlsx"
-            result_df.to_excel(output_path, index=False)
-            st.download_button("Download Results", open(output_path, "rb"), file_name="eligibility_results.xlsx")
+        try:
+            reader = SpreadsheetReader(uploaded_file, uploaded_file.name)
+        except Exception as e:
+            st.error(f"Failed to read uploaded file: {e}")
+            return
+
+        # Only the header and preview are read here; the job reads its own copy
+        try:
+            missing = missing_columns(reader.columns)
+            if missing:
+                st.error(f"Missing required columns: {', '.join(missing)}")
+                return
+
+            st.write("Preview of uploaded file:", reader.preview(5))
+        finally:
+            reader.close()
+
+        workers = st.number_input("Concurrent checks", min_value=1, max_value=64, value=BATCH_CONCURRENCY)
+
+        data = uploaded_file.getvalue()
+        source_hash = hashlib.sha256(data).hexdigest()
+        previous = job_store.find_job(job_store.REALTIME, source_hash)
+
+        # Approximate payer matches are found once per upload and only used once confirmed
+        matches = st.session_state.get("realtime_payer_matches")
+        if not matches or matches[0] != source_hash:
+            with metrics.timer("validate"):
+                matches = (source_hash, upload_payer_matches(SpreadsheetReader(io.BytesIO(data), uploaded_file.name)))
+            st.session_state["realtime_payer_matches"] = matches
+        payer_matches = render_payer_matches(matches[1], key=f"realtime_payer_matches_{source_hash[:12]}")
+
+        # Pre-flight checks run once per upload and set of confirmed matches; failing rows are never sent
+        preflight = st.session_state.get("realtime_preflight")
+        preflight_key = (source_hash, tuple(sorted(payer_matches.items())))
+        if not preflight or preflight[0] != preflight_key:
+            with metrics.timer("validate"):
+                preflight = (preflight_key, rejected_rows(SpreadsheetReader(io.BytesIO(data), uploaded_file.name),
+                                                          payer_matches=payer_matches))
+            st.session_state["realtime_preflight"] = preflight
+        render_reject_report(preflight[1], key="realtime_reject_report",
+                             message="{count} rows fail pre-flight checks and will not be sent:")
+
+        # Uploading a file that already has a job reattaches to that job
+        if previous:
+            attached = job_store.get_job(st.session_state.get("realtime_job_id") or "")
+            if not attached or attached["source_hash"] != source_hash:
+                st.session_state["realtime_job_id"] = previous["job_id"]
+
+        if previous and previous["status"] == "done":
+            st.info(f"This file was already checked ({_job_label(previous)}). Its saved results are shown below.")
+            if st.button("Check again", help="Sends every row to the payer again"):
+                st.session_state["realtime_job_id"] = _start_job(uploaded_file, data, source_hash, workers,
+                                                                 payer_matches)
+
+        # Running a file with an unfinished job resumes it; checked rows are never sent again
+        elif st.button("Run Eligibility Check"):
+            if previous:
+                get_job_runner().start(previous["job_id"])
+                st.session_state["realtime_job_id"] = previous["job_id"]
+            else:
+                st.session_state["realtime_job_id"] = _start_job(uploaded_file, data, source_hash, workers,
+                                                                 payer_matches)
+
+        with st.expander("Re-check only what changed"):
+            _render_delta_form(uploaded_file, data, source_hash, workers, payer_matches)
+
+    jobs = job_store.list_jobs(job_store.REALTIME)
+    if jobs:
+        with st.expander("Previous jobs"):
+            labels = {job["job_id"]: _job_label(job) for job in jobs}
+            choice = st.selectbox("Job", list(labels), format_func=labels.get, key="realtime_job_choice")
+            open_col, delete_col = st.columns(2)
+            if open_col.button("Open job"):
+                st.session_state["realtime_job_id"] = choice
+            if delete_col.button("Delete job", help="Deletes the job's results, upload and raw responses"):
+                if get_job_runner().is_running(choice):
+                    st.warning("Stop the job before deleting it.")
+                else:
+                    retention.delete_job(choice)
+                    if st.session_state.get("realtime_job_id") == choice:
+                        st.session_state.pop("realtime_job_id")
+                    st.rerun()
+
+    job_id = st.session_state.get("realtime_job_id")
+    if job_id and job_store.get_job(job_id):
+        st.subheader("Results")
+        render_job(job_id)
@@ -0,0 +1,74 @@
+import datetime
+import pandas as pd
+import streamlit as st
+from services.metrics import metrics
+from services.payer_limiter import get_payer_limiters
+
+STAGE_COLUMNS = ["count", "errors", "error_rate", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+
+def _summary_table(summaries, label):
+    if not summaries:
+        return None
+    df = pd.DataFrame.from_dict(summaries, orient="index")[STAGE_COLUMNS]
+    df.index.name = label
+    return df.sort_values("count", ascending=False).round(1)
+
+
+def render_diagnostics():
+    st.header("Diagnostics")
+
+    if not metrics.enabled:
+        st.info("Metrics are disabled. Set METRICS_ENABLED=true to collect timings.")
+        return
+
+    snap = metrics.snapshot()
+    since = datetime.datetime.fromtimestamp(snap["since"]).strftime("%Y-%m-%d %H:%M:%S")
+    st.caption(f"Collected since {since} in this server process. Latencies are bucketed; p50/p95/p99 are bucket upper bounds.")
+
+    st.subheader("Stages")
+    stages = _summary_table(snap["stages"], "stage")
+    if stages is None:
+        st.write("No timings recorded yet.")
+    else:
+        st.dataframe(stages)
+
+    payers = _summary_table(snap["payers"], "payer")
+    if payers is not None:
+        st.subheader("Eligibility calls by payer")
+        st.dataframe(payers)
+
+    limiters = get_payer_limiters()
+    limits = limiters.snapshot()
+    if limits:
+        st.subheader("Payer limits")
+        st.caption("Concurrency limit, token bucket and circuit breaker state per payer for real-time checks.")
+        st.dataframe(pd.DataFrame(limits).set_index("payer").sort_values("sent", ascending=False))
+        if st.button("Reset payer limits", help="Closes every breaker and starts each payer from its initial limit"):
+            limiters.reset()
+            st.rerun()
+
+    if snap["counters"]:
+        st.subheader("Counters")
+        st.dataframe(pd.DataFrame(sorted(snap["counters"].items()), columns=["event", "count"]), hide_index=True)
+
+    cache = snap["collectors"].get("cache")
+    if cache:
+        st.subheader("Response cache")
+        cols = st.columns(4)
+        cols[0].metric("Hit rate", f"{cache['hit_rate']:.0%}")
+        cols[1].metric("Hits", cache["hits"])
+        cols[2].metric("Misses", cache["misses"])
+        cols[3].metric("Coalesced", cache["coalesced"])
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        st.download_button("Download Prometheus", metrics.to_prometheus(), file_name="eligibility_metrics.prom",
+                           mime="text/plain")
+    with c2:
+        st.download_button("Download JSON", metrics.to_json(), file_name="eligibility_metrics.json",
+                           mime="application/json")
+    with c3:
+        if st.button("Reset metrics"):
+            metrics.reset()
+            st.rerun()
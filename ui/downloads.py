@@ -0,0 +1,18 @@
+import streamlit as st
+from services.metrics import metrics
+from utils.export import EXPORT_FORMATS, MIME_TYPES, export_bytes
+
+
+def render_download(rows, columns, file_stem, key, label="Download Results"):
+    # rows: a callable returning an iterable of row dicts. The file is only
+    # built when the button is clicked, so a download while a run is still
+    # going gets whatever has completed so far.
+    fmt = st.radio("Format", EXPORT_FORMATS, index=EXPORT_FORMATS.index("xlsx"), horizontal=True,
+                   format_func=str.upper, key=f"{key}_format")
+
+    def build():
+        with metrics.timer("export"):
+            return export_bytes(rows(), columns, fmt)
+
+    st.download_button(label, data=build, file_name=f"{file_stem}.{fmt}", mime=MIME_TYPES[fmt], key=key,
+                       on_click="ignore")
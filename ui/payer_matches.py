@@ -0,0 +1,15 @@
+import streamlit as st
+
+
+def render_payer_matches(matches, key):
+    # Approximate payer name matches are only used once someone ticks them;
+    # returns the confirmed ones as {PayerName: PayerID}
+    if matches is None or matches.empty:
+        return {}
+    st.warning(
+        f"{len(matches)} payer names have no exact match. Tick each match to use; rows whose payer name "
+        "stays unticked are not sent."
+    )
+    edited = st.data_editor(matches.assign(Use=False), hide_index=True, disabled=list(matches.columns), key=key)
+    confirmed = edited[edited["Use"]]
+    return dict(zip(confirmed["PayerName"], confirmed["PayerID"]))
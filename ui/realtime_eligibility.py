@@ -1,24 +1,35 @@
 import streamlit as st
 import json
 import datetime
+import pandas as pd
 from services.eligibility_service import check_eligibility, build_request_body
-from utils.utils import load_service_type_codes, load_payers
+from services.eligibility_cache import get_eligibility_cache
+from services.benefits import benefit_table, extract
+from services.metrics import metrics
+from services.validation import validate_form
+from utils.utils import load_service_type_codes
+from utils.payer_registry import get_payer_registry
+
+# Payers offered for what has been typed so far
+PAYER_SUGGESTIONS = 20
 
 
 def render_form():
     st.header("Payer Information")
 
-    payers = load_payers()
-    payer_names = sorted([p["displayName"] for p in payers])
-    payer_name = st.selectbox("Payer *", ["Select a Payer"] + payer_names)
+    # Typeahead over the payer index instead of a selectbox of every payer
+    query = st.text_input("Payer *", placeholder="Search by payer name, alias or ID")
 
     # Automatically fill payer_id when payer is selected
     auto_payer_id = ""
-    if payer_name != "Select a Payer":
-        auto_payer_id = next(
-            (p["primaryPayerId"] for p in payers if p["displayName"] == payer_name),
-            ""
-        )
+    if query.strip():
+        matches = get_payer_registry().search_index().search(query, limit=PAYER_SUGGESTIONS)
+        if matches:
+            names = [p["displayName"] for p in matches]
+            payer_name = st.selectbox("Matching payers", names)
+            auto_payer_id = matches[names.index(payer_name)]["primaryPayerId"]
+        else:
+            st.caption("No matching payers.")
 
     # Allow manual override (user can still type their own)
     payer_id = st.text_input(
@@ -58,6 +69,8 @@ def render_form():
     with c2:
         provider_npi = st.text_input("Provider NPI *")
 
+    force_refresh = st.checkbox("Force refresh", help="Skip cached results and query the payer again")
+
     if st.button("Check Eligibility"):
         if not payer_id:
             st.error("Payer ID is required.")
@@ -77,12 +90,20 @@ def render_form():
             "provider_npi": provider_npi.strip(),
         }
 
+        problems = validate_form(form_data)
+        if problems:
+            for problem in problems:
+                st.error(problem)
+            return
+
         st.subheader("Request Body")
         st.json(build_request_body(form_data))
-        print(build_request_body(form_data))
 
         with st.spinner("Checking eligibility..."):
-            response = check_eligibility(form_data)
+            response = check_eligibility(form_data, force_refresh=force_refresh)
+
+        cache_stats = get_eligibility_cache().stats()
+        st.caption(f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
 
         st.subheader("Response Summary")
 
@@ -90,6 +111,16 @@ def render_form():
             if isinstance(response, str):
                 response = json.loads(response)
 
+            # === Coverage Summary ===
+            if "error" not in response:
+                with metrics.timer("parse"):
+                    summary = extract(response, service=form_data["service_type_code"])
+                cols = st.columns(4)
+                cols[0].metric("Status", str(summary["Eligibility Status"]))
+                cols[1].metric("Plan", str(summary["Plan Name & Type"]))
+                cols[2].metric("Remaining Deductible", str(summary["Remaining Deductible"]))
+                cols[3].metric("Co-pay", str(summary["Co-pay"]))
+
             # === Meta Section ===
             with st.expander("Meta Information", expanded=False):
                 meta = response.get("meta", {})
@@ -138,7 +169,6 @@ def render_form():
                 st.write(f"**Eligibility Start:** {plan_dates.get('eligibilityBegin')}")
 
             # === Plan Status ===
-            import pandas as pd
             with st.expander("Plan Status Details", expanded=False):
                 plan_status = response.get("planStatus", [])
                 if plan_status:
@@ -146,12 +176,9 @@ def render_form():
 
             # === Benefits Information ===
             with st.expander("Benefits Information", expanded=True):
-                benefits = response.get("benefitsInformation", [])
+                benefits = benefit_table(response)
                 if benefits:
-                    df = pd.DataFrame(benefits)
-                    df["serviceTypeCodes"] = df["serviceTypeCodes"].apply(lambda x: ", ".join(x) if isinstance(x, list) else x)
-                    df["serviceTypes"] = df["serviceTypes"].apply(lambda x: ", ".join(x) if isinstance(x, list) else x)
-                    st.dataframe(df[["name", "coverageLevel", "benefitAmount", "benefitPercent", "inPlanNetworkIndicator", "serviceTypes"]].fillna(""))
+                    st.dataframe(pd.DataFrame(benefits).fillna(""))
 
             # === Errors ===
             errors = response.get("errors", [])
@@ -0,0 +1,13 @@
+import streamlit as st
+
+
+def render_reject_report(rejected, key, message="Skipping {count} rows that can't be sent:"):
+    # Rows that failed pre-flight checks, with every reason, and a CSV of them
+    if rejected is None or rejected.empty:
+        return
+    st.warning(message.format(count=len(rejected)))
+    st.dataframe(rejected)
+    report = rejected.rename_axis("Row").reset_index()
+    report["Row"] += 1
+    st.download_button("Download reject report", report.to_csv(index=False), file_name="rejected_rows.csv",
+                       mime="text/csv", key=key, on_click="ignore")
@@ -1,64 +1,306 @@
-import io
+import datetime
+import time
 import pandas as pd
 import streamlit as st
-from services.eligibility_service import poll_batch_results
+from services.eligibility_service import open_results_cursor
+from services.batch_watcher import get_batch_watcher
+from services.batch_groups import get_group
+from services import job_store, response_archive, retention, transaction_manifest
+from services.benefits import extract_many
+from services.metrics import metrics
+from services.request_builder import iter_records
+from ui.downloads import render_download
+
+RESULT_COLUMNS = [
+    "BatchID", "TransactionID", "ServiceCode", "MemberID", "FirstName", "LastName", "DOB", "Provider",
+    "CoverageStatus", "Plan", "RemainingDeductible", "CoPay", "ActiveDate", "TerminationDate",
+    "SecondaryInsurance",
+]
+
+# Result columns appended to the uploaded row when a submission has a manifest;
+# the subscriber fields come from the upload itself
+JOINED_COLUMNS = [
+    "BatchID", "TransactionID", "CoverageStatus", "Plan", "RemainingDeductible", "CoPay", "ActiveDate",
+    "TerminationDate", "SecondaryInsurance",
+]
+
+
+def flatten_results(items, services_by_transaction=None):
+    # A multi-service request answers several roster rows: emit one record per
+    # requested service code when the submission recorded them
+    services_by_transaction = services_by_transaction or {}
+    expanded, services = [], []
+    for item in items:
+        for service in services_by_transaction.get(item.get("submitterTransactionIdentifier")) or [None]:
+            expanded.append(item)
+            services.append(service)
+
+    extracted = extract_many(expanded, services=services)
+    records = []
+    for item, service, fields in zip(expanded, services, extracted.to_dict("records")):
+        subscriber = item.get("subscriber", {})
+        provider = item.get("provider", {})
+        records.append({
+            "BatchID": item.get("batchId"),
+            "TransactionID": item.get("submitterTransactionIdentifier"),
+            "ServiceCode": service,
+            "MemberID": subscriber.get("memberId"),
+            "FirstName": subscriber.get("firstName"),
+            "LastName": subscriber.get("lastName"),
+            "DOB": subscriber.get("dateOfBirth"),
+            "Provider": provider.get("organizationName") or provider.get("providerOrgName"),
+            "CoverageStatus": fields["Eligibility Status"],
+            "Plan": fields["Plan Name & Type"],
+            "RemainingDeductible": fields["Remaining Deductible"],
+            "CoPay": fields["Co-pay"],
+            "ActiveDate": fields["Active Date"],
+            "TerminationDate": fields["Termination Date"],
+            "SecondaryInsurance": fields.get("Secondary Insurance Name"),
+        })
+    return records
+
+
+def joined_results(items, columns):
+    # Hash-joins one page of results to the manifest by transaction ID: one
+    # record per uploaded row the transaction answers, with every uploaded
+    # column and the row's position in the upload. Results the manifest doesn't
+    # know come back with only their result columns.
+    entries = transaction_manifest.lookup(
+        item["submitterTransactionIdentifier"] for item in items if item.get("submitterTransactionIdentifier")
+    )
+    services = {transaction_id: [service for _, service, _ in rows] for transaction_id, rows in entries.items()}
+    sources = []
+    for item in items:
+        sources.extend(entries.get(item.get("submitterTransactionIdentifier")) or [(None, None, {})])
+    records = []
+    for result, (label, _, source) in zip(flatten_results(items, services), sources):
+        record = {"Row": None if label is None else label + 1}
+        record.update((c, source.get(c)) for c in columns)
+        record.update((c, result[c]) for c in JOINED_COLUMNS)
+        records.append(record)
+    return records
+
+
+def _services_by_transaction(group_id):
+    services = {}
+    for _, _, outcome in job_store.iter_job_rows(group_id, status="submitted"):
+        if outcome.get("serviceTypeCode"):
+            services.setdefault(outcome["transactionId"], []).append(outcome["serviceTypeCode"])
+    return services
+
+
+def _fetch_state(batch_id):
+    # Cursor and flattened rows survive reruns so an interrupted fetch resumes.
+    # Rows are kept as one compact frame per page; raw responses go to the
+    # archive rather than the session.
+    state = st.session_state.get("batch_results")
+    if not state or state["cursor"].batch_id != batch_id or (state["cursor"].done and not state["cursor"].error):
+        # Submissions with a manifest export the uploaded rows joined to their results
+        uploaded = transaction_manifest.columns_for(batch_id)
+        state = {
+            "cursor": open_results_cursor(batch_id, page_size=100),
+            "frames": [],
+            "rows": 0,
+            "uploaded": uploaded,
+            "columns": ["Row"] + uploaded + JOINED_COLUMNS if uploaded else RESULT_COLUMNS,
+            "services": {} if uploaded else _services_by_transaction(batch_id),
+        }
+        st.session_state["batch_results"] = state
+    return state
+
+
+def _results_frame(state):
+    if not state["frames"]:
+        return pd.DataFrame(columns=state["columns"])
+    if len(state["frames"]) > 1:
+        state["frames"] = [pd.concat(state["frames"], ignore_index=True)]
+    return state["frames"][0]
+
+
+def _add_page(state, batch_id, page):
+    response_archive.archive(
+        batch_id, [(item["submitterTransactionIdentifier"], item, None)
+                   for item in page if item.get("submitterTransactionIdentifier")]
+    )
+    if state["uploaded"]:
+        transaction_manifest.mark_received(
+            item["submitterTransactionIdentifier"] for item in page if item.get("submitterTransactionIdentifier")
+        )
+        records = joined_results(page, state["uploaded"])
+    else:
+        records = flatten_results(page, state["services"])
+    frame = pd.DataFrame(records, columns=state["columns"])
+    state["frames"].append(frame)
+    state["rows"] += len(frame)
+    return frame
+
+
+def render_raw_response(transaction_id):
+    response = response_archive.get_response(transaction_id)
+    if response is None:
+        st.caption("No archived response for this transaction.")
+    else:
+        st.json(response, expanded=False)
+
+
+def render_missing_rows(batch_id):
+    # Uploaded rows the manifest still has no result for, straight from its index
+    missing = transaction_manifest.missing_rows(batch_id)
+    if not missing:
+        return
+    columns = transaction_manifest.columns_for(batch_id) or []
+    frame = pd.DataFrame(
+        [dict({"Row": label + 1, "BatchID": batch, "TransactionID": transaction_id},
+              **{c: source.get(c) for c in columns})
+         for label, batch, transaction_id, source in missing],
+        columns=["Row", "BatchID", "TransactionID"] + columns,
+    )
+    with st.expander(f"{len(frame)} submitted rows have no result yet"):
+        st.dataframe(frame, hide_index=True)
+        st.download_button("Download missing rows", frame.to_csv(index=False), file_name=f"{batch_id}_missing.csv",
+                           mime="text/csv", key="batch_results_missing", on_click="ignore")
+
+
+def watch_batches(batches):
+    # batches: [{"batchId", "itemCount"}]; the watcher is shared by every
+    # session, so each session lists only the batches it asked to watch
+    watcher = get_batch_watcher()
+    watched = st.session_state.setdefault("watched_batch_ids", set())
+    for batch in batches:
+        watcher.watch(batch["batchId"], expected_items=batch["itemCount"])
+        watched.add(batch["batchId"])
+
+
+@st.fragment(run_every=5)
+def render_watched_batches():
+    watched = st.session_state.get("watched_batch_ids", set())
+    statuses = [s for s in get_batch_watcher().status() if s["batch_id"] in watched]
+    if not statuses:
+        return
+
+    st.subheader("Watched Batches")
+    now = time.time()
+    st.dataframe(pd.DataFrame([
+        {
+            "BatchID": s["batch_id"],
+            "Status": s["status"],
+            "Completed": s["completed_items"],
+            "Expected": s["expected_items"],
+            "Next poll (s)": max(0, round(s["next_poll"] - now)) if s["next_poll"] else None,
+            "Error": s["error"],
+        }
+        for s in statuses
+    ]), hide_index=True)
+
 
 def render_batch_results():
     st.header("Retrieve Batch Eligibility Results")
 
-    batch_id = st.text_input("Enter Batch ID")
+    render_watched_batches()
+
+    submissions = job_store.list_jobs(job_store.BATCH)
+    if submissions:
+        with st.expander("Previous submissions"):
+            st.dataframe(pd.DataFrame([
+                {
+                    "GroupID": job["job_id"],
+                    "File": job["name"],
+                    "Rows": job["total_rows"],
+                    "Submitted": datetime.datetime.fromtimestamp(job["created_at"]).strftime("%Y-%m-%d %H:%M"),
+                    "Status": job["status"],
+                }
+                for job in submissions
+            ]), hide_index=True)
+            choice = st.selectbox("Submission", [job["job_id"] for job in submissions], key="batch_results_choice")
+            use_col, delete_col = st.columns(2)
+            if use_col.button("Use this submission"):
+                st.session_state["batch_results_id"] = choice
+            if delete_col.button("Delete job", help="Deletes the submission's manifest, row outcomes and raw responses"):
+                watcher = get_batch_watcher()
+                for batch_id in transaction_manifest.batch_ids(choice):
+                    watcher.unwatch(batch_id)
+                retention.delete_job(choice)
+                state = st.session_state.get("batch_results")
+                if state and state["cursor"].batch_id == choice:
+                    st.session_state.pop("batch_results")
+                st.rerun()
+
+    batch_id = st.text_input("Enter Batch ID or Group ID", key="batch_results_id")
     auto_paginate = st.checkbox("Auto-fetch all pages", value=True)
 
-    if st.button("Fetch Results"):
+    if st.button("Watch Batch"):
         if not batch_id:
             st.error("Batch ID is required.")
             return
+        group = get_group(batch_id)
+        watch_batches(group or [{"batchId": batch_id, "itemCount": None}])
+        st.success(f"Watching {len(group) if group else 1} batch(es) in the background.")
 
-        with st.spinner("Polling Stedi API for results..."):
-            data = poll_batch_results(batch_id, auto_paginate, page_size=100)
-
-        if "error" in data:
-            st.error(f"Request failed: {data['error']}")
+    if st.button("Fetch Results"):
+        if not batch_id:
+            st.error("Batch ID or Group ID is required.")
             return
 
-        all_items = data.get("items", [])
-        if not all_items:
-            st.warning("No completed results found yet. Try again later.")
+        state = _fetch_state(batch_id)
+        cursor = state["cursor"]
+        if cursor.pages_fetched:
+            st.info(f"Resuming after page {cursor.pages_fetched} ({state['rows']} results already retrieved).")
+
+        status = st.empty()
+        table = st.empty()
+        # Raw 271 pages are archived, flattened and dropped as they arrive.
+        # The cursor has already moved past a page it hands out, so the page
+        # is kept before the first st call, where a rerun can interrupt us.
+        # Only the newest page is shown while fetching; the pages are joined
+        # into one table once, after the loop
+        for page in cursor.pages(max_pages=None if auto_paginate else 1):
+            with metrics.timer("parse"):
+                frame = _add_page(state, batch_id, page)
+            status.write(f"Retrieved {state['rows']} results ({cursor.pages_fetched} pages), "
+                         "showing the latest page...")
+            with metrics.timer("render"):
+                table.dataframe(frame)
+        status.empty()
+
+        if cursor.error:
+            st.error(
+                f"Request failed: {cursor.error}. {state['rows']} results kept; "
+                "press Fetch Results again to resume from the failed page."
+            )
+        if not state["rows"]:
+            if not cursor.error:
+                st.warning("No completed results found yet. Try again later.")
             return
 
-        st.success(f"Total results retrieved: {len(all_items)}")
-
-        flat_records = []
-        for item in all_items:
-            subscriber = item.get("subscriber", {})
-            provider = item.get("provider", {})
-            eligibility_info = item.get("benefitsInformation", [])
-            first_benefit = eligibility_info[0] if eligibility_info else {}
-
-            flat_records.append({
-                "BatchID": item.get("batchId"),
-                "TransactionID": item.get("submitterTransactionIdentifier"),
-                "MemberID": subscriber.get("memberId"),
-                "FirstName": subscriber.get("firstName"),
-                "LastName": subscriber.get("lastName"),
-                "DOB": subscriber.get("dateOfBirth"),
-                "Provider": provider.get("organizationName"),
-                "ServiceType": first_benefit.get("serviceTypeCode"),
-                "CoverageStatus": first_benefit.get("code"),
-                "Description": first_benefit.get("description"),
-            })
-
-        df = pd.DataFrame(flat_records)
-        st.dataframe(df)
-
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False, sheet_name="Results")
-        buffer.seek(0)
-
-        st.download_button(
-            label="Download Results Excel",
-            data=buffer,
-            file_name=f"{batch_id}_results.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+        if cursor.done:
+            # A submission is done once every row it sent has a result. Its
+            # job is keyed on the group, which a single batch ID leads back
+            # to through the manifest; the group may span other batches, so
+            # its unanswered rows decide rather than this fetch's count
+            group_id = transaction_manifest.group_for(batch_id)
+            if group_id:
+                if not transaction_manifest.missing_rows(group_id):
+                    job_store.set_status(group_id, "done", only_if=("submitted",))
+            elif state["rows"] >= job_store.row_counts(batch_id).get("submitted", float("inf")):
+                job_store.set_status(batch_id, "done", only_if=("submitted",))
+            st.success(f"Total results retrieved: {state['rows']}")
+        elif not cursor.error:
+            st.info(f"{state['rows']} results retrieved so far; press Fetch Results for the next page.")
+
+        with metrics.timer("render"):
+            table.dataframe(_results_frame(state))
+
+    # Outside the button block so the download (and its format choice) stays
+    # available across reruns, including after a partial fetch
+    state = st.session_state.get("batch_results")
+    if batch_id and state and state["cursor"].batch_id == batch_id and state["rows"]:
+        frame = _results_frame(state)
+        render_download(lambda: iter_records(frame, state["columns"]), state["columns"], f"{batch_id}_results",
+                        key="batch_results_download")
+        if state["uploaded"]:
+            render_missing_rows(batch_id)
+        if response_archive.enabled():
+            with st.expander("Raw response"):
+                transaction_id = st.text_input("Transaction ID", key="batch_results_raw_id")
+                if transaction_id.strip():
+                    render_raw_response(transaction_id.strip())
@@ -0,0 +1,155 @@
+import csv
+import io
+import tempfile
+from pathlib import Path
+import pandas as pd
+from config.settings import EXPORT_SPOOL_BYTES
+from utils.formats import EXPORT_FORMATS, export_format
+
+MIME_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _cell(value):
+    # NaN/NaT/None become empty cells in every format
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    return value
+
+
+# Writers take a path or an open binary file. A file passed in is left open
+# on close(), so it can be rewound and read back.
+
+
+class CsvWriter:
+    def __init__(self, target, columns):
+        self.columns = columns
+        self._owned = isinstance(target, (str, Path))
+        self._file = io.TextIOWrapper(
+            open(target, "wb") if self._owned else target, encoding="utf-8", newline=""
+        )
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows):
+        self._writer.writerows([[_cell(row.get(c)) for c in self.columns] for row in rows])
+        self._file.flush()
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+        else:
+            self._file.flush()
+            self._file.detach()
+
+
+class ParquetWriter:
+    # One row group per write; every column is stored as text
+    def __init__(self, target, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet output requires the pyarrow package")
+        self._pa = pa
+        self.columns = columns
+        self._schema = pa.schema([(c, pa.string()) for c in columns])
+        self._writer = pq.ParquetWriter(str(target) if isinstance(target, Path) else target, self._schema)
+
+    def write(self, rows):
+        arrays = []
+        for c in self.columns:
+            values = [_cell(row.get(c)) for row in rows]
+            arrays.append(self._pa.array([None if v is None else str(v) for v in values], self._pa.string()))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class XlsxWriter:
+    # openpyxl's write-only mode streams rows to a temp file, so memory stays
+    # flat; the workbook itself is only assembled on close()
+    def __init__(self, target, columns):
+        import openpyxl
+        self.target = target
+        self.columns = columns
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Results")
+        self._sheet.append(columns)
+
+    def write(self, rows):
+        for row in rows:
+            self._sheet.append([_cell(row.get(c)) for c in self.columns])
+
+    def close(self):
+        self._workbook.save(self.target)
+
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter, "xlsx": XlsxWriter}
+
+
+def open_writer(path, columns, fmt=None):
+    return WRITERS[export_format(path, fmt)](path, columns)
+
+
+def spool_export(rows, columns, fmt, batch_rows=1000):
+    # Streams row dicts into a private temp spool: held in memory up to
+    # EXPORT_SPOOL_BYTES, then moved to an anonymous temp file. Nothing is
+    # written to a shared path, so concurrent sessions can't collide.
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    writer = WRITERS[export_format(fmt=fmt)](spool, columns)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            writer.write(batch)
+            batch = []
+    if batch:
+        writer.write(batch)
+    writer.close()
+    spool.seek(0)
+    return spool
+
+
+def export_bytes(rows, columns, fmt):
+    with spool_export(rows, columns, fmt) as spool:
+        return spool.read()
+
+
+class OrderedSink:
+    # Results complete out of order; this holds them until every earlier row
+    # has arrived and writes the contiguous run, so output keeps input order
+    def __init__(self, writer, flush_rows=500):
+        self.writer = writer
+        self.flush_rows = flush_rows
+        self.next_label = 0
+        self.written = 0
+        self._waiting = {}
+        self._ready = []
+
+    def add(self, label, row):
+        self._waiting[label] = row
+        while self.next_label in self._waiting:
+            self._ready.append(self._waiting.pop(self.next_label))
+            self.next_label += 1
+        if len(self._ready) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if self._ready:
+            self.writer.write(self._ready)
+            self.written += len(self._ready)
+            self._ready = []
+
+    def close(self):
+        self.flush()
+        # Anything still waiting follows a gap; write it rather than drop it
+        if self._waiting:
+            self.writer.write([self._waiting[k] for k in sorted(self._waiting)])
+            self.written += len(self._waiting)
+            self._waiting.clear()
+        self.writer.close()
@@ -0,0 +1,22 @@
+from pathlib import Path
+
+# File formats read and written, kept free of pandas so the CLI parent can
+# check its arguments without importing it
+
+UPLOAD_TYPES = ["xlsx", "xls", "csv", "parquet"]
+
+EXPORT_FORMATS = ["csv", "parquet", "xlsx"]
+
+
+def file_format(name):
+    suffix = Path(str(name)).suffix.lower().lstrip(".")
+    if suffix not in UPLOAD_TYPES:
+        raise ValueError(f"Unsupported file type '.{suffix}'; expected one of {', '.join(UPLOAD_TYPES)}")
+    return suffix
+
+
+def export_format(path=None, fmt=None):
+    fmt = (fmt or Path(str(path)).suffix.lstrip(".")).lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported output format '{fmt}'; expected one of {', '.join(EXPORT_FORMATS)}")
+    return fmt
@@ -0,0 +1,98 @@
+import pandas as pd
+from config.settings import INGEST_CHUNK_ROWS
+from utils.formats import UPLOAD_TYPES, file_format
+
+
+class SpreadsheetReader:
+    # Reads an uploaded roster in row chunks. The header (and, for xlsx and
+    # parquet, a row count) comes from file metadata before any data rows are
+    # read. Every chunk keeps a global row index, so row numbers stay stable.
+    def __init__(self, source, name=None, chunk_rows=INGEST_CHUNK_ROWS):
+        self.source = source
+        self.format = file_format(name or getattr(source, "name", source))
+        self.chunk_rows = chunk_rows
+        self._workbook = None
+        self.columns, self.total_rows = self._read_header()
+
+    def _rewind(self):
+        if hasattr(self.source, "seek"):
+            self.source.seek(0)
+        return self.source
+
+    def _open_xlsx(self):
+        # Loading is the slow part when a sheet lacks a <dimension> tag (openpyxl
+        # then scans the whole sheet), so one read-only workbook serves every pass
+        if self._workbook is None:
+            import openpyxl
+            self._workbook = openpyxl.load_workbook(self._rewind(), read_only=True, data_only=True)
+        return self._workbook
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+    def _read_header(self):
+        if self.format == "xlsx":
+            ws = self._open_xlsx().active
+            header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            total = ws.max_row - 1 if ws.max_row else None
+            columns = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+            while columns and columns[-1].startswith("Unnamed: "):
+                columns.pop()
+            return columns, total
+        if self.format == "csv":
+            return [str(c).strip() for c in pd.read_csv(self._rewind(), nrows=0).columns], None
+        if self.format == "parquet":
+            pf = self._parquet_file()
+            return list(pf.schema_arrow.names), pf.metadata.num_rows
+        df = pd.read_excel(self._rewind(), nrows=0)
+        return [str(c).strip() for c in df.columns], None
+
+    def _parquet_file(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet uploads require the pyarrow package")
+        return pq.ParquetFile(self._rewind())
+
+    def _xlsx_chunks(self, limit):
+        rows = self._open_xlsx().active.iter_rows(min_row=2, values_only=True)
+        width = len(self.columns)
+        buffer = []
+        for values in rows:
+            if all(v is None for v in values):
+                continue
+            buffer.append(values[:width] + (None,) * (width - len(values)))
+            if len(buffer) >= limit:
+                yield pd.DataFrame(buffer, columns=self.columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=self.columns)
+
+    def _raw_chunks(self, limit):
+        if self.format == "xlsx":
+            yield from self._xlsx_chunks(limit)
+        elif self.format == "csv":
+            # Read as text so IDs keep their leading zeros
+            yield from pd.read_csv(self._rewind(), chunksize=limit, dtype=str)
+        elif self.format == "parquet":
+            for batch in self._parquet_file().iter_batches(batch_size=limit):
+                yield batch.to_pandas()
+        else:
+            yield pd.read_excel(self._rewind())
+
+    def chunks(self, chunk_rows=None):
+        offset = 0
+        for chunk in self._raw_chunks(chunk_rows or self.chunk_rows):
+            chunk = chunk.rename(columns=lambda c: str(c).strip())
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+
+    def preview(self, rows=10):
+        return next(self.chunks(rows), pd.DataFrame(columns=self.columns))
+
+    def read_all(self):
+        frames = list(self.chunks())
+        return pd.concat(frames) if frames else pd.DataFrame(columns=self.columns)
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import pickle
+import threading
+from pathlib import Path
+from config.settings import PAYER_MATCH_THRESHOLD, PAYER_SNAPSHOT_PATH
+from utils.payer_search import PayerIndex
+
+logger = logging.getLogger(__name__)
+
+payers_path = Path("data/payers.json")
+SNAPSHOT_VERSION = 2
+
+# Only the fields the app actually reads are kept; the rest of payers.json
+# (enrollment, per-transaction flags) is dropped at load time.
+_PAYER_FIELDS = ("stediId", "displayName", "primaryPayerId", "aliases", "names", "coverageTypes")
+
+
+def _compact(p):
+    payer = {k: p.get(k) for k in _PAYER_FIELDS}
+    payer["aliases"] = p.get("aliases") or []
+    payer["names"] = p.get("names") or []
+    payer["coverageTypes"] = p.get("coverageTypes") or []
+    payer["eligibilityCheck"] = p.get("transactionSupport", {}).get("eligibilityCheck")
+    payer["eligibility"] = payer["eligibilityCheck"] == "SUPPORTED"
+    return payer
+
+
+class PayerRegistry:
+    def __init__(self, path=payers_path, snapshot_path=None):
+        self.path = Path(path)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self._lock = threading.Lock()
+        self._stamp = None
+        self.payers = []
+        self.eligible = []
+        self.by_name = {}
+        self.by_id = {}
+        self.name_to_id = {}
+        self._search = None
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_snapshot(self, stamp):
+        if not self.snapshot_path or not self.snapshot_path.exists():
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snap = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable payer snapshot {self.snapshot_path}: {e}")
+            return None
+        if snap.get("version") != SNAPSHOT_VERSION or snap.get("stamp") != stamp:
+            return None
+        return snap["payers"]
+
+    def _write_snapshot(self, stamp, payers):
+        tmp = self.snapshot_path.with_suffix(self.snapshot_path.suffix + ".tmp")
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump({"version": SNAPSHOT_VERSION, "stamp": stamp, "payers": payers}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not write payer snapshot {self.snapshot_path}: {e}")
+
+    def _build_indexes(self, payers):
+        by_name, by_id = {}, {}
+        # Eligibility-supported payers win collisions on duplicate display names.
+        for p in sorted(payers, key=lambda p: not p["eligibility"]):
+            by_name.setdefault(p["displayName"].strip().lower(), p)
+        # Primary and Stedi IDs take precedence over aliases.
+        for p in payers:
+            for key in (p["primaryPayerId"], p["stediId"]):
+                if key:
+                    by_id.setdefault(key.upper(), p)
+        for p in payers:
+            for alias in p["aliases"]:
+                by_id.setdefault(alias.upper(), p)
+        return by_name, by_id
+
+    def refresh(self):
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return self
+        with self._lock:
+            if stamp == self._stamp:
+                return self
+            payers = self._read_snapshot(stamp)
+            if payers is None:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                payers = [_compact(p) for p in data["items"]]
+                if self.snapshot_path:
+                    self._write_snapshot(stamp, payers)
+            self.by_name, self.by_id = self._build_indexes(payers)
+            self.name_to_id = {k: p["primaryPayerId"] for k, p in self.by_name.items() if p["eligibility"]}
+            self.payers = payers
+            self.eligible = [p for p in payers if p["eligibility"]]
+            self._search = None
+            self._stamp = stamp
+            logger.info(f"Loaded {len(payers)} payers from {self.path}")
+        return self
+
+    def search_index(self):
+        # Fuzzy name index over eligible payers, built on first use after each load
+        index = self._search
+        if index is None:
+            with self._lock:
+                index = self._search
+                if index is None:
+                    index = self._search = PayerIndex(self.eligible, threshold=PAYER_MATCH_THRESHOLD)
+        return index
+
+    def eligible_payers(self):
+        return self.eligible
+
+    def find_by_name(self, name):
+        if not name:
+            return None
+        return self.by_name.get(str(name).strip().lower())
+
+    def find_by_id(self, payer_id):
+        if not payer_id:
+            return None
+        return self.by_id.get(str(payer_id).strip().upper())
+
+    def payer_id_for_name(self, name):
+        if not name:
+            return None
+        return self.name_to_id.get(str(name).strip().lower())
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_payer_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PayerRegistry(snapshot_path=PAYER_SNAPSHOT_PATH)
+    return _registry.refresh()
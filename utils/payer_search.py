@@ -0,0 +1,202 @@
+import re
+import threading
+import numpy as np
+
+# Spellings rosters use for the words payer names are built from
+ABBREVIATIONS = {
+    "bcbs": "blue cross blue shield",
+    "bc": "blue cross",
+    "bs": "blue shield",
+    "uhc": "unitedhealthcare",
+    "hlth": "health",
+    "hc": "healthcare",
+    "ins": "insurance",
+    "svc": "services",
+    "svcs": "services",
+    "mgmt": "management",
+    "natl": "national",
+    "assn": "association",
+    "amer": "american",
+    "mcd": "medicaid",
+    "mcr": "medicare",
+}
+# Words that don't tell payers apart
+STOPWORDS = frozenset({"inc", "llc", "co", "corp", "corporation", "company", "incorporated", "ltd", "the"})
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_name(name):
+    words = _WORD.findall(str(name).lower().replace("&", " and "))
+    out = []
+    for word in words:
+        if word in STOPWORDS:
+            continue
+        out.extend(ABBREVIATIONS.get(word, word).split())
+    return " ".join(out)
+
+
+def trigrams(text):
+    # pg_trgm style: each word padded, so word order doesn't matter
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def covers(query_words, words):
+    # Every query word equals or is a prefix of a word of the name, in the
+    # same order: trigrams alone match "health net" to "network health"
+    i = 0
+    for query_word in query_words:
+        while i < len(words) and not words[i].startswith(query_word):
+            i += 1
+        if i == len(words):
+            return False
+        i += 1
+    return True
+
+
+class PayerIndex:
+    # Trigram index over every payer's displayName and known names, plus its
+    # IDs and aliases. search() ranks payers for a typeahead; resolve() maps a
+    # roster's free-text payer name to one payer, or None when no payer is a
+    # clear winner. Resolutions are memoized for the life of the index.
+    CANDIDATES = 200
+
+    def __init__(self, payers, threshold=0.75, margin=0.05):
+        self.payers = payers
+        self.threshold = threshold
+        self.margin = margin
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+        texts, owners, seen = [], [], set()
+        for idx, payer in enumerate(payers):
+            for name in [payer["displayName"]] + list(payer["names"]):
+                text = normalize_name(name)
+                if text and (idx, text) not in seen:
+                    seen.add((idx, text))
+                    texts.append(text)
+                    owners.append(idx)
+        self.texts = texts
+        self.owners = np.array(owners, dtype=np.int32)
+        self.exact = {}
+        for text, owner in zip(texts, owners):
+            self.exact.setdefault(text, set()).add(owner)
+        # Primary and Stedi IDs take precedence over aliases, as in the registry
+        self.by_id = {}
+        for payer in payers:
+            for key in (payer["primaryPayerId"], payer["stediId"]):
+                if key:
+                    self.by_id.setdefault(key.upper(), payer)
+        for payer in payers:
+            for alias in payer["aliases"]:
+                self.by_id.setdefault(alias.upper(), payer)
+
+        vocab, postings, sizes = {}, [], []
+        for entry, text in enumerate(texts):
+            grams = trigrams(text)
+            sizes.append(len(grams))
+            for gram in grams:
+                gid = vocab.get(gram)
+                if gid is None:
+                    gid = vocab[gram] = len(postings)
+                    postings.append([])
+                postings[gid].append(entry)
+        self.vocab = vocab
+        self.postings = [np.array(p, dtype=np.int32) for p in postings]
+        self.sizes = np.array(sizes, dtype=np.float64)
+
+    def _similarity(self, text):
+        # Dice coefficient of the query's trigrams against every entry
+        grams = trigrams(text)
+        hits = [self.postings[self.vocab[g]] for g in grams if g in self.vocab]
+        if not hits:
+            return None
+        counts = np.bincount(np.concatenate(hits), minlength=len(self.texts))
+        return 2 * counts / (len(grams) + self.sizes)
+
+    def _top(self, dice, k):
+        k = min(k, len(dice))
+        top = np.argpartition(dice, -k)[-k:]
+        return top[np.argsort(dice[top])[::-1]]
+
+    def _ranked(self, query):
+        # [(rank, payer index)] best first, one per payer
+        text = normalize_name(query)
+        dice = self._similarity(text) if text else None
+        if dice is None:
+            return []
+        words = text.split()
+        best = {}
+        for entry in self._top(dice, self.CANDIDATES).tolist():
+            if dice[entry] <= 0:
+                break
+            entry_text = self.texts[entry]
+            score = float(dice[entry])
+            if entry_text == text:
+                score = 2.0
+            # Typeahead: reward names the query is a prefix of, word by word
+            elif entry_text.startswith(text):
+                score += 0.3
+            elif all(any(w.startswith(q) for w in entry_text.split()) for q in words):
+                score += 0.2
+            owner = int(self.owners[entry])
+            if score > best.get(owner, -1.0):
+                best[owner] = score
+        return sorted(((score, owner) for owner, score in best.items()), reverse=True)
+
+    def search(self, query, limit=20):
+        query = str(query or "").strip()
+        results = []
+        payer = self.by_id.get(query.upper())
+        if payer is not None:
+            results.append(payer)
+        for _, owner in self._ranked(query):
+            if len(results) >= limit:
+                break
+            if self.payers[owner] is not payer:
+                results.append(self.payers[owner])
+        return results[:limit]
+
+    def _resolve(self, name):
+        payer = self.by_id.get(name.upper())
+        if payer is not None:
+            return payer
+        text = normalize_name(name)
+        exact = self.exact.get(text)
+        if exact:
+            return self.payers[next(iter(exact))] if len(exact) == 1 else None
+        dice = self._similarity(text) if text else None
+        if dice is None:
+            return None
+        # Only names covering every query word count; the best of those has to
+        # clear the threshold and beat every other payer's best
+        words = text.split()
+        top = [e for e in self._top(dice, 16).tolist() if dice[e] > 0 and covers(words, self.texts[e].split())]
+        if not top:
+            return None
+        owner = int(self.owners[top[0]])
+        runner_up = next((dice[e] for e in top[1:] if self.owners[e] != owner), 0.0)
+        if dice[top[0]] >= self.threshold and dice[top[0]] - runner_up >= self.margin:
+            return self.payers[owner]
+        return None
+
+    def resolve(self, name):
+        name = str(name or "").strip()
+        if not name:
+            return None
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        payer = self._resolve(name)
+        with self._lock:
+            self._resolved[name] = payer
+        return payer
+
+    def resolve_many(self, names):
+        # {name: payer or None} for each distinct name
+        return {name: self.resolve(name) for name in set(names)}